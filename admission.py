@@ -0,0 +1,209 @@
+import fcntl
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Concurrent assessments per worker process and across all workers (units, see weights)
+MAX_CONCURRENT_ASSESSMENTS = int(os.getenv("MAX_CONCURRENT_ASSESSMENTS", "2"))
+MAX_GLOBAL_ASSESSMENTS = int(os.getenv("MAX_GLOBAL_ASSESSMENTS", "4"))
+# Requests allowed to wait for a slot (across workers) before we answer 429
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "8"))
+ADMISSION_WAIT_SECONDS = float(os.getenv("ADMISSION_WAIT_SECONDS", "120"))
+ADMISSION_LOCK_DIR = os.getenv("ADMISSION_LOCK_DIR", os.path.join("cache", "admission"))
+# Inventory bytes per unit of weight; heavy jobs never take more than ADMISSION_MAX_WEIGHT units
+ADMISSION_BYTES_PER_UNIT = int(os.getenv("ADMISSION_BYTES_PER_UNIT", str(20 * 1024 * 1024)))
+ADMISSION_MAX_WEIGHT = int(os.getenv("ADMISSION_MAX_WEIGHT", "2"))
+# Global slots only light (weight 1) jobs may use, so huge jobs cannot starve small ones
+ADMISSION_RESERVED_LIGHT = int(os.getenv("ADMISSION_RESERVED_LIGHT", "1"))
+
+_POLL_SECONDS = 0.2
+
+
+class AdmissionRejected(Exception):
+    """Raised when the wait queue is full or a slot did not free up in time."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def inventory_weight(files: list, bytes_per_unit=ADMISSION_BYTES_PER_UNIT, max_weight=ADMISSION_MAX_WEIGHT) -> int:
+    """
+    Weight a request by the size of its inventory files, using the declared
+    ``size`` when present and the local file size for local paths.
+    """
+    total = 0
+    for f in files or []:
+        size = f.get("size") or f.get("file_size")
+        if size is None:
+            url = f.get("file_url", "")
+            if url and not url.startswith("http") and os.path.isfile(url):
+                size = os.path.getsize(url)
+        try:
+            total += int(size or 0)
+        except (TypeError, ValueError):
+            continue
+    return max(1, min(max_weight, 1 + total // max(1, bytes_per_unit)))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class AdmissionController:
+    """
+    Cap concurrent assessments per process (a condition variable) and across
+    gunicorn workers (one flock'd file per global slot, released by the OS if
+    a worker dies). Waiting requests register a ticket file so the queue
+    bound is shared too.
+    """
+
+    def __init__(self, local_capacity=MAX_CONCURRENT_ASSESSMENTS, global_capacity=MAX_GLOBAL_ASSESSMENTS,
+                 queue_size=ADMISSION_QUEUE_SIZE, wait_seconds=ADMISSION_WAIT_SECONDS,
+                 lock_dir=ADMISSION_LOCK_DIR, reserved_light=ADMISSION_RESERVED_LIGHT):
+        self.local_capacity = max(1, local_capacity)
+        self.global_capacity = global_capacity
+        self.queue_size = queue_size
+        self.wait_seconds = wait_seconds
+        self.lock_dir = lock_dir
+        self.reserved_light = min(reserved_light, max(0, global_capacity - 1))
+        self._cond = threading.Condition()
+        self._local_used = 0
+        self._avg_seconds = 60.0
+        self._stats = {"admitted": 0, "rejected": 0, "timed_out": 0}
+
+    # -- global slots --------------------------------------------------------
+
+    def _try_global(self, weight):
+        if self.global_capacity <= 0:
+            return []
+        os.makedirs(self.lock_dir, exist_ok=True)
+        # heavy jobs skip the reserved light-only slots
+        first = 0 if weight == 1 else self.reserved_light
+        held = []
+        for i in range(first, self.global_capacity):
+            fh = open(os.path.join(self.lock_dir, f"slot-{i}.lock"), "a+")
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                fh.close()
+                continue
+            held.append(fh)
+            if len(held) == weight:
+                return held
+        self._release_global(held)
+        return None
+
+    @staticmethod
+    def _release_global(held):
+        for fh in held or []:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+            fh.close()
+
+    def _queue_dir(self):
+        path = os.path.join(self.lock_dir, "queue")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _queue_length(self):
+        length = 0
+        queue_dir = self._queue_dir()
+        for name in os.listdir(queue_dir):
+            try:
+                pid = int(name.split("-", 1)[0])
+            except ValueError:
+                continue
+            if _pid_alive(pid):
+                length += 1
+            else:
+                try:
+                    os.remove(os.path.join(queue_dir, name))
+                except FileNotFoundError:
+                    pass
+        return length
+
+    # -- public API ------------------------------------------------------------
+
+    def retry_after(self) -> int:
+        """Rough seconds until a slot frees up, for the Retry-After header."""
+        capacity = self.global_capacity if self.global_capacity > 0 else self.local_capacity
+        return max(1, math.ceil(self._avg_seconds * (self._queue_length() + 1) / capacity))
+
+    @contextmanager
+    def admit(self, weight: int = 1):
+        """
+        Hold ``weight`` units of capacity for the duration of the block,
+        waiting in the bounded queue if necessary.
+        """
+        limit = self.local_capacity
+        if self.global_capacity > 0:
+            limit = min(limit, self.global_capacity - self.reserved_light)
+        weight = max(1, min(weight, limit))
+        ticket = None
+        held = None
+        local_taken = False
+        deadline = time.monotonic() + self.wait_seconds
+        try:
+            while True:
+                with self._cond:
+                    if self._local_used + weight <= self.local_capacity:
+                        held = self._try_global(weight)
+                        if held is not None:
+                            self._local_used += weight
+                            local_taken = True
+                            break
+                if ticket is None:
+                    if self._queue_length() >= self.queue_size:
+                        self._stats["rejected"] += 1
+                        raise AdmissionRejected("Too many assessments queued", self.retry_after())
+                    ticket = os.path.join(self._queue_dir(), f"{os.getpid()}-{uuid.uuid4().hex}")
+                    open(ticket, "w").close()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timed_out"] += 1
+                    raise AdmissionRejected("Timed out waiting for an assessment slot", self.retry_after())
+                with self._cond:
+                    self._cond.wait(min(_POLL_SECONDS, remaining))
+        finally:
+            if ticket:
+                try:
+                    os.remove(ticket)
+                except FileNotFoundError:
+                    pass
+
+        self._stats["admitted"] += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * (time.monotonic() - started)
+            self._release_global(held)
+            if local_taken:
+                with self._cond:
+                    self._local_used -= weight
+                    self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            local_used = self._local_used
+        return {
+            "local_used": local_used,
+            "local_capacity": self.local_capacity,
+            "global_capacity": self.global_capacity,
+            "queued": self._queue_length(),
+            "queue_size": self.queue_size,
+            "avg_seconds": round(self._avg_seconds, 2),
+            **self._stats,
+        }
+
+
+admission = AdmissionController()
@@ -1,21 +1,89 @@
 import os
 import json
 import traceback
-from flask import Flask, request, jsonify, send_from_directory
-from generate_assessment import process_assessment
+from flask import Flask, Response, abort, request, jsonify, send_file, stream_with_context
+from generate_assessment import process_assessment, OUTPUT_DIR, session_storage, single_flight
+from artifact_serving import (
+    ARTIFACT_MAX_AGE, content_etag, resolve_artifact, session_artifacts, stream_zip
+)
+from report_service import report_breaker
+from admission import admission, inventory_weight, AdmissionRejected
+from batch import BATCH_MAX_SESSIONS, batch_jobs
+from profiling import profiling_authorized, profiling_requested
+from webhook_outbox import webhook_outbox
+from preload import preloading, start_background_services
+from deadline import request_deadline
+from single_flight import SessionBusy
 
 app = Flask(__name__)
+# a preloading gunicorn master starts these in each worker after the fork instead
+if not preloading():
+    start_background_services()
 
 @app.route("/healthz", methods=["GET"])
 def health_check():
     """Simple keep-alive endpoint."""
     return "OK", 200
 
+@app.route("/healthz/report_service", methods=["GET"])
+def report_service_status():
+    """Expose the DOCX/PPTX service circuit breaker state for monitoring."""
+    return jsonify(report_breaker.snapshot()), 200
+
+@app.route("/healthz/admission", methods=["GET"])
+def admission_status():
+    """Expose concurrent assessment slots and queue depth for monitoring."""
+    return jsonify(admission.snapshot()), 200
+
+@app.route("/healthz/outbox", methods=["GET"])
+def outbox_status():
+    """Expose pending, delivered and failed webhook notifications for monitoring."""
+    return jsonify(webhook_outbox.stats()), 200
+
+@app.route("/healthz/coalescing", methods=["GET"])
+def coalescing_status():
+    """Expose in-flight assessments and duplicate requests attached to them in this worker."""
+    return jsonify(single_flight.stats()), 200
+
+@app.route("/healthz/storage", methods=["GET"])
+def storage_status():
+    """Expose temp_sessions usage and eviction counters for monitoring."""
+    return jsonify(session_storage.stats()), 200
+
 @app.route('/files/<session_id>/<path:filename>')
 def serve_generated_file(session_id, filename):
-    """Serve generated files from the temp_sessions directory."""
-    directory = os.path.join('temp_sessions', session_id)
-    return send_from_directory(directory, filename)
+    """
+    Serve generated files from the temp_sessions directory with strong
+    content ETags (304 on If-None-Match) and byte ranges. Every artifact is
+    already a compressed container (docx/pptx/xlsx/png/parquet), so nothing
+    is gzipped on the way out.
+    """
+    path = resolve_artifact(OUTPUT_DIR, session_id, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    # sessions are written relative to the working directory, not the app root
+    path = os.path.abspath(path)
+    session_storage.touch(session_id)
+    response = send_file(path, etag=content_etag(path), max_age=ARTIFACT_MAX_AGE)
+    response.headers["Accept-Ranges"] = "bytes"
+    response.cache_control.must_revalidate = True
+    return response
+
+@app.route('/bundles/<session_id>.zip')
+def serve_session_bundle(session_id):
+    """Stream a zip of every artifact in a session, built on the fly."""
+    session_dir = resolve_artifact(OUTPUT_DIR, session_id)
+    if session_dir is None or not os.path.isdir(session_dir):
+        abort(404)
+    session_storage.touch(session_id)
+    artifacts = session_artifacts(session_dir)
+    if not artifacts:
+        abort(404)
+    return Response(
+        stream_with_context(stream_zip(artifacts)),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{session_id}.zip"'},
+    )
 
 @app.route("/start_assessment", methods=["POST"])
 def start_assessment():
@@ -34,15 +102,38 @@ def start_assessment():
         if not session_id or not email or not goal:
             return jsonify({"error": "Missing required fields: session_id, email, or goal"}), 400
 
+        # the clock starts on arrival, so time queued for admission counts against the budget
+        try:
+            deadline = request_deadline(request.headers, data)
+        except ValueError:
+            return jsonify({"error": "Deadline must be a number of seconds"}), 400
+
+        profile = profiling_requested(request.headers, data)
+        if profile and not profiling_authorized(request.headers):
+            return jsonify({"error": "Profiling requires a valid admin token"}), 403
+
         print(f"➡️ Calling process_assessment for session: {session_id}", flush=True)
-        result = process_assessment({
-            "session_id": session_id,
-            "email": email,
-            "goal": goal,
-            "files": files,
-            "next_action_webhook": next_action_webhook,
-            "folder_id": folder_id
-        })
+        try:
+            with admission.admit(inventory_weight(files)):
+                result = process_assessment({
+                    "session_id": session_id,
+                    "email": email,
+                    "goal": goal,
+                    "files": files,
+                    "next_action_webhook": next_action_webhook,
+                    "folder_id": folder_id,
+                    "idempotency_key": request.headers.get("Idempotency-Key", ""),
+                    "deadline": deadline,
+                    # optional processing modes; absent keys fall back to the server defaults
+                    **{k: data[k] for k in ("incremental", "chunked") if k in data},
+                    **({"profile": True} if profile else {})
+                })
+        except (AdmissionRejected, SessionBusy) as e:
+            print(f"[WARN] Rejecting assessment {session_id}: {e}", flush=True)
+            response = jsonify({"error": str(e), "retry_after": e.retry_after})
+            response.headers["Retry-After"] = str(e.retry_after)
+            # a busy session is a conflict with another run of it, not overload
+            return response, 409 if isinstance(e, SessionBusy) else 429
         print("✅ Assessment completed. Returning result.\n", flush=True)
         return jsonify({"result": result}), 200
 
@@ -50,6 +141,41 @@ def start_assessment():
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+@app.route("/batch_assessment", methods=["POST"])
+def batch_assessment():
+    """
+    Assess many sessions in one call, e.g. nightly re-assessments. Each entry
+    in ``sessions`` takes the same fields as /start_assessment. The batch
+    runs in the background: the 202 response carries a job id, and
+    GET /batch_assessment/<job_id> reports results and failures per session.
+    """
+    try:
+        data = request.get_json(force=True)
+        sessions = data.get("sessions") if isinstance(data, dict) else None
+        if not isinstance(sessions, list) or not sessions:
+            return jsonify({"error": "Missing required field: sessions"}), 400
+        if len(sessions) > BATCH_MAX_SESSIONS:
+            return jsonify({"error": f"At most {BATCH_MAX_SESSIONS} sessions per batch"}), 400
+        if not all(isinstance(s, dict) for s in sessions):
+            return jsonify({"error": "Each session must be an object"}), 400
+
+        print(f"\n📥 Received batch of {len(sessions)} assessments", flush=True)
+        job_id = batch_jobs.submit(sessions)
+        return jsonify({"job_id": job_id, "status": "running",
+                        "status_url": f"/batch_assessment/{job_id}"}), 202
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/batch_assessment/<job_id>", methods=["GET"])
+def batch_assessment_status(job_id):
+    """Report a batch job: running, done (with per-session results), failed or lost."""
+    job = batch_jobs.get(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(job), 200
+
 if __name__ == "__main__":
     # Bind to the Render-assigned port
     port = int(os.environ.get("PORT", 5001))
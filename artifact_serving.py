@@ -0,0 +1,115 @@
+import hashlib
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+
+from werkzeug.security import safe_join
+
+# Seconds clients may reuse an artifact before revalidating with If-None-Match
+ARTIFACT_MAX_AGE = int(os.getenv("ARTIFACT_MAX_AGE", "0"))
+# Artifacts whose content digest is remembered per process (least recently served are dropped)
+ETAG_CACHE_MAX_ENTRIES = int(os.getenv("ETAG_CACHE_MAX_ENTRIES", "4096"))
+
+# Formats that are already compressed containers (zip/png/parquet) are stored in bundles, not deflated again
+STORED_EXTENSIONS = (".docx", ".pptx", ".xlsx", ".png", ".jpg", ".jpeg", ".gz", ".zip", ".parquet", ".arrow")
+
+_CHUNK = 64 * 1024
+
+# path -> (size, mtime_ns, digest), oldest first
+_etag_cache = OrderedDict()
+_etag_lock = threading.Lock()
+
+
+def content_etag(path: str) -> str:
+    """
+    Strong ETag derived from the file content. Digests are cached per
+    (path, size, mtime) so each artifact is hashed once per process; only
+    the ``ETAG_CACHE_MAX_ENTRIES`` most recently served paths are kept.
+    """
+    st = os.stat(path)
+    with _etag_lock:
+        cached = _etag_cache.get(path)
+        if cached and cached[:2] == (st.st_size, st.st_mtime_ns):
+            _etag_cache.move_to_end(path)
+            return cached[2]
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(_CHUNK), b""):
+            h.update(block)
+    digest = h.hexdigest()[:32]
+    with _etag_lock:
+        _etag_cache[path] = (st.st_size, st.st_mtime_ns, digest)
+        _etag_cache.move_to_end(path)
+        while len(_etag_cache) > ETAG_CACHE_MAX_ENTRIES:
+            _etag_cache.popitem(last=False)
+    return digest
+
+
+def session_artifacts(session_dir: str):
+    """List ``(arcname, path)`` for every artifact in a session folder."""
+    artifacts = []
+    for root, dirs, names in os.walk(session_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(names):
+            if name.startswith(".") or name.endswith(".tmp"):
+                continue
+            path = os.path.join(root, name)
+            artifacts.append((os.path.relpath(path, session_dir), path))
+    return artifacts
+
+
+class _StreamSink:
+    """Write-only file object that hands buffered bytes back to a generator."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def stream_zip(artifacts):
+    """
+    Yield a zip archive of ``artifacts`` chunk by chunk without staging it
+    on disk. Already-compressed formats are stored, everything else is
+    deflated.
+    """
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, mode="w", allowZip64=True) as zf:
+        for arcname, path in artifacts:
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = (
+                zipfile.ZIP_STORED if path.lower().endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+            )
+            with open(path, "rb") as src, zf.open(info, "w", force_zip64=True) as dst:
+                for block in iter(lambda: src.read(_CHUNK), b""):
+                    dst.write(block)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
+
+
+def resolve_artifact(output_dir: str, session_id: str, filename: str = ""):
+    """Safely join a session artifact path; returns None on traversal attempts and dot-prefixed bookkeeping."""
+    session_dir = safe_join(output_dir, session_id)
+    if session_dir is None or not filename:
+        return session_dir
+    # pins, locks and coalesced results live in dot-prefixed entries that are never artifacts
+    if any(part.startswith(".") for part in filename.replace("\\", "/").split("/")):
+        return None
+    return safe_join(session_dir, filename)
+
@@ -0,0 +1,83 @@
+import io
+import mimetypes
+import os
+import threading
+import uuid
+from collections import namedtuple
+
+# Write generated artifacts to the session folder (for /files serving) once a run completes
+ARTIFACT_PERSIST = os.getenv("ARTIFACT_PERSIST", "1") == "1"
+
+# ``name`` is the path relative to the session folder, e.g. "charts/hw_tier_chart.png"
+Artifact = namedtuple("Artifact", ["name", "data", "mimetype"])
+
+
+def make_artifact(name: str, data: bytes, mimetype: str = None) -> Artifact:
+    return Artifact(name, data, mimetype or mimetypes.guess_type(name)[0] or "application/octet-stream")
+
+
+def render_artifact(name: str, write, mimetype: str = None) -> Artifact:
+    """Call ``write(buffer)`` on an in-memory buffer and wrap what it wrote."""
+    buffer = io.BytesIO()
+    write(buffer)
+    return make_artifact(name, buffer.getvalue(), mimetype)
+
+
+def open_artifact(artifact: Artifact) -> io.BytesIO:
+    return io.BytesIO(artifact.data)
+
+
+def image_source(value):
+    """
+    What ``add_picture`` should read for a chart entry: a fresh buffer for an
+    in-memory artifact, the path for an existing file, otherwise ``None``.
+    """
+    if isinstance(value, Artifact):
+        return open_artifact(value)
+    if isinstance(value, str) and os.path.exists(value):
+        return value
+    return None
+
+
+class ArtifactStore:
+    """
+    In-memory artifacts for one assessment run. Stages hand buffers to each
+    other and to uploads directly; nothing touches disk until ``persist``.
+    """
+
+    def __init__(self, session_dir: str):
+        self.session_dir = session_dir
+        self._lock = threading.Lock()
+        self._items = {}
+
+    def put(self, artifact: Artifact) -> Artifact:
+        with self._lock:
+            self._items[artifact.name] = artifact
+        return artifact
+
+    def get(self, name: str) -> Artifact:
+        with self._lock:
+            return self._items.get(name)
+
+    def names(self) -> list:
+        with self._lock:
+            return list(self._items)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.session_dir, name)
+
+    def persist(self, names=None) -> list:
+        """Write artifacts into the session folder (atomically) and return their paths."""
+        written = []
+        for name in names if names is not None else self.names():
+            artifact = self.get(name)
+            if artifact is None:
+                continue
+            path = self.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as fh:
+                fh.write(artifact.data)
+            os.replace(tmp_path, path)
+            written.append(path)
+        return written
@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+from admission import MAX_CONCURRENT_ASSESSMENTS, AdmissionRejected, admission, inventory_weight
+from deadline import request_deadline
+from generate_assessment import process_assessment
+from shared_work import SharedMemo, market_memo, narrative_memo
+from sqlite_store import connect
+
+# Sessions assessed in parallel by one batch request
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", str(MAX_CONCURRENT_ASSESSMENTS)))
+# Largest number of session specs accepted in one batch request
+BATCH_MAX_SESSIONS = int(os.getenv("BATCH_MAX_SESSIONS", "200"))
+# Batch jobs run in the background; their status and results are kept here for any worker to report
+BATCH_JOBS_PATH = os.getenv("BATCH_JOBS_PATH", os.path.join("cache", "batch_jobs.sqlite3"))
+# Finished jobs are kept this long
+BATCH_JOB_RETENTION_SECONDS = int(os.getenv("BATCH_JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+REQUIRED_FIELDS = ("session_id", "email", "goal")
+SPEC_FIELDS = ("session_id", "email", "goal", "files", "next_action_webhook", "folder_id",
+               "idempotency_key", "incremental", "chunked")
+
+
+def _run_session(spec: dict) -> dict:
+    missing = [f for f in REQUIRED_FIELDS if not spec.get(f)]
+    if missing:
+        return {"status": "error", "error": f"Missing required fields: {', '.join(missing)}"}
+    data = {k: spec[k] for k in SPEC_FIELDS if k in spec}
+    started = time.monotonic()
+    try:
+        # per session, from when it is picked up ("deadline_seconds" in the spec)
+        data["deadline"] = request_deadline(data=spec)
+        with admission.admit(inventory_weight(data.get("files", []))):
+            result = process_assessment(data)
+    except AdmissionRejected as e:
+        return {"status": "rejected", "error": str(e), "retry_after": e.retry_after}
+    except Exception as e:
+        traceback.print_exc()
+        return {"status": "error", "error": str(e)}
+    return {"status": "ok", "result": result, "seconds": round(time.monotonic() - started, 2)}
+
+
+def run_batch(specs: list, workers: int = BATCH_WORKERS) -> dict:
+    """
+    Assess many sessions over a worker pool. A market lookup or narrative
+    with the same key is computed once and reused across the whole batch;
+    distinct prompts still go to the model as separate requests. Each
+    session succeeds or fails on its own. Heaviest inventories are started
+    first so one large client does not trail at the end of the run.
+    """
+    memos = {"market": SharedMemo(), "narrative": SharedMemo()}
+
+    def worker(spec):
+        def bound():
+            market_memo.set(memos["market"])
+            narrative_memo.set(memos["narrative"])
+            return _run_session(spec)
+        return copy_context().run(bound)
+
+    order = sorted(range(len(specs)), key=lambda i: -inventory_weight(specs[i].get("files", [])))
+    started = time.monotonic()
+    outcomes = [None] * len(specs)
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="batch") as pool:
+        futures = {i: pool.submit(worker, specs[i]) for i in order}
+        for i, future in futures.items():
+            outcomes[i] = {"session_id": specs[i].get("session_id"), **future.result()}
+
+    summary = {status: sum(1 for o in outcomes if o["status"] == status) for status in ("ok", "error", "rejected")}
+    print(f"[DEBUG] Batch of {len(specs)} sessions finished: {summary}", flush=True)
+    return {
+        "sessions": outcomes,
+        "summary": summary,
+        "shared": {name: memo.stats() for name, memo in memos.items()},
+        "seconds": round(time.monotonic() - started, 2),
+    }
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    sessions INTEGER NOT NULL,
+    pid INTEGER NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+"""
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class BatchJobs:
+    """
+    Background batch runs. ``submit`` records the job in SQLite and runs
+    ``run_batch`` on a thread, so the request returns at once instead of
+    holding a gunicorn worker past its timeout; ``get`` reports the job from
+    any worker. A job whose worker died before it finished reads as "lost".
+    """
+
+    def __init__(self, path=BATCH_JOBS_PATH, retention_seconds=BATCH_JOB_RETENTION_SECONDS):
+        self.path = path
+        self.retention_seconds = retention_seconds
+
+    def submit(self, specs: list) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with connect(self.path, _SCHEMA) as conn:
+            conn.execute("BEGIN")
+            conn.execute("DELETE FROM jobs WHERE finished_at < ?", (now - self.retention_seconds,))
+            conn.execute(
+                "INSERT INTO jobs (id, status, sessions, pid, created_at) VALUES (?, 'running', ?, ?, ?)",
+                (job_id, len(specs), os.getpid(), now),
+            )
+            conn.execute("COMMIT")
+        threading.Thread(target=self._run, args=(job_id, specs), name=f"batch-job-{job_id[:8]}", daemon=True).start()
+        print(f"[DEBUG] Batch job {job_id} started with {len(specs)} sessions", flush=True)
+        return job_id
+
+    def _run(self, job_id: str, specs: list) -> None:
+        try:
+            result, error, status = json.dumps(run_batch(specs), default=str), None, "done"
+        except Exception as e:
+            traceback.print_exc()
+            result, error, status = None, str(e), "failed"
+        with connect(self.path, _SCHEMA) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, result, error, time.time(), job_id),
+            )
+
+    def get(self, job_id: str):
+        with connect(self.path, _SCHEMA) as conn:
+            row = conn.execute(
+                "SELECT status, sessions, pid, result, error, created_at, finished_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        status, sessions, pid, result, error, created_at, finished_at = row
+        if status == "running" and not _pid_alive(pid):
+            status = "lost"
+        job = {"job_id": job_id, "status": status, "sessions": sessions,
+               "created_at": created_at, "finished_at": finished_at}
+        if result is not None:
+            job["result"] = json.loads(result)
+        if error:
+            job["error"] = error
+        return job
+
+
+batch_jobs = BatchJobs()
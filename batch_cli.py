@@ -0,0 +1,229 @@
+"""
+Assess many local inventories without the web service, e.g. for
+migrations and backfills:
+
+    python batch_cli.py inventories/ --local --summary backfill.csv
+    python batch_cli.py manifest.json --workers 4
+
+A directory holds one session per subdirectory (named after it) plus one
+session per inventory file directly inside it. A manifest is either JSON
+(the /batch_assessment body, or just its list of sessions) or CSV with
+``session_id`` and ``file`` columns and optional ``type``, ``goal`` and
+``email`` columns.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import ExitStack, redirect_stderr, redirect_stdout
+
+from admission import inventory_weight
+from batch import REQUIRED_FIELDS, SPEC_FIELDS
+from generate_assessment import OUTPUT_DIR, process_assessment
+from preload import reset_clients, warm
+from shared_work import SharedMemo, market_memo, narrative_memo
+from webhook_outbox import WEBHOOK_OUTBOX_ENABLED, webhook_outbox
+
+INVENTORY_EXTENSIONS = (".xlsx", ".xls")
+SUMMARY_FIELDS = ("session_id", "status", "seconds", "files", "outputs", "degraded", "error")
+
+
+def file_spec(path: str, file_type: str = "asset_inventory") -> dict:
+    """A ``files`` entry for a local inventory; ``asset_inventory`` lets its headers decide hardware vs software."""
+    return {"file_name": os.path.basename(path), "file_url": os.path.abspath(path), "type": file_type}
+
+
+def _inventories(directory):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.lower().endswith(INVENTORY_EXTENSIONS) and not name.startswith((".", "~$")))
+
+
+def _sessions_from_directory(directory, defaults):
+    specs = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isdir(path) and not name.startswith("."):
+            files = _inventories(path)
+            if files:
+                specs.append({**defaults, "session_id": name, "files": [file_spec(f) for f in files]})
+    for path in _inventories(directory):
+        session_id = os.path.splitext(os.path.basename(path))[0]
+        specs.append({**defaults, "session_id": session_id, "files": [file_spec(path)]})
+    return specs
+
+
+def _sessions_from_json(path, defaults):
+    with open(path) as fh:
+        data = json.load(fh)
+    sessions = data.get("sessions", []) if isinstance(data, dict) else data
+    base = os.path.dirname(os.path.abspath(path))
+    specs = []
+    for session in sessions:
+        files = []
+        for f in session.get("files", []):
+            # plain paths, or entries shaped like /start_assessment files
+            f = {"file_url": f} if isinstance(f, str) else dict(f)
+            f.setdefault("file_name", os.path.basename(f["file_url"]))
+            f.setdefault("type", "asset_inventory")
+            if not f["file_url"].startswith("http"):
+                f["file_url"] = os.path.join(base, f["file_url"])
+            files.append(f)
+        specs.append({**defaults, **session, "files": files})
+    return specs
+
+
+def _sessions_from_csv(path, defaults):
+    base = os.path.dirname(os.path.abspath(path))
+    sessions = {}
+    with open(path, newline="") as fh:
+        for row in csv.DictReader(fh):
+            spec = sessions.setdefault(row["session_id"], {**defaults, "session_id": row["session_id"], "files": []})
+            for field in ("goal", "email"):
+                if row.get(field):
+                    spec[field] = row[field]
+            spec["files"].append(file_spec(os.path.join(base, row["file"]), row.get("type") or "asset_inventory"))
+    return list(sessions.values())
+
+
+def discover_sessions(source: str, goal: str = "", email: str = "") -> list:
+    """Session specs (as for /batch_assessment) from an inventory directory or a JSON/CSV manifest."""
+    defaults = {"goal": goal, "email": email}
+    if os.path.isdir(source):
+        return _sessions_from_directory(source, defaults)
+    if source.lower().endswith(".csv"):
+        return _sessions_from_csv(source, defaults)
+    return _sessions_from_json(source, defaults)
+
+
+def _init_worker():
+    # sessions handled by the same worker share market lookups and narratives, as in /batch_assessment
+    market_memo.set(SharedMemo())
+    narrative_memo.set(SharedMemo())
+    reset_clients()
+
+
+def run_session(spec: dict, local_only: bool = False, log_dir: str = None) -> dict:
+    """Assess one session in a pool worker and return its summary row."""
+    session_id = spec.get("session_id")
+    row = {"session_id": session_id, "status": "error", "seconds": 0.0, "files": len(spec.get("files", [])),
+           "outputs": "", "degraded": "", "error": ""}
+    missing = [f for f in REQUIRED_FIELDS if not spec.get(f)]
+    if missing:
+        row["error"] = f"Missing required fields: {', '.join(missing)}"
+        return row
+    data = {k: spec[k] for k in SPEC_FIELDS if k in spec}
+    data["local_only"] = local_only
+    started = time.monotonic()
+    with ExitStack() as stack:
+        # each worker runs one session at a time, so its whole output belongs to this session
+        if log_dir:
+            log = stack.enter_context(open(os.path.join(log_dir, f"{session_id}.log"), "w"))
+            stack.enter_context(redirect_stdout(log))
+            stack.enter_context(redirect_stderr(log))
+        try:
+            result = process_assessment(data)
+        except Exception as e:
+            traceback.print_exc()
+            result = {"error": str(e)}
+    row["seconds"] = round(time.monotonic() - started, 2)
+    if not isinstance(result, dict) or result.get("error"):
+        row["error"] = str(result.get("error") if isinstance(result, dict) else result)
+        return row
+    degraded = result.get("diagnostics", {}).get("degraded", [])
+    row.update(status="ok", outputs=os.path.abspath(os.path.join(OUTPUT_DIR, session_id)),
+               degraded=",".join(sorted({entry["stage"] for entry in degraded})))
+    return row
+
+
+def run_sessions(specs: list, workers: int = None, local_only: bool = False, log_dir: str = None) -> list:
+    """
+    Assess ``specs`` over a pool of forked worker processes, heaviest
+    inventories first. Templates and the product catalog are loaded once
+    here and inherited by every worker.
+    """
+    warm()
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(specs)))
+    order = sorted(range(len(specs)), key=lambda i: -inventory_weight(specs[i].get("files", [])))
+    rows = [None] * len(specs)
+    # fork, so workers start from the warmed parent instead of re-importing everything
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+        futures = {pool.submit(run_session, specs[i], local_only, log_dir): i for i in order}
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            try:
+                rows[i] = future.result()
+            except Exception as e:  # the worker process itself died
+                rows[i] = {"session_id": specs[i].get("session_id"), "status": "error", "seconds": 0.0,
+                           "files": len(specs[i].get("files", [])), "outputs": "", "degraded": "", "error": repr(e)}
+            print(f"[{done}/{len(specs)}] {rows[i]['session_id']}: {rows[i]['status']} "
+                  f"in {rows[i]['seconds']}s {rows[i]['error']}".rstrip(), flush=True)
+    return rows
+
+
+def drain_outbox() -> dict:
+    """Deliver every due webhook, in passes until none is left; returns the combined counts."""
+    totals = {"delivered": 0, "retrying": 0, "failed": 0}
+    while True:
+        outcome = webhook_outbox.deliver_due()
+        for key, count in outcome.items():
+            totals[key] += count
+        # messages that failed are not due again until their backoff has passed
+        if not any(outcome.values()):
+            return totals
+
+
+def write_summary(rows: list, path: str) -> None:
+    with open(path, "w", newline="") as fh:
+        writer = csv.DictWriter(fh, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def format_summary(rows: list) -> str:
+    columns = ("session_id", "status", "seconds", "files", "degraded", "error")
+    table = [columns] + [tuple(str(row[c]) for c in columns) for row in rows]
+    widths = [min(60, max(len(line[i]) for line in table)) for i in range(len(columns))]
+    lines = ["  ".join(value[:60].ljust(width) for value, width in zip(line, widths)).rstrip() for line in table]
+    failed = sum(1 for row in rows if row["status"] != "ok")
+    total = sum(row["seconds"] for row in rows)
+    lines.append(f"{len(rows)} sessions, {failed} failed, {total:.1f}s of assessment time")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Assess local inventory files without the web service.")
+    parser.add_argument("source", help="inventory directory, or a JSON/CSV manifest")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--local", action="store_true",
+                        help="skip Drive uploads and webhooks; artifacts stay in temp_sessions/<session_id>")
+    parser.add_argument("--goal", default="Offline assessment", help="goal for sessions that do not set one")
+    parser.add_argument("--email", default="batch@localhost", help="email for sessions that do not set one")
+    parser.add_argument("--summary", default="batch_summary.csv", help="per-session timings and failures (CSV)")
+    parser.add_argument("--log-dir", default=None, help="write each session's log to <dir>/<session_id>.log")
+    args = parser.parse_args(argv)
+
+    specs = discover_sessions(args.source, args.goal, args.email)
+    if not specs:
+        print(f"No inventories found in {args.source}", file=sys.stderr)
+        return 2
+    started = time.monotonic()
+    rows = run_sessions(specs, args.workers, args.local, args.log_dir)
+    if not args.local and WEBHOOK_OUTBOX_ENABLED:
+        # anything still failing is retried by the service's dispatcher, which shares the outbox
+        print(f"[DEBUG] Webhook delivery: {drain_outbox()}", flush=True)
+    write_summary(rows, args.summary)
+    print(format_summary(rows))
+    print(f"Finished in {time.monotonic() - started:.1f}s; summary written to {args.summary}")
+    return 0 if all(row["status"] == "ok" for row in rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+import os
+from collections import Counter
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+# Rows per batch in chunked mode
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "50000"))
+# Switch to chunked mode automatically above this many inventory rows (0 disables)
+CHUNKED_AUTO_ROWS = int(os.getenv("CHUNKED_AUTO_ROWS", "200000"))
+# Rows kept in memory for the DOCX/PPTX tables and recommendation samples
+CHUNKED_SAMPLE_ROWS = int(os.getenv("CHUNKED_SAMPLE_ROWS", "200"))
+
+
+def estimate_rows(path: str) -> int:
+    """Cheap row count from the sheet dimensions (or line count for CSV)."""
+    if path.lower().endswith(".csv"):
+        with open(path, "rb") as fh:
+            return max(0, sum(1 for _ in fh) - 1)
+    try:
+        wb = load_workbook(path, read_only=True)
+    except Exception:
+        # formats openpyxl cannot open (e.g. legacy .xls) go through the in-memory path
+        return 0
+    try:
+        return max(0, (wb.active.max_row or 1) - 1)
+    finally:
+        wb.close()
+
+
+def iter_inventory_chunks(path: str, chunk_size: int = CHUNK_SIZE):
+    """
+    Stream an inventory file as DataFrames of at most ``chunk_size`` rows.
+    Only one batch of rows is materialised at a time.
+    """
+    if path.lower().endswith(".csv"):
+        for chunk in pd.read_csv(path, chunksize=chunk_size):
+            chunk.columns = chunk.columns.str.strip()
+            yield chunk
+        return
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c).strip() if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+        batch, offset = [], 0
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                yield pd.DataFrame(batch, columns=columns, index=range(offset, offset + len(batch)))
+                offset += len(batch)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns, index=range(offset, offset + len(batch)))
+    finally:
+        wb.close()
+
+
+class _Mean:
+    def __init__(self):
+        self.total, self.count = 0.0, 0
+
+    def add(self, series):
+        values = pd.to_numeric(series, errors="coerce").dropna()
+        self.total += float(values.sum())
+        self.count += len(values)
+
+    @property
+    def value(self):
+        return self.total / self.count if self.count else float("nan")
+
+
+class InventoryAccumulator:
+    """
+    Streaming replacement for the whole-frame section aggregates: counts,
+    means, EOL buckets, top-N names and a small sample of rows. Memory is
+    bounded by the number of distinct values, not the number of rows.
+    """
+
+    def __init__(self, sample_rows: int = CHUNKED_SAMPLE_ROWS):
+        self.sample_rows = sample_rows
+        self.rows = 0
+        self.columns = []
+        self.counts = {}
+        self.means = {}
+        self.max_users = None
+        self.vulnerabilities = 0
+        self.eol = Counter()
+        self.healthy = 0
+        self.not_expired = 0
+        self.high_risk = []
+        self.samples = []
+
+    COUNT_COLUMNS = ("Category", "Device Name", "App Name", "Tier", "Status",
+                     "License Status", "Vulnerability Severity")
+    MEAN_COLUMNS = ("Throughput (Mbps)", "Latency (ms)", "Uptime (%)")
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        if chunk.empty:
+            return
+        self.rows += len(chunk)
+        for col in chunk.columns:
+            if col not in self.columns:
+                self.columns.append(col)
+        for col in self.COUNT_COLUMNS:
+            if col in chunk.columns:
+                self.counts.setdefault(col, Counter()).update(chunk[col].dropna().tolist())
+        for col in self.MEAN_COLUMNS:
+            if col in chunk.columns:
+                self.means.setdefault(col, _Mean()).add(chunk[col])
+        if "Max Users" in chunk.columns:
+            chunk_max = pd.to_numeric(chunk["Max Users"], errors="coerce").max()
+            if pd.notna(chunk_max):
+                self.max_users = chunk_max if self.max_users is None else max(self.max_users, chunk_max)
+        if "Vulnerabilities" in chunk.columns:
+            self.vulnerabilities += int(pd.to_numeric(chunk["Vulnerabilities"], errors="coerce").fillna(0).sum())
+        if "End of Life (EOL)" in chunk.columns:
+            now = pd.Timestamp.now()
+            eol = chunk["End of Life (EOL)"]  # already datetime64 after normalize_values
+            self.eol.update({"active": int((eol > now).sum()), "past_eol": int((eol <= now).sum()),
+                             "unknown": int(eol.isna().sum())})
+        # same score column the whole-frame builders read
+        if "Tier Total Score" in chunk.columns:
+            scores = pd.to_numeric(chunk["Tier Total Score"], errors="coerce")
+            self.healthy += int((scores >= 4).sum())
+            if len(self.high_risk) < 100:
+                self.high_risk.extend(chunk[scores < 30].head(100 - len(self.high_risk)).to_dict(orient="records"))
+        if "License Status" in chunk.columns:
+            self.not_expired += int((chunk["License Status"] != "Expired").sum())
+        if len(self.samples) < self.sample_rows:
+            self.samples.extend(chunk.head(self.sample_rows - len(self.samples)).to_dict(orient="records"))
+
+    def value_counts(self, column: str, top: int = None) -> dict:
+        counter = self.counts.get(column)
+        if not counter:
+            return {}
+        return dict(counter.most_common(top))
+
+    def mean(self, column: str):
+        acc = self.means.get(column)
+        return acc.value if acc else None
+
+    def sample_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.samples, columns=self.columns)
+
+
+def chunked_section_summaries(hw: InventoryAccumulator, sw: InventoryAccumulator, recommendations: dict) -> list:
+    """
+    Build the same ``(section_name, summary)`` pairs as the whole-frame
+    ``build_*`` functions from streaming accumulators.
+    """
+    performance = {}
+    if sw.mean("Throughput (Mbps)") is not None:
+        performance["avg_throughput_mbps"] = sw.mean("Throughput (Mbps)")
+    if sw.mean("Latency (ms)") is not None:
+        performance["avg_latency_ms"] = sw.mean("Latency (ms)")
+    risks = {}
+    if "Tier Total Score" in hw.columns:
+        risks["hardware_risks"] = hw.high_risk
+    if "Tier Total Score" in sw.columns:
+        risks["software_risks"] = sw.high_risk
+    has_license = "License Status" in sw.columns
+    expired = int(sw.value_counts("License Status").get("Expired", 0))
+
+    return [
+        ("build_score_summary", {"text": f"Analyzed {hw.rows} hardware items and {sw.rows} software items."}),
+        ("build_section_2_overview", {
+            "total_devices": hw.rows,
+            "total_applications": sw.rows,
+            "healthy_devices": hw.healthy,
+            "compliant_licenses": sw.not_expired,
+        }),
+        ("build_section_3_inventory_hardware", {
+            "total_devices": hw.rows,
+            "by_category": hw.value_counts("Category"),
+            "top_5_devices": hw.value_counts("Device Name", 5),
+        }),
+        ("build_section_4_inventory_software", {
+            "total_apps": sw.rows,
+            "by_category": sw.value_counts("Category"),
+            "top_5_apps": sw.value_counts("App Name", 5),
+        }),
+        ("build_section_5_classification_distribution", {"classification_distribution": hw.value_counts("Category")}),
+        ("build_section_6_lifecycle_status", {
+            "active": hw.eol["active"], "past_eol": hw.eol["past_eol"], "unknown": hw.eol["unknown"]
+        }),
+        ("build_section_7_software_compliance", {
+            "compliant_count": sw.not_expired if has_license else 0,
+            "expired_count": expired if has_license else 0,
+        }),
+        ("build_section_8_security_posture", {
+            "total_vulnerabilities": hw.vulnerabilities,
+            "by_severity": hw.value_counts("Vulnerability Severity"),
+        }),
+        ("build_section_9_performance", performance),
+        ("build_section_10_reliability", {"avg_uptime_pct": sw.mean("Uptime (%)")}),
+        ("build_section_11_scalability", {
+            "max_supported_users": int(sw.max_users) if sw.max_users is not None else None
+        }),
+        ("build_section_12_legacy_technical_debt", {"legacy_issues": []}),
+        ("build_section_13_obsolete_risk", risks),
+        ("build_section_14_cloud_migration", {"cloud_migration": []}),
+        ("build_section_15_strategic_alignment", {"alignment": []}),
+        ("build_section_16_business_impact", {"business_impact": []}),
+        ("build_section_17_financial_implications", {"financial_implications": []}),
+        ("build_section_18_environmental_sustainability", {"environmental_sustainability": []}),
+        ("build_recommendations", recommendations),
+        ("build_section_20_next_steps", recommendations),
+    ]
+
+
+def narrow_path(path: str) -> str:
+    """Dot-prefixed sibling (never served) holding the rows written so far while a writer widens its header."""
+    directory, name = os.path.split(path)
+    stem, ext = os.path.splitext(name)
+    # same extension, since openpyxl picks its reader by it
+    return os.path.join(directory, f".{stem}.{os.getpid()}.narrow{ext}")
+
+
+class GapWorkbookWriter:
+    """
+    Append enriched chunks to a gap-analysis workbook in openpyxl's
+    write-only mode, so the sheet is never held in memory as a whole.
+    Rows go straight to the workbook under the columns seen so far. A chunk
+    with new columns (e.g. a later file with another header) widens the
+    header: the rows written until then are copied once into a fresh
+    workbook with blank cells for the new columns, which go at the end.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self.columns = []
+        self._wb = None
+        self._ws = None
+
+    def _start(self) -> None:
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet()
+        self._ws.append(self.columns)
+
+    def _widen(self, new_columns: list) -> None:
+        if self._wb is None:
+            self.columns += new_columns
+            self._start()
+            return
+        narrow = narrow_path(self.path)
+        self._wb.save(narrow)
+        self.columns += new_columns
+        self._start()
+        src = load_workbook(narrow, read_only=True)
+        try:
+            rows = src.active.iter_rows(values_only=True)
+            next(rows, None)  # the narrower header
+            for row in rows:
+                self._ws.append(list(row) + [None] * (len(self.columns) - len(row)))
+        finally:
+            src.close()
+            os.remove(narrow)
+        print(f"[DEBUG] Widened {os.path.basename(self.path)} by {len(new_columns)} columns "
+              f"after {self.rows} rows", flush=True)
+
+    def append(self, chunk: pd.DataFrame) -> None:
+        new_columns = [c for c in dict.fromkeys(chunk.columns) if c not in self.columns]
+        if new_columns or self._wb is None:
+            self._widen(new_columns)
+        aligned = chunk.reindex(columns=self.columns)
+        aligned = aligned.astype(object).where(aligned.notna(), None)
+        for row in aligned.itertuples(index=False, name=None):
+            self._ws.append([v.to_pydatetime() if isinstance(v, pd.Timestamp) else v for v in row])
+        self.rows += len(chunk)
+
+    def close(self) -> None:
+        if self._wb is None:
+            self._start()
+        self._wb.save(self.path)
@@ -0,0 +1,181 @@
+import io
+import mimetypes
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from artifact_store import make_artifact
+from chunked import narrow_path
+from dtype_compaction import DATE_COLUMNS
+from value_normalization import COMPLIANCE_FLAGS, RAM_COLUMN, STORAGE_GB_COLUMN, flag_column
+
+# Columnar companions of the gap workbooks: "parquet", "arrow" (IPC file) or "" to skip them
+COLUMNAR_FORMAT = os.getenv("COLUMNAR_FORMAT", "parquet").strip().lower()
+# Codec for both formats; uncompressed Arrow files can be memory-mapped without any copy
+COLUMNAR_COMPRESSION = os.getenv("COLUMNAR_COMPRESSION", "zstd").strip().lower() or None
+
+# Bumped whenever the column typing rules below change
+GAP_SCHEMA_VERSION = "1"
+
+EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow"}
+mimetypes.add_type("application/vnd.apache.parquet", ".parquet")
+mimetypes.add_type("application/vnd.apache.arrow.file", ".arrow")
+
+TIMESTAMP_COLUMNS = tuple(DATE_COLUMNS) + ("Recommended End of Life",)
+FLOAT_COLUMNS = (RAM_COLUMN, STORAGE_GB_COLUMN, "Estimated Price (USD)", "Match Score")
+INT_COLUMNS = ("Tier", "Score", "Lead Time (days)")
+FLAG_COLUMNS = tuple(flag_column(tag) for tag in COMPLIANCE_FLAGS)
+
+
+def column_type(name: str) -> pa.DataType:
+    """
+    The Arrow type of a gap-analysis column, decided by its name alone so
+    every chunk and every run of the same export share one schema.
+    """
+    if name in TIMESTAMP_COLUMNS:
+        return pa.timestamp("ms")
+    if name in FLOAT_COLUMNS:
+        return pa.float64()
+    if name in INT_COLUMNS:
+        return pa.int64()
+    if name in FLAG_COLUMNS:
+        return pa.bool_()
+    return pa.string()
+
+
+def gap_schema(columns, kind: str) -> pa.Schema:
+    return pa.schema(
+        [pa.field(str(name), column_type(str(name))) for name in columns],
+        metadata={"gap_schema_version": GAP_SCHEMA_VERSION, "kind": kind},
+    )
+
+
+def _column(series: pd.Series, type_: pa.DataType) -> pa.Array:
+    if pa.types.is_timestamp(type_):
+        values = pd.to_datetime(series, errors="coerce")
+    elif pa.types.is_floating(type_):
+        values = pd.to_numeric(series, errors="coerce").astype("float64")
+    elif pa.types.is_integer(type_):
+        values = pd.to_numeric(series, errors="coerce").round().astype("Int64")
+    elif pa.types.is_boolean(type_):
+        values = series.astype("boolean")
+    else:
+        values = series.astype(object).where(series.notna(), None)
+        values = values.map(lambda v: v if v is None or isinstance(v, str) else str(v))
+    return pa.array(values, type=type_, from_pandas=True)
+
+
+def to_gap_table(df: pd.DataFrame, kind: str, schema: pa.Schema = None) -> pa.Table:
+    """Convert an enriched frame to the stable gap schema (``schema`` fixes the layout, e.g. for later chunks)."""
+    schema = schema or gap_schema(df.columns, kind)
+    columns = []
+    for field in schema:
+        series = df[field.name] if field.name in df.columns else pd.Series([None] * len(df), index=df.index)
+        columns.append(_column(series, field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def columnar_name(workbook_name: str, fmt: str = COLUMNAR_FORMAT) -> str:
+    return os.path.splitext(workbook_name)[0] + EXTENSIONS[fmt]
+
+
+def _write(table: pa.Table, sink, fmt: str):
+    if fmt == "parquet":
+        pq.write_table(table, sink, compression=COLUMNAR_COMPRESSION or "none")
+    else:
+        options = pa.ipc.IpcWriteOptions(compression=COLUMNAR_COMPRESSION)
+        with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+
+
+def render_columnar(name: str, df: pd.DataFrame, kind: str, fmt: str = COLUMNAR_FORMAT):
+    """The enriched frame as an in-memory Parquet or Arrow artifact."""
+    buffer = io.BytesIO()
+    _write(to_gap_table(df, kind), buffer, fmt)
+    return make_artifact(name, buffer.getvalue())
+
+
+class ColumnarWriter:
+    """
+    Chunked-mode counterpart of ``GapWorkbookWriter``: writes each
+    enriched chunk as a row group (Parquet) or record batch (Arrow) as it
+    arrives. A chunk with new columns widens the schema; the batches
+    written until then are copied once into a fresh file with null columns
+    appended for them.
+    """
+
+    def __init__(self, path: str, kind: str, fmt: str = COLUMNAR_FORMAT):
+        self.path = path
+        self.kind = kind
+        self.fmt = fmt
+        self.schema = None
+        self.rows = 0
+        self._writer = None
+
+    def _open(self) -> None:
+        if self.fmt == "parquet":
+            self._writer = pq.ParquetWriter(self.path, self.schema, compression=COLUMNAR_COMPRESSION or "none")
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=COLUMNAR_COMPRESSION)
+            self._writer = pa.ipc.new_file(self.path, self.schema, options=options)
+
+    def _widen(self, new_columns: list) -> None:
+        known = self.schema.names if self.schema is not None else []
+        self.schema = gap_schema(known + new_columns, self.kind)
+        if self._writer is None:
+            self._open()
+            return
+        self._writer.close()
+        narrow = narrow_path(self.path)
+        os.replace(self.path, narrow)
+        self._open()
+        try:
+            with pa.memory_map(narrow) as source:
+                for batch in _batches(source, self.fmt):
+                    nulls = [pa.nulls(batch.num_rows, type=self.schema.field(name).type) for name in new_columns]
+                    self._writer.write_table(pa.Table.from_arrays(batch.columns + nulls, schema=self.schema))
+        finally:
+            os.remove(narrow)
+
+    def append(self, chunk: pd.DataFrame) -> None:
+        known = self.schema.names if self.schema is not None else []
+        new_columns = [c for c in dict.fromkeys(str(c) for c in chunk.columns) if c not in known]
+        if new_columns or self._writer is None:
+            self._widen(new_columns)
+        self._writer.write_table(to_gap_table(chunk, self.kind, self.schema))
+        self.rows += len(chunk)
+
+    def close(self) -> None:
+        if self._writer is None:
+            self.schema = gap_schema([], self.kind)
+            _write(pa.table({}, schema=self.schema), self.path, self.fmt)
+            return
+        self._writer.close()
+
+
+def _batches(source, fmt: str):
+    if fmt == "parquet":
+        yield from pq.ParquetFile(source).iter_batches()
+        return
+    reader = pa.ipc.open_file(source)
+    for i in range(reader.num_record_batches):
+        yield reader.get_batch(i)
+
+
+def read_gap_table(path: str) -> pa.Table:
+    """
+    Load a columnar gap file through a memory map. Uncompressed Arrow
+    files are used in place; Parquet and compressed Arrow are decoded
+    straight from the mapped pages.
+    """
+    if path.lower().endswith(".parquet"):
+        return pq.read_table(path, memory_map=True)
+    # the table's buffers keep the mapping alive after this returns
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+def read_gap_frame(path: str) -> pd.DataFrame:
+    # nullable integers stay integers instead of widening to float
+    return read_gap_table(path).to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
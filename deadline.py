@@ -0,0 +1,72 @@
+import math
+import os
+import time
+
+# Default time budget for one assessment in seconds (0 = none unless the caller sends one)
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "0"))
+# Request header carrying the caller's own timeout, in seconds
+DEADLINE_HEADER = "X-Request-Timeout"
+
+# Remaining seconds below which each stage degrades
+DEADLINE_CHARTS_SECONDS = float(os.getenv("DEADLINE_CHARTS_SECONDS", "60"))
+DEADLINE_NARRATIVE_BRIEF_SECONDS = float(os.getenv("DEADLINE_NARRATIVE_BRIEF_SECONDS", "120"))
+DEADLINE_NARRATIVE_LOCAL_SECONDS = float(os.getenv("DEADLINE_NARRATIVE_LOCAL_SECONDS", "45"))
+DEADLINE_UPLOAD_SECONDS = float(os.getenv("DEADLINE_UPLOAD_SECONDS", "20"))
+# Seconds kept back from every network call for the stages after it (reports, uploads, notify)
+DEADLINE_RESERVE_SECONDS = float(os.getenv("DEADLINE_RESERVE_SECONDS", "15"))
+
+
+class Deadline:
+    """
+    The point in time by which an assessment must answer. Wall-clock based,
+    so stages in worker processes see the same deadline as the request
+    thread. A deadline without a budget never runs short.
+    """
+
+    def __init__(self, budget_seconds: float = None, started: float = None):
+        self.budget_seconds = budget_seconds if budget_seconds and budget_seconds > 0 else None
+        self.started = started if started is not None else time.time()
+        self.expires_at = self.started + self.budget_seconds if self.budget_seconds else math.inf
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_seconds is not None
+
+    def remaining(self) -> float:
+        return self.expires_at - time.time()
+
+    def short(self, seconds: float) -> bool:
+        """Less than ``seconds`` left."""
+        return self.remaining() < seconds
+
+    def timeout(self, default: float = None, reserve: float = DEADLINE_RESERVE_SECONDS) -> float:
+        """A network timeout that leaves ``reserve`` seconds for what follows, capped at ``default``."""
+        if not self.enabled:
+            return default
+        bounded = max(1.0, self.remaining() - reserve)
+        return min(default, bounded) if default else bounded
+
+    def summary(self) -> dict:
+        remaining = self.remaining()
+        return {"budget_seconds": self.budget_seconds, "elapsed_seconds": round(time.time() - self.started, 3),
+                "remaining_seconds": round(remaining, 3), "met": remaining >= 0}
+
+
+def request_deadline(headers=None, data=None) -> Deadline:
+    """
+    The deadline for a request: the ``X-Request-Timeout`` header, else a
+    ``deadline_seconds`` field, else ``REQUEST_DEADLINE_SECONDS``. Raises
+    ``ValueError`` for a value that is not a number.
+    """
+    value = (headers or {}).get(DEADLINE_HEADER) or (data or {}).get("deadline_seconds")
+    return Deadline(float(value) if value not in (None, "") else REQUEST_DEADLINE_SECONDS)
+
+
+def record_deadline_degradation(diagnostics: dict, stage: str, mode: str, deadline: Deadline):
+    entry = {"stage": stage, "mode": mode, "reason": "deadline", "remaining_seconds": round(deadline.remaining(), 1)}
+    diagnostics.setdefault("degraded", []).append(entry)
+    print(f"[WARN] Deadline: {stage} degraded to {mode} ({entry['remaining_seconds']}s left)", flush=True)
+
+
+def deadline_degraded(diagnostics: dict) -> bool:
+    return any(entry.get("reason") == "deadline" for entry in diagnostics.get("degraded", []))
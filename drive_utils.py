@@ -1,60 +1,56 @@
 import os
 import re
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload
 from googleapiclient.discovery import build
 from google.oauth2 import service_account
 
 # Path to your service account JSON key
 SERVICE_ACCOUNT_FILE = "/etc/secrets/service_account.json"
 
-# Authenticate and construct the Drive API client if credentials exist
-if os.path.exists(SERVICE_ACCOUNT_FILE):
-    creds = service_account.Credentials.from_service_account_file(
+def _build_drive_service():
+    """Authenticate and construct the Drive API client if credentials exist."""
+    if not os.path.exists(SERVICE_ACCOUNT_FILE):
+        return None, None
+    credentials = service_account.Credentials.from_service_account_file(
         SERVICE_ACCOUNT_FILE,
         scopes=["https://www.googleapis.com/auth/drive"]
     )
-    drive_service = build('drive', 'v3', credentials=creds)
-else:
-    creds = None
-    drive_service = None
+    return credentials, build('drive', 'v3', credentials=credentials)
 
-def upload_to_drive(file_path: str, file_name: str, folder_identifier: str) -> str:
-    """
-    Upload a local file to Google Drive, using either a folder name or a folder ID.
+creds, drive_service = _build_drive_service()
 
-    :param file_path: Local path to the file
-    :param file_name: Name to assign to the file in Drive
-    :param folder_identifier: Drive folder ID or folder name
-    :return: webViewLink for the uploaded file
-    """
-    if drive_service is None:
-        print("[WARN] Drive service not configured; returning local path", flush=True)
-        return file_path
+def reset_drive_service():
+    """Rebuild the client in a forked worker; its HTTP connection must not be shared with the parent."""
+    global creds, drive_service
+    creds, drive_service = _build_drive_service()
 
+def drive_configured() -> bool:
+    """Whether uploads go to Drive; without credentials the upload helpers return local paths."""
+    return drive_service is not None
+
+def _resolve_folder_id(folder_identifier: str) -> str:
     # Determine if the identifier is a Drive folder ID (alphanumeric, "-" or "_", ~20+ chars)
     if re.fullmatch(r"[A-Za-z0-9_-]{20,}", folder_identifier):
-        folder_id = folder_identifier
-    else:
-        # Look up a folder by name
-        query = (
-            f"name='{folder_identifier}' and mimeType='application/vnd.google-apps.folder' "
-            "and trashed = false"
-        )
-        resp = drive_service.files().list(q=query, fields="files(id, name)").execute()
-        files = resp.get('files', [])
-        if files:
-            folder_id = files[0]['id']
-        else:
-            # Create the folder if not found
-            metadata = {
-                'name': folder_identifier,
-                'mimeType': 'application/vnd.google-apps.folder'
-            }
-            created = drive_service.files().create(body=metadata, fields="id").execute()
-            folder_id = created.get('id')
+        return folder_identifier
+    # Look up a folder by name
+    query = (
+        f"name='{folder_identifier}' and mimeType='application/vnd.google-apps.folder' "
+        "and trashed = false"
+    )
+    resp = drive_service.files().list(q=query, fields="files(id, name)").execute()
+    files = resp.get('files', [])
+    if files:
+        return files[0]['id']
+    # Create the folder if not found
+    metadata = {
+        'name': folder_identifier,
+        'mimeType': 'application/vnd.google-apps.folder'
+    }
+    created = drive_service.files().create(body=metadata, fields="id").execute()
+    return created.get('id')
 
-    # Upload the file into the resolved folder
-    media = MediaFileUpload(file_path, resumable=True)
+def _upload_media(media, file_name: str, folder_identifier: str) -> str:
+    folder_id = _resolve_folder_id(folder_identifier)
     file_metadata = {
         'name': file_name,
         'parents': [folder_id]
@@ -74,3 +70,32 @@ def upload_to_drive(file_path: str, file_name: str, folder_identifier: str) -> s
 
     print(f"[UPLOAD] '{file_name}' uploaded to folder '{folder_identifier}' (ID: {folder_id})")
     return uploaded.get('webViewLink', '')
+
+def upload_to_drive(file_path: str, file_name: str, folder_identifier: str) -> str:
+    """
+    Upload a local file to Google Drive, using either a folder name or a folder ID.
+
+    :param file_path: Local path to the file
+    :param file_name: Name to assign to the file in Drive
+    :param folder_identifier: Drive folder ID or folder name
+    :return: webViewLink for the uploaded file
+    """
+    if drive_service is None:
+        print("[WARN] Drive service not configured; returning local path", flush=True)
+        return file_path
+    return _upload_media(MediaFileUpload(file_path, resumable=True), file_name, folder_identifier)
+
+def upload_stream_to_drive(stream, file_name: str, folder_identifier: str, mimetype: str,
+                           local_path: str = None) -> str:
+    """
+    Upload an in-memory buffer to Google Drive without writing it to disk first.
+
+    :param stream: File-like object positioned at the start of the content
+    :param local_path: Where the artifact will be persisted locally; returned
+        in place of a link when Drive is not configured
+    :return: webViewLink for the uploaded file
+    """
+    if drive_service is None:
+        print("[WARN] Drive service not configured; returning local path", flush=True)
+        return local_path or file_name
+    return _upload_media(MediaIoBaseUpload(stream, mimetype=mimetype, resumable=True), file_name, folder_identifier)
@@ -0,0 +1,103 @@
+import numbers
+
+import pandas as pd
+
+# Columns that hold dates in the client inventory exports
+DATE_COLUMNS = ["Purchase Date", "Warranty Expiry Date", "End of Life (EOL)"]
+
+# Columns that are always worth a categorical, whatever their cardinality
+CATEGORICAL_COLUMNS = [
+    "Category", "Vendor", "Availability", "Status", "License Status",
+    "Recommended Model", "Classification Tier"
+]
+
+# A text column becomes categorical when it has at most this share of unique values
+CATEGORY_MAX_RATIO = 0.5
+
+
+def memory_bytes(df: pd.DataFrame) -> int:
+    """Deep memory footprint of a DataFrame, including string payloads."""
+    if df is None or df.empty:
+        return 0
+    return int(df.memory_usage(deep=True).sum())
+
+
+def _is_text(series: pd.Series) -> bool:
+    return series.dtype == object or pd.api.types.is_string_dtype(series.dtype)
+
+
+def _compact_series(name: str, series: pd.Series) -> pd.Series:
+    if isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(series.dtype):
+        return series
+
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return pd.to_numeric(series, downcast="integer")
+    # floats stay float64: float32 would turn a 4599.99 cost into 4599.990234 in the exports
+    if not _is_text(series):
+        return series
+
+    non_null = series.dropna()
+    if non_null.empty:
+        return series
+
+    if name in DATE_COLUMNS:
+        parsed = pd.to_datetime(series, errors="coerce", format="mixed")
+        # only switch when nearly every populated cell is a real date
+        if parsed.notna().sum() >= 0.9 * len(non_null):
+            return parsed
+        return series
+
+    # numbers that were upcast to object by cell-by-cell writes; digit strings
+    # (serials, asset tags with leading zeros) are identifiers and stay text
+    if non_null.map(lambda v: isinstance(v, numbers.Number) and not isinstance(v, bool)).all():
+        numeric = pd.to_numeric(series, errors="coerce")
+        integral = not numeric.isna().any() and (numeric % 1 == 0).all()
+        return pd.to_numeric(numeric, downcast="integer") if integral else numeric.astype("float64")
+
+    if non_null.map(type).eq(str).all():
+        if name in CATEGORICAL_COLUMNS or series.nunique(dropna=True) <= CATEGORY_MAX_RATIO * len(series):
+            return series.astype("category")
+    return series
+
+
+def compact_frame(df: pd.DataFrame):
+    """
+    Return a compacted copy of an inventory frame and a memory report.
+
+    Low-cardinality strings become categoricals, integers are downcast and
+    known date columns become datetime64. Floats are left at full precision.
+    """
+    before = memory_bytes(df)
+    if df is None or df.empty:
+        return df, {"before_bytes": before, "after_bytes": before}
+    compacted = pd.DataFrame(
+        {col: _compact_series(col, df[col]) for col in df.columns},
+        index=df.index,
+    )
+    after = memory_bytes(compacted)
+    return compacted, {"before_bytes": before, "after_bytes": after}
+
+
+def observed_counts(series: pd.Series, **kwargs) -> pd.Series:
+    """``value_counts`` without the zero entries a categorical keeps for categories no row uses any more."""
+    counts = series.value_counts(**kwargs)
+    return counts[counts > 0]
+
+
+def classification_lookup(classification_df: pd.DataFrame) -> pd.DataFrame:
+    """Index the classification matrix by ``Score`` so rows only carry their tier."""
+    return classification_df.set_index("Score", drop=False)
+
+
+def attach_classification(df: pd.DataFrame, lookup: pd.DataFrame, tier_column: str) -> pd.DataFrame:
+    """
+    Expand the classification details for export. Equivalent to the old
+    per-row merge, but done once at the edge instead of carried through the
+    whole pipeline.
+    """
+    if df is None or df.empty or tier_column not in df.columns:
+        return df
+    details = lookup.reindex(pd.to_numeric(df[tier_column], errors="coerce").to_numpy())
+    details.index = df.index
+    details = details.drop(columns=[c for c in details.columns if c in df.columns])
+    return pd.concat([df, details], axis=1)
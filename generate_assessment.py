@@ -1,12 +1,20 @@
 import os
 import json
+import hashlib
 import pandas as pd
 import requests
 import openai
 import shutil
-from market_lookup import suggest_hw_replacements, suggest_sw_replacements
-from visualization import generate_visual_charts
-from drive_utils import upload_to_drive
+import threading
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from market_lookup import (
+    suggest_hw_replacements, suggest_sw_replacements, name_columns, HW_NAME_PATTERNS, SW_NAME_PATTERNS
+)
+from visualization import generate_visual_charts, generate_count_charts
+from drive_utils import drive_configured, upload_to_drive, upload_stream_to_drive
+from artifact_store import ARTIFACT_PERSIST, Artifact, ArtifactStore, open_artifact, render_artifact
 
 # Backwards compatibility for tests expecting `upload_file_to_drive`
 upload_file_to_drive = upload_to_drive
@@ -15,61 +23,88 @@ from pptx import Presentation
 from pptx.util import Inches
 from report_docx import generate_docx_report
 from report_pptx import generate_pptx_report
+from report_service import render_reports
+from chunked import (
+    CHUNK_SIZE, CHUNKED_AUTO_ROWS, GapWorkbookWriter, InventoryAccumulator,
+    chunked_section_summaries, estimate_rows, iter_inventory_chunks
+)
+from dtype_compaction import compact_frame, classification_lookup, attach_classification, observed_counts
+from incremental import INCREMENTAL_MODE, incremental_store, enrich_incremental
+from schema_resolver import apply_schema, resolve_schema
+from value_normalization import STORAGE_GB_COLUMN, flag_column, normalize_values
+from session_storage import SessionStorage
+from stage_graph import StageGraph
+from profiling import follow, profile_run
+from preload import preloading, shared_frame
+from webhook_outbox import WEBHOOK_OUTBOX_ENABLED, webhook_outbox
+from openai_limiter import openai_limiter
+from deadline import (
+    DEADLINE_CHARTS_SECONDS, DEADLINE_NARRATIVE_BRIEF_SECONDS, DEADLINE_NARRATIVE_LOCAL_SECONDS,
+    DEADLINE_UPLOAD_SECONDS, REQUEST_DEADLINE_SECONDS, Deadline, deadline_degraded, record_deadline_degradation
+)
+from local_narrative import is_trivial, local_narrative
+from single_flight import COALESCE_ENABLED, SingleFlight, request_fingerprint
+from columnar import COLUMNAR_FORMAT, ColumnarWriter, columnar_name, render_columnar
+from memory_budget import (
+    DOCX_SUMMARY_ROWS, MemoryMonitor, estimate_rows_mb, estimate_table_mb, fits_budget, record_degradation
+)
+from shared_work import memoized, narrative_memo
+from result_cache import (
+    RESULT_CACHE_ENABLED, result_cache, input_fingerprint, idempotency_fingerprint
+)
 
 TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "templates")
 OUTPUT_DIR = "temp_sessions"
+session_storage = SessionStorage(OUTPUT_DIR)
+single_flight = SingleFlight(OUTPUT_DIR)
 
 # Service endpoints
 DOCX_SERVICE_URL = os.getenv("DOCX_SERVICE_URL", "https://docx-generator-api.onrender.com")
 MARKET_GAP_WEBHOOK = os.getenv("MARKET_GAP_WEBHOOK", "https://market-gap-analysis.onrender.com/start_market_gap")
+DOCX_SERVICE_TIMEOUT = float(os.getenv("DOCX_SERVICE_TIMEOUT", "90"))
+# Public origin of this service, prefixed to the /files links of uploads deferred past a deadline
+ARTIFACT_BASE_URL = os.getenv("ARTIFACT_BASE_URL", "").rstrip("/")
+# Completion cap for narratives shortened to meet a deadline
+NARRATIVE_BRIEF_TOKENS = int(os.getenv("NARRATIVE_BRIEF_TOKENS", "200"))
 
 # Cache templates at import time (only once)
 print("[DEBUG] Loading template spreadsheets into memory...", flush=True)
-HW_BASE_DF = pd.read_excel(os.path.join(TEMPLATES_DIR, "HWGapAnalysis.xlsx"))
-SW_BASE_DF = pd.read_excel(os.path.join(TEMPLATES_DIR, "SWGapAnalysis.xlsx"))
-CLASSIFICATION_DF = pd.read_excel(os.path.join(TEMPLATES_DIR, "ClassificationTier.xlsx"))
+def _lookup_frame(name):
+    df = pd.read_excel(os.path.join(TEMPLATES_DIR, name))
+    # Arrow-backed and read-only only when a preloading master shares them with forked workers
+    return shared_frame(df) if preloading() else df
+
+HW_BASE_DF = _lookup_frame("HWGapAnalysis.xlsx")
+SW_BASE_DF = _lookup_frame("SWGapAnalysis.xlsx")
+CLASSIFICATION_DF = _lookup_frame("ClassificationTier.xlsx")
 print("[DEBUG] Templates cached successfully", flush=True)
 
-# Load classification matrix (cached at import time)
-CLASSIFICATION_DF = pd.read_excel(os.path.join(TEMPLATES_DIR, "ClassificationTier.xlsx"))
+# Classification details are looked up by tier rather than copied onto every row
+CLASSIFICATION_LOOKUP = classification_lookup(CLASSIFICATION_DF)
 
 # Category names from the classification matrix
 CATEGORY_COLUMNS = ['Scalability', 'Security', 'Reliability', 'Performance', 'Cost-Effectiveness']
 
-def find_id_column(df, candidates):
-    """
-    Given a DataFrame and a list of candidate header names (case‐insensitive),
-    return the first matching actual column name, or any column ending in 'id',
-    or None if nothing is found.
-    """
-    # map lowercase→actual names
-    lower_map = {col.lower(): col for col in df.columns}
-    # 1) explicit candidates
-    for cand in candidates:
-        if cand.lower() in lower_map:
-            return lower_map[cand.lower()]
-    # 2) any column that ends with 'id'
-    for col in df.columns:
-        if col.lower().endswith("id"):
-            return col
-    return None
+# Compliance flags that earn the top security score
+SECURITY_TAGS = ("PCI", "HIPAA", "SOC2")
 
 def compute_tier_score(row):
-    # 1) Scalability: based on RAM and storage
+    # Reads the typed columns produced by normalize_values; nothing is re-parsed here
+    # 1) Scalability: based on RAM and storage (both in GB)
     ram = row.get("RAM (GB)", 0)
-    storage = row.get("Storage Capacity (Raw & Usable)", 0)
+    storage = row.get(STORAGE_GB_COLUMN, 0)
+    ram = 0 if pd.isna(ram) else ram
+    storage = 0 if pd.isna(storage) else storage
     # assume max observed values are RAM=512 GB, Storage=100 TB → normalize to 0–100
     scalability_score = min(5, (ram / 512 * 100) + (storage / (100 * 1024) * 100))
 
     # 2) Security: based on presence of compliance tags
-    tags = str(row.get("Compliance Tags", ""))
-    security_score = 5 if any(t.strip() in tags for t in ("PCI", "HIPAA", "SOC2")) else 3
+    security_score = 5 if any(row.get(flag_column(t), False) for t in SECURITY_TAGS) else 3
 
     # 3) Reliability: based on Warranty Expiry
     reliab = 0
     if pd.notna(row.get("Warranty Expiry Date")):
-        expiry = pd.to_datetime(row["Warranty Expiry Date"])
-        reliab = 5 if expiry >= pd.Timestamp.today() else 3
+        reliab = 5 if row["Warranty Expiry Date"] >= pd.Timestamp.today() else 3
 
     # 4) Performance: based on CPU specs (e.g. Xeon)
     cpu = str(row.get("Processor / CPU Specs", "")).lower()
@@ -78,8 +113,7 @@ def compute_tier_score(row):
     # 5) Cost-Effectiveness: based on age or EOL proximity
     cost = 0
     if pd.notna(row.get("End of Life (EOL)")):
-        eol = pd.to_datetime(row["End of Life (EOL)"])
-        days_past = (pd.Timestamp.today() - eol).days
+        days_past = (pd.Timestamp.today() - row["End of Life (EOL)"]).days
         cost = max(0, 5 - days_past / 365 * 20)  # lose 20 points per year past EOL
     else:
         cost = 5
@@ -90,6 +124,36 @@ def compute_tier_score(row):
     best = diffs.idxmin()
     return int(CLASSIFICATION_DF.at[best, "Score"])
 
+def score_rows(df):
+    """Add ``Tier Total Score`` to an enriched inventory frame."""
+    df["Tier Total Score"] = df.apply(compute_tier_score, axis=1)
+    # default any new (market-only) rows to 5
+    df["Tier Total Score"] = df["Tier Total Score"].fillna(5)
+    return df
+
+def enrich_and_score(df, suggest_fn, kind, incremental=False):
+    """
+    Drop rows without an identifier, enrich them with market data and score
+    them. In incremental mode rows already seen with identical name columns
+    reuse their stored enrichment; scoring always re-runs because the tier
+    depends on today's date (warranty and EOL).
+    """
+    # 1) only keep real inventory rows
+    id_col = resolve_schema(tuple(df.columns), kind).id_column
+    real = df[df[id_col].notna()] if id_col else df.copy()
+
+    # 2) enrich with market data and compute true Tier Total Score
+    if incremental:
+        patterns = HW_NAME_PATTERNS if kind == "hardware" else SW_NAME_PATTERNS
+        enriched, _ = enrich_incremental(real, kind, name_columns(real.columns, patterns), suggest_fn)
+    else:
+        enriched = suggest_fn(real)
+    enriched = score_rows(enriched)
+    print(f"[DEBUG] {kind.capitalize()} after replacements shape {enriched.shape}", flush=True)
+    if "Tier Total Score" in enriched.columns:
+        print(f"[DEBUG] Final Tier Total Score values: {enriched['Tier Total Score'].unique()}", flush=True)
+    return enriched
+
 # Section builder functions
 
 def build_score_summary(hw_df, sw_df):
@@ -109,16 +173,16 @@ def build_section_2_overview(hw_df, sw_df):
     }
 
 def build_section_3_inventory_hardware(hw_df, sw_df):
-    counts = hw_df.get("Category", pd.Series()).value_counts().to_dict()
-    top5 = hw_df.get("Device Name", pd.Series()).value_counts().head(5).to_dict()
+    counts = observed_counts(hw_df.get("Category", pd.Series())).to_dict()
+    top5 = observed_counts(hw_df.get("Device Name", pd.Series())).head(5).to_dict()
     return {
         "total_devices": len(hw_df),
         "by_category": counts,
         "top_5_devices": top5
     }
 def build_section_4_inventory_software(hw_df, sw_df):
-    counts = sw_df.get("Category", pd.Series()).value_counts().to_dict()
-    top5 = sw_df.get("App Name", pd.Series()).value_counts().head(5).to_dict()
+    counts = observed_counts(sw_df.get("Category", pd.Series())).to_dict()
+    top5 = observed_counts(sw_df.get("App Name", pd.Series())).head(5).to_dict()
     return {
         "total_apps": len(sw_df),
         "by_category": counts,
@@ -126,13 +190,13 @@ def build_section_4_inventory_software(hw_df, sw_df):
     }
 
 def build_section_5_classification_distribution(hw_df, sw_df):
-    dist = hw_df.get("Category", pd.Series()).value_counts().to_dict()
+    dist = observed_counts(hw_df.get("Category", pd.Series())).to_dict()
     return {"classification_distribution": dist}
 
 def build_section_6_lifecycle_status(hw_df, sw_df):
     now = pd.Timestamp.now()
     if "End of Life (EOL)" in hw_df.columns:
-        eol = pd.to_datetime(hw_df["End of Life (EOL)"], errors="coerce")
+        eol = hw_df["End of Life (EOL)"]
         return {
             "active": int((eol > now).sum()),
             "past_eol": int((eol <= now).sum()),
@@ -153,7 +217,7 @@ def build_section_8_security_posture(hw_df, sw_df):
         total = int(hw_df["Vulnerabilities"].fillna(0).sum())
         by_severity = {}
         if "Vulnerability Severity" in hw_df.columns:
-            by_severity = hw_df["Vulnerability Severity"].value_counts(dropna=True).to_dict()
+            by_severity = observed_counts(hw_df["Vulnerability Severity"], dropna=True).to_dict()
         return {"total_vulnerabilities": total, "by_severity": by_severity}
     return {"total_vulnerabilities": 0, "by_severity": {}}
 
@@ -212,22 +276,108 @@ def build_recommendations(hw_df, sw_df):
 def build_section_20_next_steps(hw_df, sw_df):
     return build_recommendations(hw_df, sw_df)
 
-def ai_narrative(section_name: str, summary: dict) -> str:
+SECTION_FUNCS = [
+    build_score_summary, build_section_2_overview, build_section_3_inventory_hardware,
+    build_section_4_inventory_software, build_section_5_classification_distribution,
+    build_section_6_lifecycle_status, build_section_7_software_compliance,
+    build_section_8_security_posture, build_section_9_performance,
+    build_section_10_reliability, build_section_11_scalability,
+    build_section_12_legacy_technical_debt, build_section_13_obsolete_risk,
+    build_section_14_cloud_migration, build_section_15_strategic_alignment,
+    build_section_16_business_impact, build_section_17_financial_implications,
+    build_section_18_environmental_sustainability, build_recommendations,
+    build_section_20_next_steps
+]
+
+def classify_inventory(file_meta: dict, columns) -> str:
+    """Decide whether an inventory file holds hardware or software rows."""
+    # — Override based on filename keywords —
+    file_type = file_meta.get("type", "").lower()
+    name_lower = file_meta["file_name"].lower()
+    if any(k in name_lower for k in ("server", "device", "asset")):
+        file_type = "hardware"
+    elif any(k in name_lower for k in ("application", "app", "software")):
+        file_type = "software"
+
+    # — Classify using the cached header schema; software is the fallback —
+    if file_type == "hardware" or (file_type == "asset_inventory" and resolve_schema(tuple(columns), "hardware").id_column):
+        return "hardware"
+    return "software"
+
+def prepare_for_reports(df):
+    """Ensure the chart and report code sees "Tier" and "Status"."""
+    df = df.rename(columns={"Tier Total Score": "Tier"})
+    if "Availability" in df.columns:
+        df["Status"] = df["Availability"]
+    return df
+
+def stream_inventories(downloaded, hw_xl, sw_xl, incremental=False, chunk_size=CHUNK_SIZE):
+    """
+    Chunked mode: enrich and score each inventory file in batches of
+    ``chunk_size`` rows, fold every batch into streaming accumulators and
+    append it to the gap-analysis workbooks and their columnar companions.
+    Peak memory is bounded by the chunk size rather than the inventory size.
+    Returns both accumulators and the columnar file paths.
+    """
+    accumulators = {"hardware": InventoryAccumulator(), "software": InventoryAccumulator()}
+    writers = {"hardware": GapWorkbookWriter(hw_xl), "software": GapWorkbookWriter(sw_xl)}
+    columnar = {}
+    if COLUMNAR_FORMAT:
+        columnar = {"hardware": ColumnarWriter(columnar_name(hw_xl), "hardware"),
+                    "software": ColumnarWriter(columnar_name(sw_xl), "software")}
+    for f, local in downloaded:
+        kind = None
+        for chunk in iter_inventory_chunks(local, chunk_size):
+            kind = kind or classify_inventory(f, chunk.columns)
+            chunk, _ = apply_schema(chunk, kind)
+            chunk = normalize_values(chunk)
+            suggest_fn = suggest_hw_replacements if kind == "hardware" else suggest_sw_replacements
+            enriched = enrich_and_score(chunk, suggest_fn, kind, incremental)
+            enriched = prepare_for_reports(enriched)
+            accumulators[kind].add(enriched)
+            classified = attach_classification(enriched, CLASSIFICATION_LOOKUP, "Tier")
+            writers[kind].append(classified)
+            if kind in columnar:
+                columnar[kind].append(classified)
+        print(f"[DEBUG] Streamed {f['file_name']} as {kind} ({accumulators[kind].rows if kind else 0} rows so far)", flush=True)
+    for writer in (*writers.values(), *columnar.values()):
+        writer.close()
+    return accumulators["hardware"], accumulators["software"], [writer.path for writer in columnar.values()]
+
+def _complete(messages, **options):
+    """One chat completion within the shared rate limits, falling back to the older model."""
+    try:
+        resp = openai_limiter.complete("gpt-4o-mini", messages, temperature=0.3, **options)
+    except (openai.RateLimitError, openai.NotFoundError):
+        resp = openai_limiter.complete("gpt-3.5-turbo", messages, temperature=0.3, **options)
+    return resp.choices[0].message.content.strip()
+
+def ai_narrative(section_name: str, summary: dict, brief: bool = False, timeout: float = None) -> str:
+    """
+    The narrative for one section. ``brief`` (when short of time) writes a
+    single capped completion from the first chunk of data; ``timeout``
+    bounds each call.
+    """
     print(f"[DEBUG] ai_narrative called for section {section_name} with summary keys: {list(summary.keys())}", flush=True)
-    
+    options = {"timeout": timeout} if timeout else {}
+    if brief:
+        options["max_tokens"] = NARRATIVE_BRIEF_TOKENS
+
     # chunk large lists to avoid rate limits
     list_items = [(k, v) for k, v in summary.items() if isinstance(v, list)]
     if list_items:
         largest_key, largest_list = max(list_items, key=lambda x: len(x[1]))
-        total = len(largest_list)
         chunk_size = 20
+        if brief:
+            largest_list = largest_list[:chunk_size]
+        total = len(largest_list)
         narratives = []
         for i in range(0, total, chunk_size):
             sublist = largest_list[i:i+chunk_size]
             chunked_summary = dict(summary)
             chunked_summary[largest_key] = sublist
             label = f" (chunk {i//chunk_size+1})" if total > chunk_size else ""
-            user_content = f"Section: {section_name}{label}\nData: {json.dumps(chunked_summary)}"
+            user_content = f"Section: {section_name}{label}\nData: {json.dumps(chunked_summary, default=str)}"
             messages = [
                 {"role": "system", "content": (
                     "You are a senior IT transformation advisor. "
@@ -235,23 +385,11 @@ def ai_narrative(section_name: str, summary: dict) -> str:
                 )},
                 {"role": "user", "content": user_content}
             ]
-            try:
-                resp = openai.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=messages,
-                    temperature=0.3
-                )
-            except (openai.RateLimitError, openai.NotFoundError):
-                resp = openai.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=messages,
-                    temperature=0.3
-                )
-            narratives.append(resp.choices[0].message.content.strip())
+            narratives.append(_complete(messages, **options))
         return "\n\n".join(narratives)
 
     # small summary
-    user_content = f"Section: {section_name}\nData: {json.dumps(summary)}"
+    user_content = f"Section: {section_name}\nData: {json.dumps(summary, default=str)}"
     messages = [
         {"role": "system", "content": (
             "You are a senior IT transformation advisor. "
@@ -259,33 +397,410 @@ def ai_narrative(section_name: str, summary: dict) -> str:
         )},
         {"role": "user", "content": user_content}
     ]
+    return _complete(messages, **options)
+
+# Pipeline stages; generate_assessment wires them into a StageGraph
+
+def _stage_load_inventories(downloaded):
+    hw_parts, sw_parts = [], []
+    for f, local in downloaded:
+        name = f['file_name']
+        df_temp = pd.read_excel(local)
+
+        # strip whitespace so our header matching works
+        df_temp.columns = df_temp.columns.str.strip()
+        print(f"[DEBUG] Cleaned columns: {df_temp.columns.tolist()}", flush=True)
+        print(f"[DEBUG] Read {name} into DataFrame with shape {df_temp.shape}", flush=True)
+
+        # map export-specific headers onto canonical field names
+        kind = classify_inventory(f, df_temp.columns)
+        df_temp, schema = apply_schema(df_temp, kind)
+        if schema.renames:
+            print(f"[DEBUG] Resolved {name} headers: {schema.renames}", flush=True)
+        # type dates, capacities and compliance tags once, up front
+        df_temp = normalize_values(df_temp)
+        if kind == "hardware":
+            hw_parts.append(df_temp)
+            print(f"[DEBUG] Appended {name} to hw_df (hardware)", flush=True)
+        else:
+            sw_parts.append(df_temp)
+            print(f"[DEBUG] Appended {name} to sw_df (software)", flush=True)
+    # concatenate once rather than growing a copy per file
+    hw_df = pd.concat(hw_parts, ignore_index=True) if hw_parts else pd.DataFrame()
+    sw_df = pd.concat(sw_parts, ignore_index=True) if sw_parts else pd.DataFrame()
+    return hw_df, sw_df
+
+def _stage_enrich(kind, df, incremental, diagnostics):
+    if not df.empty:
+        suggest_fn = suggest_hw_replacements if kind == "hardware" else suggest_sw_replacements
+        df = enrich_and_score(df, suggest_fn, kind, incremental)
+
+    # compact dtypes; classification details stay in CLASSIFICATION_LOOKUP
+    # keyed by tier and are only expanded when the gap Excels are written
+    df, mem = compact_frame(df)
+    diagnostics.setdefault("memory", {})[kind] = mem
+    print(f"[DEBUG] Compacted {kind} inventory {df.shape}: {mem}", flush=True)
+    if "Category" in df.columns:
+        print(f"[DEBUG] {kind} Categories: {observed_counts(df['Category']).to_dict()}", flush=True)
+    return prepare_for_reports(df)
+
+def _stage_enrich_hardware(hw_raw, incremental, diagnostics):
+    return _stage_enrich("hardware", hw_raw, incremental, diagnostics)
+
+def _stage_enrich_software(sw_raw, incremental, diagnostics):
+    return _stage_enrich("software", sw_raw, incremental, diagnostics)
+
+def _stage_stream(downloaded, hw_xl, sw_xl, incremental, diagnostics):
+    hw_acc, sw_acc, columnar_files = stream_inventories(downloaded, hw_xl, sw_xl, incremental)
+    diagnostics["chunked"] = {"hardware_rows": hw_acc.rows, "software_rows": sw_acc.rows}
+    # reports and recommendations only ever see a bounded sample of rows
+    return hw_acc, sw_acc, hw_acc.sample_frame(), sw_acc.sample_frame(), [hw_xl, sw_xl], columnar_files
+
+def _stage_charts(hw_df, sw_df, session_path, deadline):
+    # None rather than {} so upload_charts records the skip (this may run in a worker process)
+    if deadline.short(DEADLINE_CHARTS_SECONDS):
+        return None
+    print(f"[DEBUG] Generating visual charts", flush=True)
+    return generate_visual_charts(hw_df, sw_df, session_path, in_memory=True)
+
+def _stage_count_charts(hw_acc, sw_acc, session_path, deadline):
+    if deadline.short(DEADLINE_CHARTS_SECONDS):
+        return None
+    print(f"[DEBUG] Generating visual charts from streamed counts", flush=True)
+    return generate_count_charts(
+        {col: hw_acc.value_counts(col) for col in ("Tier", "Status") if hw_acc.value_counts(col)},
+        {col: sw_acc.value_counts(col) for col in ("Tier", "Status") if sw_acc.value_counts(col)},
+        session_path,
+        in_memory=True,
+    )
+
+def _stage_summaries(hw_df, sw_df):
+    return [(func.__name__, func(hw_df, sw_df)) for func in SECTION_FUNCS]
+
+def _stage_chunked_summaries(hw_acc, sw_acc, hw_df, sw_df):
+    return chunked_section_summaries(hw_acc, sw_acc, build_recommendations(hw_df, sw_df))
+
+def _stage_gap_excels(hw_df, sw_df, hw_xl, sw_xl):
+    return [
+        render_artifact(os.path.basename(path),
+                        lambda buf, df=df: attach_classification(df, CLASSIFICATION_LOOKUP, "Tier").to_excel(buf, index=False))
+        for df, path in ((hw_df, hw_xl), (sw_df, sw_xl))
+    ]
+
+def _stage_gap_columnar(hw_df, sw_df, hw_xl, sw_xl):
+    """Typed Parquet/Arrow companions of the gap workbooks for Market-Gap and reruns."""
+    if not COLUMNAR_FORMAT:
+        return []
+    return [
+        render_columnar(columnar_name(os.path.basename(path)),
+                        attach_classification(df, CLASSIFICATION_LOOKUP, "Tier"), kind)
+        for kind, df, path in (("hardware", hw_df, hw_xl), ("software", sw_df, sw_xl))
+    ]
+
+def upload_artifact(item, artifacts, folder_id):
+    """
+    Upload an in-memory artifact straight from its buffer (registering it
+    for persistence), or a file that only exists on disk.
+    """
+    if isinstance(item, Artifact):
+        if not drive_configured():
+            # the local path stands in for the link, so it must exist before anyone is told about it
+            return keep_local(item, artifacts)
+        artifacts.put(item)
+        return upload_stream_to_drive(open_artifact(item), os.path.basename(item.name), folder_id,
+                                      item.mimetype, local_path=artifacts.path(item.name))
+    return upload_file_to_drive(item, os.path.basename(item), folder_id)
+
+def keep_local(item, artifacts):
+    """Write an in-memory artifact to the session folder; returns the absolute path of the local copy."""
+    if isinstance(item, Artifact):
+        artifacts.put(item)
+        item = artifacts.persist([item.name])[0]
+    return os.path.abspath(item)
+
+def defer_upload(item, artifacts, deferred_uploads):
+    """
+    Write the artifact to the session folder now and queue its Drive upload
+    for after the response; the link points at /files until then.
+    """
+    name = os.path.relpath(keep_local(item, artifacts), artifacts.session_dir)
+    deferred_uploads.append(item)
+    return f"{ARTIFACT_BASE_URL}/files/{os.path.basename(artifacts.session_dir)}/{name}"
+
+def _uploader(stage, artifacts, folder_id, deadline, diagnostics, deferred_uploads, local_only):
+    """
+    ``upload_artifact`` for one stage; ``keep_local`` for offline runs, or
+    ``defer_upload`` once the deadline is too close for Drive.
+    """
+    if local_only:
+        return lambda item: keep_local(item, artifacts)
+    if not deadline.short(DEADLINE_UPLOAD_SECONDS):
+        return lambda item: upload_artifact(item, artifacts, folder_id)
+    record_deadline_degradation(diagnostics, stage, "deferred", deadline)
+    return lambda item: defer_upload(item, artifacts, deferred_uploads)
+
+def _stage_upload_charts(chart_paths, artifacts, folder_id, deadline, diagnostics, deferred_uploads,
+                         local_only):
+    if chart_paths is None:
+        record_deadline_degradation(diagnostics, "charts", "skipped", deadline)
+        return {}
+    upload = _uploader("upload_charts", artifacts, folder_id, deadline, diagnostics, deferred_uploads, local_only)
+    uploaded_charts = {}
+    for chart_name, chart in chart_paths.items():
+        uploaded_charts[f"{chart_name}_url"] = upload(chart)
+    print(f"[DEBUG] Uploaded charts: {uploaded_charts}", flush=True)
+    return uploaded_charts
+
+def _stage_narrative(index, summaries, incremental, deadline, diagnostics):
+    section_name, summary = summaries[index]
+    stage = f"narrative_{index}"
+    # sections with next to nothing to say are written by rules, without a model call
+    if is_trivial(summary):
+        diagnostics.setdefault("local_narratives", []).append(section_name)
+        return local_narrative(section_name, summary)
+    narrative = incremental_store.get_narrative(section_name, summary) if incremental else None
+    if narrative is not None:
+        print(f"[DEBUG] Reusing narrative for unchanged section {section_name}", flush=True)
+        return narrative
+    if deadline.short(DEADLINE_NARRATIVE_LOCAL_SECONDS):
+        record_deadline_degradation(diagnostics, stage, "template", deadline)
+        return local_narrative(section_name, summary)
+    # keep enough of the budget for the reports and uploads after this call
+    options = {"timeout": deadline.timeout()} if deadline.enabled else {}
     try:
-        resp = openai.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            temperature=0.3
+        if deadline.short(DEADLINE_NARRATIVE_BRIEF_SECONDS):
+            record_deadline_degradation(diagnostics, stage, "brief", deadline)
+            # degraded narratives are neither shared across a batch nor kept for reuse
+            return ai_narrative(section_name, summary, brief=True, **options)
+        # identical sections across a batch are written once
+        key = (section_name, json.dumps(summary, sort_keys=True, default=str))
+        narrative = memoized(narrative_memo, key, lambda: ai_narrative(section_name, summary, **options))
+    except openai.APITimeoutError:
+        if not deadline.enabled:
+            raise
+        record_deadline_degradation(diagnostics, stage, "template", deadline)
+        return local_narrative(section_name, summary)
+    if incremental:
+        incremental_store.put_narrative(section_name, summary, narrative)
+    return narrative
+
+def _stage_collect_narratives(**parts):
+    return {f"content_{i + 1}": parts[f"narrative_{i}"] for i in range(len(parts))}
+
+def _stage_reports(session_id, email, goal, uploaded_charts, narratives, chart_paths, hw_df, sw_df, diagnostics,
+                   deadline, local_only):
+    chart_paths = chart_paths or {}
+    # python-docx holds every table cell as XML; past the budget only the first rows are tabulated
+    table_rows = None
+    table_mb = estimate_table_mb(hw_df, sw_df)
+    if not fits_budget(table_mb):
+        table_rows = DOCX_SUMMARY_ROWS
+        record_degradation(diagnostics, "reports", f"summary tables ({table_rows} rows)", table_mb)
+    payload = {"session_id": session_id, "email": email, "goal": goal, **uploaded_charts, **narratives}
+    print(f"[DEBUG] Payload assembled with keys: {list(payload.keys())}", flush=True)
+    # Send to DOCX/PPTX generator (single endpoint) or fall back to local generation
+    def remote_reports():
+        resp = requests.post(
+            f"{DOCX_SERVICE_URL}/generate_assessment", json=payload,
+            timeout=deadline.timeout(DOCX_SERVICE_TIMEOUT)
         )
-    except (openai.RateLimitError, openai.NotFoundError):
-        resp = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
-            temperature=0.3
-        )
-    return resp.choices[0].message.content.strip()
-
-def generate_assessment(session_id: str, email: str, goal: str, files: list, next_action_webhook: str, folder_id: str = "") -> dict:
+        if hasattr(resp, "raise_for_status"):
+            resp.raise_for_status()
+        resp_data = resp.json() if hasattr(resp, "json") else {}
+        if not resp_data.get('docx_url'):
+            raise ValueError("docx missing")
+        return resp_data.get('docx_url'), resp_data.get('pptx_url')
+
+    # bound here, on the stage thread, so a profiled run also samples the report threads
+    docx_report, pptx_report = follow(generate_docx_report), follow(generate_pptx_report)
+
+    def local_reports():
+        # the two documents do not depend on each other
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="local-report") as pool:
+            docx = pool.submit(docx_report, session_id, hw_df, sw_df, chart_paths, as_artifact=True,
+                               max_table_rows=table_rows)
+            pptx = pool.submit(pptx_report, session_id, hw_df, sw_df, chart_paths, as_artifact=True)
+            return docx.result(), pptx.result()
+
+    # the report service answers with Drive links, which an offline run must not produce
+    if local_only:
+        return local_reports()
+    return render_reports(remote_reports, local_reports)
+
+GAP_UPLOAD_EXTENSIONS = (".xlsx", ".xls", ".docx", ".pptx", ".parquet", ".arrow")
+
+def _stage_upload_files(items, upload):
+    """Upload the Excel, Word and PowerPoint artifacts or files among ``items`` for Market-Gap."""
+    links = []
+    for item in items:
+        name = item.name if isinstance(item, Artifact) else item
+        # skip remote links, missing files and any PNG/chart files
+        if not isinstance(name, str) or not name.lower().endswith(GAP_UPLOAD_EXTENSIONS):
+            continue
+        if not isinstance(item, Artifact) and not os.path.isfile(item):
+            continue
+        links.append({"file_name": os.path.basename(name), "drive_url": upload(item)})
+    return links
+
+def _stage_upload_gap_excels(gap_files, artifacts, folder_id, deadline, diagnostics, deferred_uploads,
+                             local_only):
+    upload = _uploader("upload_gap_excels", artifacts, folder_id, deadline, diagnostics, deferred_uploads, local_only)
+    return _stage_upload_files(gap_files, upload)
+
+def _stage_upload_columnar(columnar_files, artifacts, folder_id, deadline, diagnostics, deferred_uploads,
+                           local_only):
+    upload = _uploader("upload_columnar", artifacts, folder_id, deadline, diagnostics, deferred_uploads, local_only)
+    return _stage_upload_files(columnar_files, upload)
+
+def _stage_upload_inputs(downloaded, artifacts, folder_id, deadline, diagnostics, deferred_uploads,
+                         local_only):
+    upload = _uploader("upload_inputs", artifacts, folder_id, deadline, diagnostics, deferred_uploads, local_only)
+    return _stage_upload_files([local for _, local in downloaded], upload)
+
+def _stage_upload_reports(report_urls, artifacts, folder_id, deadline, diagnostics, deferred_uploads,
+                          local_only):
+    upload = _uploader("upload_reports", artifacts, folder_id, deadline, diagnostics, deferred_uploads, local_only)
+    # local rendering yields artifacts; the remote service yields links that need no upload
+    return _stage_upload_files([item for item in report_urls if item], upload)
+
+def _stage_persist(artifacts, uploaded_charts, gap_links, columnar_links, report_links):
+    """Write the run's artifacts to the session folder for /files serving, off the critical path."""
+    if not ARTIFACT_PERSIST:
+        return []
+    written = artifacts.persist()
+    print(f"[DEBUG] Persisted {len(written)} artifacts", flush=True)
+    return written
+
+def _stage_notify(session_id, folder_id, next_action_webhook, uploaded_charts, input_links, gap_links, columnar_links,
+                  report_links, persisted, diagnostics, local_only):
+    # "persisted" only orders this stage after the session folder is written: links may point into it
+    files_for_gap = input_links + gap_links + columnar_links + report_links
+    print(f"[DEBUG] files_for_gap built with {len(files_for_gap)} items", flush=True)
+    market_payload = {
+        "session_id": session_id,
+        "folder_id": folder_id,
+        "gpt_module": "it_assessment",
+        "status": "complete",
+        "files": files_for_gap,
+        "charts": uploaded_charts,
+    }
+    if local_only:
+        print("[DEBUG] Local-only run; market-gap is not notified", flush=True)
+        diagnostics["notification"] = {"status": "skipped"}
+        return market_payload
+    print(f"[DEBUG] Notifying market-gap with payload: {market_payload}", flush=True)
+    url = next_action_webhook or MARKET_GAP_WEBHOOK
+    if WEBHOOK_OUTBOX_ENABLED:
+        # delivered (with retries) by the outbox dispatcher; an outage never fails the run
+        diagnostics["notification"] = webhook_outbox.enqueue(url, market_payload)
+        return market_payload
+    resp = requests.post(url, json=market_payload)
+    if hasattr(resp, "raise_for_status"):
+        resp.raise_for_status()
+    print("[DEBUG] Market-gap notified successfully", flush=True)
+    return market_payload
+
+def build_assessment_graph(chunked: bool) -> StageGraph:
+    """
+    The assessment pipeline as a dependency graph. Ingestion differs between
+    the in-memory and chunked modes; everything after it is shared.
+    """
+    graph = StageGraph()
+    if chunked:
+        graph.add("stream_inventories", _stage_stream,
+                  inputs=("downloaded", "hw_xl", "sw_xl", "incremental", "diagnostics"),
+                  outputs=("hw_acc", "sw_acc", "hw_df", "sw_df", "gap_files", "columnar_files"))
+        graph.add("charts", _stage_count_charts, inputs=("hw_acc", "sw_acc", "session_path", "deadline"),
+                  outputs=("chart_paths",), pool="process")
+        graph.add("summaries", _stage_chunked_summaries, inputs=("hw_acc", "sw_acc", "hw_df", "sw_df"),
+                  outputs=("summaries",))
+    else:
+        graph.add("load_inventories", _stage_load_inventories, inputs=("downloaded",),
+                  outputs=("hw_raw", "sw_raw"))
+        graph.add("enrich_hardware", _stage_enrich_hardware, inputs=("hw_raw", "incremental", "diagnostics"),
+                  outputs=("hw_df",))
+        graph.add("enrich_software", _stage_enrich_software, inputs=("sw_raw", "incremental", "diagnostics"),
+                  outputs=("sw_df",))
+        graph.add("charts", _stage_charts, inputs=("hw_df", "sw_df", "session_path", "deadline"),
+                  outputs=("chart_paths",), pool="process")
+        graph.add("summaries", _stage_summaries, inputs=("hw_df", "sw_df"), outputs=("summaries",))
+        graph.add("gap_excels", _stage_gap_excels, inputs=("hw_df", "sw_df", "hw_xl", "sw_xl"),
+                  outputs=("gap_files",), pool="process")
+        graph.add("gap_columnar", _stage_gap_columnar, inputs=("hw_df", "sw_df", "hw_xl", "sw_xl"),
+                  outputs=("columnar_files",))
+
+    # uploads past the deadline are deferred into "deferred_uploads"; "local_only" runs keep everything on disk
+    uploads = ("artifacts", "folder_id", "deadline", "diagnostics", "deferred_uploads", "local_only")
+    graph.add("upload_charts", _stage_upload_charts, inputs=("chart_paths",) + uploads,
+              outputs=("uploaded_charts",))
+    for i in range(len(SECTION_FUNCS)):
+        graph.add(f"narrative_{i}", partial(_stage_narrative, i),
+                  inputs=("summaries", "incremental", "deadline", "diagnostics"), outputs=(f"narrative_{i}",))
+    graph.add("narratives", _stage_collect_narratives,
+              inputs=tuple(f"narrative_{i}" for i in range(len(SECTION_FUNCS))), outputs=("narratives",))
+    graph.add("reports", _stage_reports,
+              inputs=("session_id", "email", "goal", "uploaded_charts", "narratives", "chart_paths", "hw_df", "sw_df",
+                      "diagnostics", "deadline", "local_only"),
+              outputs=("report_urls",))
+    graph.add("upload_inputs", _stage_upload_inputs, inputs=("downloaded",) + uploads, outputs=("input_links",))
+    graph.add("upload_gap_excels", _stage_upload_gap_excels, inputs=("gap_files",) + uploads, outputs=("gap_links",))
+    graph.add("upload_columnar", _stage_upload_columnar, inputs=("columnar_files",) + uploads,
+              outputs=("columnar_links",))
+    graph.add("upload_reports", _stage_upload_reports, inputs=("report_urls",) + uploads, outputs=("report_links",))
+    graph.add("persist_artifacts", _stage_persist,
+              inputs=("artifacts", "uploaded_charts", "gap_links", "columnar_links", "report_links"),
+              outputs=("persisted",))
+    graph.add("notify", _stage_notify,
+              inputs=("session_id", "folder_id", "next_action_webhook", "uploaded_charts",
+                      "input_links", "gap_links", "columnar_links", "report_links", "persisted", "diagnostics",
+                      "local_only"),
+              outputs=("market_payload",))
+    return graph
+
+def upload_deferred(session_id, folder_id, next_action_webhook, artifacts, items, pinned):
+    """
+    Upload what a deadline pushed past the response, then send Market-Gap the
+    Drive links as a follow-up. ``pinned`` holds the session pin taken for it.
+    """
+    links = []
+    with pinned:
+        for item in items:
+            name = item.name if isinstance(item, Artifact) else item
+            try:
+                links.append({"file_name": os.path.basename(name),
+                              "drive_url": upload_artifact(item, artifacts, folder_id)})
+            except Exception as e:
+                print(f"[WARN] Deferred upload of {name} failed: {e}", flush=True)
+    print(f"[DEBUG] Uploaded {len(links)} of {len(items)} deferred files for session {session_id}", flush=True)
+    if links and WEBHOOK_OUTBOX_ENABLED:
+        webhook_outbox.enqueue(next_action_webhook or MARKET_GAP_WEBHOOK, {
+            "session_id": session_id,
+            "folder_id": folder_id,
+            "gpt_module": "it_assessment",
+            "status": "uploads_complete",
+            "files": links,
+        })
+    return links
+
+def generate_assessment(session_id: str, email: str, goal: str, files: list, next_action_webhook: str, folder_id: str = "",
+                        idempotency_key: str = "", incremental: bool = False, chunked: bool = None,
+                        deadline: Deadline = None, local_only: bool = False) -> dict:
     print(f"[DEBUG] Starting generate_assessment for session {session_id}", flush=True)
+    deadline = deadline or Deadline(REQUEST_DEADLINE_SECONDS)
+    if RESULT_CACHE_ENABLED and idempotency_key:
+        cached = result_cache.get(idempotency_fingerprint(session_id, idempotency_key))
+        if cached is not None:
+            print(f"[DEBUG] Serving cached result for Idempotency-Key {idempotency_key}", flush=True)
+            return cached
     try:
-        hw_df, sw_df = pd.DataFrame(), pd.DataFrame()
         session_path = os.path.join(OUTPUT_DIR, session_id)
         os.makedirs(session_path, exist_ok=True)
         print(f"[DEBUG] Session path created: {session_path}", flush=True)
 
-        uploaded_charts = {}
-        # ensure file_links always exists, even if no DOCX/PPTX are generated
-        file_links = {}
+        diagnostics = {}
 
         # Download files
+        downloaded, file_hashes = [], []
         for f in files:
             name, url = f['file_name'], f['file_url']
             # skip anything that isn’t an inventory Excel sheet
@@ -298,232 +813,115 @@ def generate_assessment(session_id: str, email: str, goal: str, files: list, nex
             if url.startswith("http"):
                 r = requests.get(url)
                 r.raise_for_status()
-                open(local, "wb").write(r.content)
+                content = r.content
             else:
-                with open(url, "rb") as src, open(local, "wb") as dst:
-                    dst.write(src.read())
+                with open(url, "rb") as src:
+                    content = src.read()
+            with open(local, "wb") as dst:
+                dst.write(content)
+            file_hashes.append(hashlib.sha256(content).hexdigest())
+            downloaded.append((f, local))
             print(f"[DEBUG] Downloaded and wrote {name}", flush=True)
-            df_temp = pd.read_excel(local)
-            
-            # strip whitespace so our header matching works
-            df_temp.columns = df_temp.columns.str.strip()
-            print(f"[DEBUG] Cleaned columns: {df_temp.columns.tolist()}", flush=True)
-            print(f"[DEBUG] Read {name} into DataFrame with shape {df_temp.shape}", flush=True)
-            
-            # — Override based on filename keywords —
-            # initialise file_type from the metadata and lowercase filename
-            file_type = f.get("type", "").lower()
-            name_lower = name.lower()
 
-            # (optional) also rebuild your header‐map if you need it later
-            lower = {c.lower(): c for c in df_temp.columns}
-
-            if any(k in name_lower for k in ("server", "device", "asset")):
-                file_type = "hardware"
-            elif any(k in name_lower for k in ("application", "app", "software")):
-                file_type = "software"
-
-            # — Classify into hardware or software using flexible ID‐column detection —
-            hw_candidates = [
-                "Name","Device Name","Asset ID","Asset Name",
-                "Server Name","Server ID","Device ID","ID"
-            ]
-            sw_candidates = [
-                "Name","Application Name","Software","Software Name",
-                "App ID","Application","App Name"
-            ]
-
-            hw_id = find_id_column(df_temp, hw_candidates)
-            sw_id = find_id_column(df_temp, sw_candidates)
-
-            if file_type == "hardware" or (file_type == "asset_inventory" and hw_id):
-                hw_df = pd.concat([hw_df, df_temp], ignore_index=True)
-                print(f"[DEBUG] Appended to hw_df (hardware), new shape {hw_df.shape}", flush=True)
-
-            elif file_type == "software" or (file_type == "asset_inventory" and sw_id):
-                sw_df = pd.concat([sw_df, df_temp], ignore_index=True)
-                print(f"[DEBUG] Appended to sw_df (software), new shape {sw_df.shape}", flush=True)
-
-            else:
-                # Final fallback to software
-                sw_df = pd.concat([sw_df, df_temp], ignore_index=True)
-                print(f"[DEBUG] Fallback appended to sw_df, new shape {sw_df.shape}", flush=True)
-                
-         # 1) enrich with market data
-            hw_candidates = ["Name", "Device Name", "Asset ID", "Asset Name","Server Name", "Server ID", "Device ID", "ID"]
-            hw_id_col = find_id_column(hw_df, hw_candidates)
-            if hw_id_col:
-                real_hw = hw_df[hw_df[hw_id_col].notna()]
-            else:
-                real_hw = hw_df.copy()
-            hw_df = suggest_hw_replacements(real_hw)
-            print(f"[DEBUG] Hardware after replacements shape {hw_df.shape}", flush=True)
-
-        # 2) compute true Tier Total Score for inventory rows
-            hw_df["Tier Total Score"] = hw_df.apply(compute_tier_score, axis=1)
-
-        # 3) default any new (market-only) rows to 5
-            hw_df["Tier Total Score"] = hw_df["Tier Total Score"].fillna(5)
-            print(f"[DEBUG] Final Tier Total Score values: {hw_df['Tier Total Score'].unique()}", flush=True)
-
-        # 4) merge in classification details (only if we computed scores)
-        if "Tier Total Score" in hw_df.columns:
-            hw_df = hw_df.merge(
-            CLASSIFICATION_DF,
-            how="left",
-            left_on="Tier Total Score",
-            right_on="Score"
-            )
-        else:
-            print("[DEBUG] No Tier Total Score in hw_df—skipping classification merge", flush=True)
-    
-        if not sw_df.empty:
-            print(f"[DEBUG] Running software replacements on sw_df", flush=True)
-        # 1) enrich with market data
-            sw_candidates = ["Name", "Application Name", "Software", "Software Name","App ID", "Application", "App Name"]
-            sw_id_col = find_id_column(sw_df, sw_candidates)
-            if sw_id_col:
-                real_sw = sw_df[sw_df[sw_id_col].notna()]
-            else:
-                real_sw = sw_df.copy()
-            sw_df = suggest_sw_replacements(real_sw)
-            print(f"[DEBUG] Software after replacements shape {sw_df.shape}", flush=True)
-
-        # 2) compute true Tier Total Score for inventory rows
-            sw_df["Tier Total Score"] = sw_df.apply(compute_tier_score, axis=1)
-
-        # 3) default any new (market-only) rows to 5
-            sw_df["Tier Total Score"] = sw_df["Tier Total Score"].fillna(5)
-            print(f"[DEBUG] Final Tier Total Score values: {sw_df['Tier Total Score'].unique()}", flush=True)
-
-        # 4) merge in classification details (only if we computed scores)
-        if "Tier Total Score" in sw_df.columns:
-            sw_df = sw_df.merge(
-            CLASSIFICATION_DF,
-            how="left",
-            left_on="Tier Total Score",
-            right_on="Score"
-            )
-        else:
-            print("[DEBUG] No Tier Total Score in sw_df—skipping classification merge", flush=True)
-
-        # Generate visual charts
-        print(f"[DEBUG] Pre-chart hw_df shape: {hw_df.shape}", flush=True)
-        print(f"[DEBUG] Pre-chart sw_df shape: {sw_df.shape}", flush=True)
-        if "Tier Total Score" in hw_df.columns:
-            print(f"[DEBUG] hw_df Tier scores: {hw_df['Tier Total Score'].unique()}", flush=True)
-        if "Tier Total Score" in sw_df.columns:
-            print(f"[DEBUG] sw_df Tier scores: {sw_df['Tier Total Score'].unique()}", flush=True)
-        if "Category" in hw_df.columns:
-            print(f"[DEBUG] hw_df Categories: {hw_df['Category'].value_counts().to_dict()}", flush=True)
-        if "Category" in sw_df.columns:
-            print(f"[DEBUG] sw_df Categories: {sw_df['Category'].value_counts().to_dict()}", flush=True)
-        # … debug prints …
-        print(f"[DEBUG] Generating visual charts", flush=True)
-        # ensure the pie-chart code sees "Tier" and "Status"
-        hw_df = hw_df.rename(columns={"Tier Total Score": "Tier"})
-        sw_df = sw_df.rename(columns={"Tier Total Score": "Tier"})
-        if "Availability" in hw_df.columns:
-            hw_df["Status"] = hw_df["Availability"]
-        if "Availability" in sw_df.columns:
-            sw_df["Status"] = sw_df["Availability"]
-        
-        chart_paths = generate_visual_charts(hw_df, sw_df, session_path)
-        uploaded_charts = {}
-        for chart_name, chart_path in chart_paths.items():
-            chart_url = upload_file_to_drive(chart_path, os.path.basename(chart_path), folder_id)
-            uploaded_charts[f"{chart_name}_url"] = chart_url
-            print(f"[DEBUG] Uploaded charts: {uploaded_charts}", flush=True)
-
-        # 5) Build narratives
-        section_funcs = [
-            build_score_summary, build_section_2_overview, build_section_3_inventory_hardware,
-            build_section_4_inventory_software, build_section_5_classification_distribution,
-            build_section_6_lifecycle_status, build_section_7_software_compliance,
-            build_section_8_security_posture, build_section_9_performance,
-            build_section_10_reliability, build_section_11_scalability,
-            build_section_12_legacy_technical_debt, build_section_13_obsolete_risk,
-            build_section_14_cloud_migration, build_section_15_strategic_alignment,
-            build_section_16_business_impact, build_section_17_financial_implications,
-            build_section_18_environmental_sustainability, build_recommendations,
-            build_section_20_next_steps
-        ]
-        narratives = {}
-        for i, func in enumerate(section_funcs):
-            narratives[f"content_{i+1}"] = ai_narrative(func.__name__, func(hw_df, sw_df))
-
-        # 6) Write gap-analysis Excels
-        hw_xl = os.path.join(session_path, "HWGapAnalysis.xlsx")
-        sw_xl = os.path.join(session_path, "SWGapAnalysis.xlsx")
-        hw_df.to_excel(hw_xl, index=False)
-        sw_df.to_excel(sw_xl, index=False)
-
-        # Assemble payload
-        payload = {"session_id": session_id, "email": email, "goal": goal, **uploaded_charts, **narratives}
-        print(f"[DEBUG] Payload assembled with keys: {list(payload.keys())}", flush=True)
-        # Send to DOCX/PPTX generator (single endpoint) or fall back to local generation
-        docx_url = pptx_url = None
-        try:
-            resp = requests.post(f"{DOCX_SERVICE_URL}/generate_assessment", json=payload)
-            if hasattr(resp, "raise_for_status"):
-                resp.raise_for_status()
-            resp_data = resp.json() if hasattr(resp, "json") else {}
-            docx_url = resp_data.get('docx_url')
-            pptx_url = resp_data.get('pptx_url')
-            if not docx_url:
-                raise ValueError("docx missing")
-        except Exception:
-            docx_url = generate_docx_report(session_id, hw_df, sw_df, uploaded_charts)
-            pptx_url = generate_pptx_report(session_id, hw_df, sw_df, uploaded_charts)
-        
-        # 8) Collect and upload only XLSX/DOCX/PPTX for Market-Gap
-        files_for_gap = []
-        for fname in os.listdir(session_path):
-            local_path = os.path.join(session_path, fname)
-            # skip directories and any PNG/chart files
-            if not os.path.isfile(local_path):
-                continue
-            # only pick Excel, Word or PowerPoint
-            if not fname.lower().endswith((".xlsx", ".xls", ".docx", ".pptx")):
-                continue
-            drive_url = upload_file_to_drive(local_path, fname, folder_id)
-            files_for_gap.append({"file_name": fname, "drive_url": drive_url})
-        print(f"[DEBUG] files_for_gap built with {len(files_for_gap)} items", flush=True)
-                        
-        # 11) Notify Market-Gap
-        try:
-            market_payload = {
+        # Serve repeated runs over identical inputs from the result cache
+        cache_keys = []
+        if RESULT_CACHE_ENABLED:
+            cache_keys.append(input_fingerprint(
+                session_id, goal, file_hashes, email=email, folder_id=folder_id,
+                next_action_webhook=next_action_webhook, incremental=incremental, chunked=chunked,
+                local_only=local_only))
+            if idempotency_key:
+                cache_keys.append(idempotency_fingerprint(session_id, idempotency_key))
+            cached = result_cache.get(cache_keys[0])
+            if cached is not None:
+                print(f"[DEBUG] Serving cached result for session {session_id}", flush=True)
+                return cached
+
+        # Very large inventories are streamed in fixed-size batches instead of loaded whole
+        if chunked is not True:
+            total_rows = sum(estimate_rows(local) for _, local in downloaded)
+            if chunked is None:
+                chunked = bool(CHUNKED_AUTO_ROWS) and total_rows > CHUNKED_AUTO_ROWS
+            # loading whole would not fit the memory budget: stream instead of getting OOM-killed
+            if not chunked and not fits_budget(estimate_rows_mb(total_rows)):
+                record_degradation(diagnostics, "ingest", "chunked", estimate_rows_mb(total_rows))
+                chunked = True
+
+        # Independent stages (charts, narratives, Excels, reports, uploads) run concurrently
+        deferred_uploads = []
+        artifacts = ArtifactStore(session_path)
+        with MemoryMonitor() as monitor:
+            values, stage_report = build_assessment_graph(chunked).run({
                 "session_id": session_id,
+                "email": email,
+                "goal": goal,
                 "folder_id": folder_id,
-                "gpt_module": "it_assessment",
-                "status": "complete",
-                "files": files_for_gap,
-                "charts": uploaded_charts,
-            }
-            print(f"[DEBUG] Notifying market-gap with payload: {market_payload}", flush=True)
-            resp = requests.post(
-                next_action_webhook or MARKET_GAP_WEBHOOK,
-                json=market_payload,
-            )
-            if hasattr(resp, "raise_for_status"):
-                resp.raise_for_status()
-            print("[DEBUG] Market-gap notified successfully", flush=True)
-            return market_payload
-
-        except Exception as e:
-            import traceback; traceback.print_exc()
-            return {"error": str(e)}
+                "next_action_webhook": next_action_webhook,
+                "session_path": session_path,
+                "downloaded": downloaded,
+                "hw_xl": os.path.join(session_path, "HWGapAnalysis.xlsx"),
+                "sw_xl": os.path.join(session_path, "SWGapAnalysis.xlsx"),
+                "incremental": incremental,
+                "diagnostics": diagnostics,
+                # generated charts, Excels and reports stay in memory between stages
+                "artifacts": artifacts,
+                "deadline": deadline,
+                "deferred_uploads": deferred_uploads,
+                # offline runs (batch_cli --local): artifacts stay in the session folder, no webhook
+                "local_only": local_only,
+            }, monitor=monitor)
+        diagnostics["stages"] = stage_report
+        if deadline.enabled:
+            diagnostics["deadline"] = deadline.summary()
+        if deferred_uploads:
+            diagnostics["deferred_uploads"] = len(deferred_uploads)
+            pinned = ExitStack()
+            pinned.enter_context(session_storage.pin(session_id))
+            threading.Thread(target=upload_deferred, name=f"deferred-{session_id}", daemon=True,
+                             args=(session_id, folder_id, next_action_webhook, artifacts, deferred_uploads,
+                                   pinned)).start()
+        market_payload = values["market_payload"]
+        # a run cut short by its deadline is not what the same inputs produce with time to spare
+        if RESULT_CACHE_ENABLED and not deadline_degraded(diagnostics):
+            result_cache.put(cache_keys, session_id, market_payload)
+        return {**market_payload, "diagnostics": diagnostics}
 
     except Exception as e:
         import traceback; traceback.print_exc()
         return {"error": str(e)}
 
 def process_assessment(data: dict) -> dict:
+    session_id = data.get("session_id", "")
+    if not session_id:
+        return _run_assessment(data)
+    # keep the sweeper away from a session while it is being produced
+    with session_storage.pin(session_id):
+        if not COALESCE_ENABLED:
+            return _run_session(data)
+        # a duplicate of a running request (e.g. a proxy retry) waits for it and shares its result,
+        # but never past the request's own deadline
+        deadline = data.get("deadline")
+        max_wait = max(0.0, deadline.remaining()) if deadline is not None and deadline.enabled else None
+        return single_flight.run(session_id, request_fingerprint(data), partial(_run_session, data), max_wait)
+
+def _run_session(data: dict) -> dict:
+    if not data.get("profile"):
+        return _run_assessment(data)
+    with profile_run(os.path.join(OUTPUT_DIR, data["session_id"])) as profile:
+        result = _run_assessment(data)
+    return {**result, "profile": profile} if isinstance(result, dict) else result
+
+def _run_assessment(data: dict) -> dict:
     return generate_assessment(
         session_id=data.get("session_id", ""),
         email=data.get("email", ""),
         goal=data.get("goal", ""),
         files=data.get("files", []),
         next_action_webhook=data.get("next_action_webhook", ""),
-        folder_id=data.get("folder_id", "")
+        folder_id=data.get("folder_id", ""),
+        idempotency_key=data.get("idempotency_key", ""),
+        incremental=bool(data.get("incremental", INCREMENTAL_MODE)),
+        chunked=data.get("chunked"),
+        deadline=data.get("deadline"),
+        local_only=bool(data.get("local_only", False))
     )
@@ -0,0 +1,30 @@
+import gc
+import os
+
+import preload
+
+# gunicorn reads this file automatically: `gunicorn app:app`
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "900"))
+
+# Opt in to loading the app (templates, lookup frames, product catalog) once in the master and forking workers from it
+preload_app = os.getenv("GUNICORN_PRELOAD", "0") == "1"
+
+if preload_app:
+    preload.begin()
+
+
+def when_ready(server):
+    if preload_app:
+        preload.warm()
+
+
+def pre_fork(server, worker):
+    # objects created in the master since the last fork (e.g. a respawn) are frozen too
+    if preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    preload.after_fork()
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+from sqlite_store import connect
+
+# Reuse market enrichment and narratives from earlier runs by default?
+INCREMENTAL_MODE = os.getenv("INCREMENTAL_MODE", "0") == "1"
+INCREMENTAL_CACHE_PATH = os.getenv("INCREMENTAL_CACHE_PATH", os.path.join("cache", "incremental.sqlite3"))
+INCREMENTAL_TTL_SECONDS = int(os.getenv("INCREMENTAL_TTL_SECONDS", str(60 * 24 * 3600)))
+
+# bump when enrichment logic or the stored row format changes so stale rows are not reused
+CACHE_VERSION = "3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS row_results (
+    kind TEXT NOT NULL,
+    row_hash TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (kind, row_hash)
+);
+CREATE TABLE IF NOT EXISTS narratives (
+    summary_hash TEXT PRIMARY KEY,
+    narrative TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS narratives_updated_at ON narratives (updated_at);
+"""
+
+_BATCH = 500
+
+
+def row_hashes(df: pd.DataFrame, columns: list) -> pd.Series:
+    """
+    Hash every row of ``df`` on the given columns (missing columns are
+    ignored). The set of present columns is part of the key, so adding or
+    removing a scoring column invalidates earlier results.
+    """
+    present = sorted(c for c in dict.fromkeys(columns) if c in df.columns)
+    signature = hashlib.sha1(json.dumps([CACHE_VERSION, pd.__version__, present]).encode()).hexdigest()[:12]
+    if not present:
+        return pd.Series(signature, index=df.index)
+    # normalise to strings so dtype drift between uploads does not change the hash
+    subset = df[present].astype("string").fillna("\x00")
+    hashed = pd.util.hash_pandas_object(subset, index=False)
+    return hashed.map(lambda h: f"{signature}:{h:016x}")
+
+
+class IncrementalStore:
+    """Persistent per-row enrichment/tier results and per-section narratives."""
+
+    def __init__(self, path=INCREMENTAL_CACHE_PATH, ttl_seconds=INCREMENTAL_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+
+    def get_rows(self, kind: str, hashes: list) -> dict:
+        found = {}
+        cutoff = time.time() - self.ttl_seconds
+        with connect(self.path, _SCHEMA) as conn:
+            for i in range(0, len(hashes), _BATCH):
+                batch = hashes[i:i + _BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT row_hash, payload FROM row_results WHERE kind = ? AND updated_at >= ? AND row_hash IN ({marks})",
+                    [kind, cutoff, *batch],
+                )
+                found.update((h, json.loads(p)) for h, p in rows)
+        return found
+
+    def put_rows(self, kind: str, records: dict) -> None:
+        now = time.time()
+        with connect(self.path, _SCHEMA) as conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR REPLACE INTO row_results (kind, row_hash, payload, updated_at) VALUES (?, ?, ?, ?)",
+                [(kind, h, json.dumps(rec, default=str), now) for h, rec in records.items()],
+            )
+            conn.execute("DELETE FROM row_results WHERE updated_at < ?", (now - self.ttl_seconds,))
+            conn.execute("COMMIT")
+
+    @staticmethod
+    def summary_hash(section_name: str, summary: dict) -> str:
+        body = json.dumps([CACHE_VERSION, section_name, summary], sort_keys=True, default=str)
+        return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+    def get_narrative(self, section_name: str, summary: dict):
+        with connect(self.path, _SCHEMA) as conn:
+            row = conn.execute(
+                "SELECT narrative FROM narratives WHERE summary_hash = ? AND updated_at >= ?",
+                (self.summary_hash(section_name, summary), time.time() - self.ttl_seconds),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_narrative(self, section_name: str, summary: dict, narrative: str) -> None:
+        now = time.time()
+        with connect(self.path, _SCHEMA) as conn:
+            conn.execute("BEGIN")
+            conn.execute(
+                "INSERT OR REPLACE INTO narratives (summary_hash, narrative, updated_at) VALUES (?, ?, ?)",
+                (self.summary_hash(section_name, summary), narrative, now),
+            )
+            conn.execute("DELETE FROM narratives WHERE updated_at < ?", (now - self.ttl_seconds,))
+            conn.execute("COMMIT")
+
+
+incremental_store = IncrementalStore()
+
+
+def enrich_incremental(df: pd.DataFrame, kind: str, hash_columns: list, enrich_fn, store=None,
+                       output_columns=()):
+    """
+    Apply ``enrich_fn`` only to rows whose hash on
+    ``hash_columns`` has no stored result, and fill the remaining rows from
+    ``store``. Columns added by ``enrich_fn`` plus ``output_columns`` are the
+    stored results. Returns ``(enriched_df, stats)``.
+    """
+    store = store or incremental_store
+    if df.empty:
+        return enrich_fn(df), {"rows": 0, "reused": 0, "recomputed": 0}
+    hashes = row_hashes(df, hash_columns)
+    cached = store.get_rows(kind, hashes.unique().tolist())
+    miss = ~hashes.isin(cached.keys())
+    stats = {"rows": len(df), "reused": int((~miss).sum()), "recomputed": int(miss.sum())}
+
+    parts = []
+    if miss.any():
+        fresh = enrich_fn(df[miss])
+        outputs = [c for c in fresh.columns if c not in df.columns or c in output_columns]
+        records = dict(zip(hashes[miss], fresh[outputs].to_dict(orient="records")))
+        store.put_rows(kind, records)
+        parts.append(fresh)
+    if (~miss).any():
+        extra = pd.DataFrame([cached[h] for h in hashes[~miss]], index=df.index[~miss])
+        reused = df[~miss].drop(columns=[c for c in extra.columns if c in df.columns])
+        parts.append(pd.concat([reused, extra], axis=1))
+
+    result = pd.concat(parts).loc[df.index] if len(parts) > 1 else parts[0]
+    print(f"[DEBUG] Incremental {kind}: reused {stats['reused']} rows, recomputed {stats['recomputed']}", flush=True)
+    return result, stats
@@ -0,0 +1,197 @@
+import math
+import os
+
+# Summaries with fewer facts than this are written locally instead of by the model (0 = always use the model)
+LOCAL_NARRATIVE_MIN_FACTS = int(os.getenv("LOCAL_NARRATIVE_MIN_FACTS", "3"))
+
+# Section-specific rules: section name -> fn(summary) returning the narrative, or None to use the template
+RULES = {}
+
+
+def rule(*section_names):
+    def register(fn):
+        for name in section_names:
+            RULES[name] = fn
+        return fn
+    return register
+
+
+def section_title(section_name: str) -> str:
+    """``build_section_12_legacy_technical_debt`` -> ``Legacy technical debt``."""
+    words = section_name.removeprefix("build_").split("_")
+    if words[0] == "section" and len(words) > 1 and words[1].isdigit():
+        words = words[2:]
+    return " ".join(words).capitalize()
+
+
+def information_content(value) -> int:
+    """
+    The number of distinct facts in a summary value: one per list item,
+    non-zero number and piece of text, summed through dicts. Zero counts,
+    empty lists and missing values say nothing worth a model call.
+    """
+    if isinstance(value, dict):
+        return sum(information_content(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return len(value)
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 0 if value == 0 or (isinstance(value, float) and math.isnan(value)) else 1
+    if isinstance(value, str):
+        return 1 if value.strip() else 0
+    return 0 if value is None else 1
+
+
+def is_trivial(summary: dict, min_facts: int = LOCAL_NARRATIVE_MIN_FACTS) -> bool:
+    return information_content(summary) < min_facts
+
+
+def _label(key: str) -> str:
+    return key.replace("_", " ")
+
+
+def _number(value) -> str:
+    return f"{value:,.1f}" if isinstance(value, float) else f"{value:,}"
+
+
+def _known(value) -> bool:
+    return value is not None and not (isinstance(value, float) and math.isnan(value))
+
+
+def describe(key: str, value) -> str:
+    """One summary value as a short phrase."""
+    label = _label(key)
+    if not _known(value):
+        return f"{label} not available"
+    if isinstance(value, list):
+        return f"{len(value)} {label}" if value else f"no {label} recorded"
+    if isinstance(value, dict):
+        if not value:
+            return f"no {label} recorded"
+        top = sorted(value.items(), key=lambda item: item[1], reverse=True)[:5]
+        return f"{label}: " + ", ".join(f"{name} ({_number(count)})" for name, count in top)
+    if isinstance(value, bool):
+        return f"{label}: {'yes' if value else 'no'}"
+    if isinstance(value, (int, float)):
+        return f"{label}: {_number(value)}"
+    return str(value)
+
+
+def template_narrative(section_name: str, summary: dict) -> str:
+    """A deterministic narrative listing the summary's facts, for sections without a rule."""
+    title = section_title(section_name)
+    facts = [describe(key, value) for key, value in summary.items()]
+    if not facts:
+        return f"{title}: no data was available for this section."
+    return f"{title}: " + "; ".join(facts) + "."
+
+
+@rule("build_score_summary")
+def _score_summary(summary):
+    text = summary.get("text")
+    if not text:
+        return None
+    return f"{text} The sections below break these items down by tier, lifecycle, compliance and risk."
+
+
+@rule("build_section_6_lifecycle_status")
+def _lifecycle(summary):
+    active, past_eol, unknown = (summary.get(k, 0) or 0 for k in ("active", "past_eol", "unknown"))
+    if not active and not past_eol and not unknown:
+        return "End-of-life dates were not included in the hardware inventory, so lifecycle status could not be assessed."
+    sentences = [f"{_number(active)} devices are within their supported life and {_number(past_eol)} are past end of life."]
+    if unknown:
+        sentences.append(f"{_number(unknown)} devices have no recorded end-of-life date.")
+    if past_eol:
+        sentences.append("Devices past end of life should be prioritised for replacement.")
+    return " ".join(sentences)
+
+
+@rule("build_section_7_software_compliance")
+def _compliance(summary):
+    compliant, expired = summary.get("compliant_count", 0) or 0, summary.get("expired_count", 0) or 0
+    if not compliant and not expired:
+        return "License status was not included in the software inventory, so compliance could not be assessed."
+    if not expired:
+        return f"All {_number(compliant)} software licenses are current; no expired licenses were found."
+    return (f"{_number(compliant)} software licenses are current and {_number(expired)} have expired. "
+            "Expired licenses should be renewed or the applications retired.")
+
+
+@rule("build_section_8_security_posture")
+def _security(summary):
+    if summary.get("total_vulnerabilities") or summary.get("by_severity"):
+        return None
+    return "No vulnerabilities were reported in the hardware inventory."
+
+
+@rule("build_section_9_performance")
+def _performance(summary):
+    facts = []
+    if _known(summary.get("avg_throughput_mbps")):
+        facts.append(f"average throughput is {_number(float(summary['avg_throughput_mbps']))} Mbps")
+    if _known(summary.get("avg_latency_ms")):
+        facts.append(f"average latency is {_number(float(summary['avg_latency_ms']))} ms")
+    if not facts:
+        return "Throughput and latency were not included in the software inventory, so performance could not be assessed."
+    return "Across the software inventory, " + " and ".join(facts) + "."
+
+
+@rule("build_section_10_reliability")
+def _reliability(summary):
+    uptime = summary.get("avg_uptime_pct")
+    if not _known(uptime):
+        return "Uptime was not included in the software inventory, so reliability could not be assessed."
+    return f"Applications report an average uptime of {_number(float(uptime))}%."
+
+
+@rule("build_section_11_scalability")
+def _scalability(summary):
+    users = summary.get("max_supported_users")
+    if not _known(users):
+        return "User capacity was not included in the software inventory, so scalability could not be assessed."
+    return f"The largest application supports up to {_number(users)} users."
+
+
+@rule("build_section_13_obsolete_risk")
+def _obsolete_risk(summary):
+    if not summary:
+        return "Tier scores were not available, so obsolescence risk could not be assessed."
+    if any(summary.values()):
+        return None
+    return "No high-risk hardware or software items were identified."
+
+
+@rule("build_recommendations", "build_section_20_next_steps")
+def _recommendations(summary):
+    if any(summary.values()):
+        return None
+    return "No replacement recommendations could be derived from the supplied inventories."
+
+
+def _not_assessed(section_name):
+    topic = section_title(section_name).lower()
+
+    def narrative(summary):
+        if any(summary.values()):
+            return None
+        return (f"No {topic} findings could be derived from the supplied inventories. "
+                f"This section can be completed once {topic} information is provided.")
+    return narrative
+
+
+# sections the inventories cannot inform yet; their builders return empty lists
+for _name in ("build_section_12_legacy_technical_debt", "build_section_14_cloud_migration",
+              "build_section_15_strategic_alignment", "build_section_16_business_impact",
+              "build_section_17_financial_implications", "build_section_18_environmental_sustainability"):
+    RULES[_name] = _not_assessed(_name)
+
+
+def local_narrative(section_name: str, summary: dict) -> str:
+    """
+    The narrative for a section written without any network call: the
+    section's rule when it has one, otherwise the generic template.
+    """
+    fn = RULES.get(section_name)
+    return (fn(summary) if fn else None) or template_narrative(section_name, summary)
@@ -1,61 +1,94 @@
-import random
 import pandas as pd
 import re
 
-def pick_name(row, patterns, default):
-    """
-    Look through row.index for any column matching one of the regex patterns.
-    Return the first non-null value found, otherwise default.
-    """
+from product_catalog import product_catalog
+from shared_work import market_memo, memoized
+
+HW_NAME_PATTERNS = [r"device", r"server", r"asset"]
+SW_NAME_PATTERNS = [r"app", r"application", r"software"]
+
+def name_columns(columns, patterns):
+    """Return the columns a device or application name may be read from, in lookup order."""
+    matched = []
     for pat in patterns:
-        for col in row.index:
-            if re.search(pat, col, re.IGNORECASE):
-                val = row.get(col)
-                if pd.notna(val):
-                    return val
-    return default
-
-def fetch_market_device_data(device_name):
-    """
-    Simulates market data lookup for a given device.
-    Replace this with real API calls or scrapers if needed.
-    """
-    sample_vendors = ['Dell', 'HPE', 'Lenovo', 'Cisco', 'Supermicro']
-    sample_models = ['PowerEdge R750', 'ProLiant DL380', 'ThinkSystem SR650', 'UCS C240', 'SYS-620U']
-    sample_prices = [4500, 5200, 6100, 4900, 5600]
+        for col in columns:
+            if re.search(pat, col, re.IGNORECASE) and col not in matched:
+                matched.append(col)
+    return matched
 
+def _market_record(product, matched_model=None, score=0.0):
     return {
-        'Recommended Model': random.choice(sample_models),
-        'Vendor': random.choice(sample_vendors),
-        'Estimated Price (USD)': random.choice(sample_prices),
+        'Recommended Model': product['model'],
+        'Vendor': product['vendor'],
+        'Estimated Price (USD)': product['price_usd'],
         'Availability': 'In Stock',
-        'Lead Time (days)': random.randint(5, 14)
+        'Lead Time (days)': product['lead_time_days'],
+        'Recommended End of Life': product['end_of_life'],
+        'Matched Catalog Model': matched_model,
+        'Match Score': score,
     }
 
-def suggest_hw_replacements(hw_df):
-    updated_df = hw_df.copy()
-    for idx, row in updated_df.iterrows():
-        device_name = pick_name(
-            row,
-            patterns=[r"device", r"server", r"asset"],
-            default=f"Device-{idx}"
-        )
-        market_data = fetch_market_device_data(device_name)
-        for key, value in market_data.items():
-            updated_df.at[idx, key] = value
+def match_market_data(names, kind="hardware"):
+    """
+    Bulk catalog match: the current-generation successor of each name's
+    nearest catalog product. Names with no close match get the catalog's
+    default current product for ``kind``.
+    """
+    default = product_catalog.default_product(kind)
+    records = []
+    for product in product_catalog.match_many(names, kind):
+        if product is not None:
+            records.append(_market_record(product, product['matched_model'], product['match_score']))
+        elif default is not None:
+            records.append(_market_record(default))
+        else:
+            records.append({})
+    return records
+
+def fetch_market_device_data(device_name, kind="hardware"):
+    """Market data for a single device or application name, from the local catalog."""
+    return match_market_data([device_name], kind)[0]
+
+def _assign_market_data(df, records):
+    """Assign market lookups column by column so each keeps a proper dtype."""
+    updated_df = df.copy()
+    if records:
+        market_df = pd.DataFrame(records, index=updated_df.index)
+        for key in market_df.columns:
+            updated_df[key] = market_df[key]
     return updated_df
 
+def resolve_names(df, patterns, default_prefix):
+    """
+    The first non-null value of each row's name-like columns (matched once
+    per frame, not once per row), falling back to ``<prefix>-<index>``.
+    """
+    names = pd.Series(None, index=df.index, dtype=object)
+    for col in name_columns(df.columns, patterns):
+        names = names.where(names.notna(), df[col])
+    defaults = pd.Series([f"{default_prefix}-{idx}" for idx in df.index], index=df.index)
+    return names.where(names.notna(), defaults)
+
+def lookup_market_data(names, kind="hardware"):
+    """
+    One catalog match per distinct name. Inside a batch run the results are
+    also shared with every other session in the batch; outside one, all
+    names are matched in a single bulk call.
+    """
+    distinct = list(pd.unique(pd.Series(names, dtype=object)))
+    if market_memo.get() is None:
+        found = dict(zip(distinct, match_market_data(distinct, kind)))
+    else:
+        found = {name: memoized(market_memo, (kind, name), lambda n=name: fetch_market_device_data(n, kind))
+                 for name in distinct}
+    return [found[name] for name in names]
+
+def suggest_hw_replacements(hw_df):
+    names = resolve_names(hw_df, HW_NAME_PATTERNS, "Device")
+    return _assign_market_data(hw_df, lookup_market_data(names, "hardware"))
+
 def suggest_sw_replacements(sw_df):
-    updated_df = sw_df.copy()
-    for idx, row in updated_df.iterrows():
-        software_name = pick_name(
-            row,
-            patterns=[r"app", r"application", r"software"],
-            default=f"App-{idx}"
-        )
-        market_data = fetch_market_device_data(software_name)
-        for key, value in market_data.items():
-            updated_df.at[idx, key] = value
-    return updated_df
+    names = resolve_names(sw_df, SW_NAME_PATTERNS, "App")
+    return _assign_market_data(sw_df, lookup_market_data(names, "software"))
 # === Compatibility alias for expected import in generate_assessment.py ===
 fetch_latest_device_replacement = fetch_market_device_data
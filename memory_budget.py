@@ -0,0 +1,139 @@
+import os
+import resource
+import threading
+import time
+import tracemalloc
+
+# Memory a single assessment may use (MB, 0 disables); past it the run degrades instead of growing
+MEMORY_BUDGET_MB = float(os.getenv("MEMORY_BUDGET_MB", "0"))
+# Seconds between memory samples while a pipeline runs
+MEMORY_SAMPLE_SECONDS = float(os.getenv("MEMORY_SAMPLE_SECONDS", "0.05"))
+# Also trace Python allocations per stage (tracemalloc slows allocation-heavy stages)
+MEMORY_TRACEMALLOC = os.getenv("MEMORY_TRACEMALLOC", "0") == "1"
+# Estimated peak bytes per inventory row when loaded whole (concat, enrichment copies, merges)
+MEMORY_BYTES_PER_ROW = int(os.getenv("MEMORY_BYTES_PER_ROW", "6000"))
+# Estimated bytes per python-docx table cell
+DOCX_CELL_BYTES = int(os.getenv("DOCX_CELL_BYTES", "2000"))
+# Rows per DOCX table once tables degrade to a summary
+DOCX_SUMMARY_ROWS = int(os.getenv("DOCX_SUMMARY_ROWS", "50"))
+
+_MB = 1024 * 1024
+
+
+def _status_mb(field: str):
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process."""
+    current = _status_mb("VmRSS")
+    return current if current is not None else peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Highest resident set size this process has reached."""
+    peak = _status_mb("VmHWM")
+    return peak if peak is not None else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def estimate_rows_mb(rows: int) -> float:
+    return rows * MEMORY_BYTES_PER_ROW / _MB
+
+
+def estimate_table_mb(*frames) -> float:
+    cells = sum(len(df) * len(df.columns) for df in frames if df is not None)
+    return cells * DOCX_CELL_BYTES / _MB
+
+
+def fits_budget(estimated_mb: float, budget_mb: float = None) -> bool:
+    """Whether ``estimated_mb`` more on top of the current RSS stays within the budget."""
+    budget_mb = MEMORY_BUDGET_MB if budget_mb is None else budget_mb
+    return budget_mb <= 0 or rss_mb() + estimated_mb <= budget_mb
+
+
+def record_degradation(diagnostics: dict, stage: str, mode: str, estimated_mb: float):
+    entry = {"stage": stage, "mode": mode, "reason": "memory", "estimated_mb": round(estimated_mb, 1),
+             "rss_mb": round(rss_mb(), 1), "budget_mb": MEMORY_BUDGET_MB}
+    diagnostics.setdefault("degraded", []).append(entry)
+    print(f"[WARN] Memory budget: {stage} degraded to {mode} "
+          f"(estimated {entry['estimated_mb']}MB on {entry['rss_mb']}MB of {MEMORY_BUDGET_MB}MB)", flush=True)
+
+
+class MemoryMonitor:
+    """
+    Samples process RSS (and, with ``trace``, traced Python allocations)
+    while a pipeline runs, so each stage can report the peak seen during
+    its own window. Stages overlap, so a stage's peak is the process peak
+    while it ran rather than its private footprint.
+    """
+
+    def __init__(self, interval: float = MEMORY_SAMPLE_SECONDS, trace: bool = MEMORY_TRACEMALLOC):
+        self.interval = interval
+        self.trace = trace
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._owns_trace = False
+
+    def sample(self):
+        traced = None
+        if self.trace and tracemalloc.is_tracing():
+            # peak since the previous sample, so short spikes between samples still count
+            traced = tracemalloc.get_traced_memory()[1] / _MB
+            tracemalloc.reset_peak()
+        self.samples.append((time.time(), rss_mb(), traced))
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_trace = True
+        self.sample()
+        self._thread = threading.Thread(target=self._loop, name="memory-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.sample()
+        if self._owns_trace:
+            tracemalloc.stop()
+            self._owns_trace = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def window(self, started: float, ended: float) -> dict:
+        """Peak memory over ``[started, ended]``, including the sample that closes the window."""
+        inside = [s for s in self.samples if started <= s[0] <= ended]
+        after = next((s for s in self.samples if s[0] > ended), None)
+        if after is not None:
+            inside.append(after)
+        if not inside:
+            return {}
+        peaks = {"rss_peak_mb": round(max(s[1] for s in inside), 1)}
+        traced = [s[2] for s in inside if s[2] is not None]
+        if traced:
+            peaks["traced_peak_mb"] = round(max(traced), 1)
+        return peaks
+
+    def summary(self) -> dict:
+        if not self.samples:
+            return {}
+        return {**self.window(self.samples[0][0], self.samples[-1][0]),
+                "process_peak_rss_mb": round(peak_rss_mb(), 1), "budget_mb": MEMORY_BUDGET_MB}
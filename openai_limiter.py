@@ -0,0 +1,252 @@
+import os
+import random
+import re
+import threading
+import time
+
+import openai
+
+from sqlite_store import connect
+
+OPENAI_LIMITER_ENABLED = os.getenv("OPENAI_LIMITER_ENABLED", "1") == "1"
+OPENAI_LIMITER_PATH = os.getenv("OPENAI_LIMITER_PATH", os.path.join("cache", "openai_limiter.sqlite3"))
+# Account quotas shared by every thread and worker; replaced by the limits OpenAI reports in its headers
+OPENAI_RPM = float(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = float(os.getenv("OPENAI_TPM", "200000"))
+# Concurrent calls per worker; halved on a 429 and grown back one call at a time
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+# Completion tokens budgeted per call until the real usage is known
+OPENAI_COMPLETION_TOKENS = int(os.getenv("OPENAI_COMPLETION_TOKENS", "600"))
+# Longest a call queues for budget before it is sent regardless
+OPENAI_MAX_QUEUE_SECONDS = float(os.getenv("OPENAI_MAX_QUEUE_SECONDS", "300"))
+# 429s absorbed by waiting before the error reaches the caller
+OPENAI_RATE_LIMIT_RETRIES = int(os.getenv("OPENAI_RATE_LIMIT_RETRIES", "3"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    level REAL NOT NULL,
+    capacity REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    blocked_until REAL NOT NULL DEFAULT 0
+);
+"""
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def openai_client():
+    """This process's OpenAI client, built on first use so each worker gets its own connection pool."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = openai.OpenAI()
+        return _client
+
+
+def reset_openai_client():
+    """
+    Forget a client inherited from a parent process. It is dropped rather
+    than closed: closing would shut TLS sessions the parent still uses.
+    """
+    global _client
+    with _client_lock:
+        _client = None
+
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value) -> float:
+    """Seconds in an OpenAI reset header such as ``"1s"``, ``"6m0s"`` or ``"20ms"``."""
+    if value is None:
+        return 0.0
+    try:
+        return float(value)
+    except ValueError:
+        return sum(float(n) * _DURATION_UNITS[unit] for n, unit in _DURATION_RE.findall(str(value)))
+
+
+def estimate_tokens(messages, completion_tokens: int = OPENAI_COMPLETION_TOKENS) -> int:
+    """Roughly four characters per token for the prompt, plus the completion budget."""
+    prompt = sum(len(str(m.get("content", ""))) for m in messages)
+    return prompt // 4 + completion_tokens
+
+
+class AdaptiveConcurrency:
+    """Per-process cap on in-flight calls: halved on throttling, grown by one on each healthy response."""
+
+    def __init__(self, maximum: int = OPENAI_MAX_CONCURRENCY):
+        self.maximum = max(1, maximum)
+        self.limit = self.maximum
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    def __enter__(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def throttled(self):
+        with self._cond:
+            self.limit = max(1, self.limit // 2)
+
+    def healthy(self):
+        with self._cond:
+            self.limit = min(self.maximum, self.limit + 1)
+            self._cond.notify_all()
+
+
+class RateLimiter:
+    """
+    Token buckets for requests and tokens per model, kept in SQLite so
+    every thread and gunicorn worker draws from the same budget. Each
+    bucket refills continuously at capacity per minute. Calls wait for
+    budget instead of being sent into a 429. OpenAI's rate-limit headers
+    correct the buckets after every response.
+    """
+
+    def __init__(self, path=OPENAI_LIMITER_PATH, rpm=OPENAI_RPM, tpm=OPENAI_TPM,
+                 max_queue_seconds=OPENAI_MAX_QUEUE_SECONDS, retries=OPENAI_RATE_LIMIT_RETRIES,
+                 concurrency=None):
+        self.path = path
+        self.capacities = {"requests": rpm, "tokens": tpm}
+        self.max_queue_seconds = max_queue_seconds
+        self.retries = retries
+        self.concurrency = concurrency or AdaptiveConcurrency()
+
+    def _bucket(self, conn, model, kind, now):
+        name = f"{model}:{kind}"
+        row = conn.execute("SELECT level, capacity, updated_at, blocked_until FROM buckets WHERE name = ?",
+                           (name,)).fetchone()
+        if row is None:
+            capacity = self.capacities[kind]
+            return name, capacity, capacity, 0.0
+        level, capacity, updated_at, blocked_until = row
+        return name, min(capacity, level + (now - updated_at) * capacity / 60.0), capacity, blocked_until
+
+    def try_acquire(self, model: str, tokens: int) -> float:
+        """Take one request and ``tokens`` from the buckets; returns 0, or the seconds to wait before retrying."""
+        now = time.time()
+        with connect(self.path, _SCHEMA) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                buckets = [self._bucket(conn, model, kind, now) for kind in ("requests", "tokens")]
+                wait = 0.0
+                for (_, level, capacity, blocked_until), need in zip(buckets, (1, tokens)):
+                    # a single call larger than the whole bucket waits for a full bucket, not forever
+                    need = min(need, capacity)
+                    wait = max(wait, blocked_until - now, (need - level) * 60.0 / capacity if level < need else 0.0)
+                taken = (1, tokens) if wait <= 0 else (0, 0)
+                for (name, level, capacity, blocked_until), spent in zip(buckets, taken):
+                    conn.execute(
+                        "INSERT OR REPLACE INTO buckets (name, level, capacity, updated_at, blocked_until)"
+                        " VALUES (?, ?, ?, ?, ?)", (name, level - spent, capacity, now, blocked_until))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    def acquire(self, model: str, tokens: int, max_wait: float = None) -> float:
+        """Block until the budget allows the call (or the queue limit passes); returns the seconds waited."""
+        max_wait = min(self.max_queue_seconds, max_wait) if max_wait else self.max_queue_seconds
+        started = time.monotonic()
+        while True:
+            wait = self.try_acquire(model, tokens)
+            waited = time.monotonic() - started
+            if wait <= 0:
+                return waited
+            if waited + wait > max_wait:
+                print(f"[WARN] OpenAI budget for {model} still short after {waited:.0f}s; sending anyway", flush=True)
+                return waited
+            # jitter so queued callers across workers do not wake in lockstep
+            time.sleep(min(wait, 5.0) * random.uniform(1.0, 1.2))
+
+    def _adjust(self, model, updates):
+        now = time.time()
+        with connect(self.path, _SCHEMA) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for kind, update in updates.items():
+                    name, level, capacity, blocked_until = self._bucket(conn, model, kind, now)
+                    level, capacity, blocked_until = update(level, capacity, blocked_until)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO buckets (name, level, capacity, updated_at, blocked_until)"
+                        " VALUES (?, ?, ?, ?, ?)", (name, level, capacity, now, blocked_until))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def observe(self, model: str, headers) -> dict:
+        """Adopt the limits and remaining budget OpenAI reports (``x-ratelimit-*`` headers)."""
+        updates = {}
+        for kind in ("requests", "tokens"):
+            limit = headers.get(f"x-ratelimit-limit-{kind}")
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if limit is None or remaining is None:
+                continue
+            limit, remaining = float(limit), float(remaining)
+            updates[kind] = lambda level, capacity, blocked, limit=limit, remaining=remaining: (
+                min(level, remaining), limit, blocked)
+        if updates:
+            self._adjust(model, updates)
+        return updates
+
+    def penalize(self, model: str, retry_after: float):
+        """After a 429, empty the request bucket and hold every caller back for ``retry_after``."""
+        until = time.time() + retry_after
+        self._adjust(model, {
+            "requests": lambda level, capacity, blocked: (min(level, 0.0), capacity, max(blocked, until)),
+            "tokens": lambda level, capacity, blocked: (level, capacity, max(blocked, until)),
+        })
+
+    def reconcile(self, model: str, estimated: int, actual: int):
+        """Return (or charge) the difference between the budgeted and the real token usage."""
+        self._adjust(model, {
+            "tokens": lambda level, capacity, blocked: (min(capacity, level + estimated - actual), capacity, blocked),
+        })
+
+    def complete(self, model: str, messages: list, **kwargs):
+        """``chat.completions.create`` within the shared budget; 429s are waited out and retried."""
+        if not OPENAI_LIMITER_ENABLED:
+            return openai_client().chat.completions.create(model=model, messages=messages, **kwargs)
+        estimated = estimate_tokens(messages, kwargs.get("max_tokens") or OPENAI_COMPLETION_TOKENS)
+        for attempt in range(self.retries + 1):
+            # a call with a timeout does not queue longer than it would wait for the answer
+            self.acquire(model, estimated, kwargs.get("timeout"))
+            with self.concurrency:
+                try:
+                    raw = openai_client().chat.completions.with_raw_response.create(model=model, messages=messages, **kwargs)
+                except openai.RateLimitError as e:
+                    # an exhausted account quota does not recover by waiting
+                    if getattr(e, "code", None) == "insufficient_quota" or attempt == self.retries:
+                        raise
+                    headers = e.response.headers if e.response is not None else {}
+                    self.observe(model, headers)
+                    retry_after = parse_duration(headers.get("retry-after")) or \
+                        parse_duration(headers.get("x-ratelimit-reset-requests")) or 2.0 ** attempt
+                    self.penalize(model, retry_after)
+                    self.concurrency.throttled()
+                    print(f"[WARN] OpenAI 429 for {model}; retrying in {retry_after:.1f}s "
+                          f"(concurrency {self.concurrency.limit})", flush=True)
+                    continue
+            self.observe(model, raw.headers)
+            resp = raw.parse()
+            usage = getattr(resp, "usage", None)
+            if usage is not None and getattr(usage, "total_tokens", None):
+                self.reconcile(model, estimated, usage.total_tokens)
+            self.concurrency.healthy()
+            return resp
+
+
+openai_limiter = RateLimiter()
@@ -0,0 +1,96 @@
+import gc
+import io
+import os
+from functools import lru_cache
+
+import pandas as pd
+import pyarrow as pa
+
+# Build read-only state once in the gunicorn master and share it with workers copy-on-write.
+# Set by gunicorn.conf.py before the app is imported in the master (preload_app).
+_preloading = False
+
+
+def shared_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    A read-only lookup frame backed entirely by Arrow buffers. There are no
+    per-cell Python objects whose reference counts would dirty shared pages
+    in forked workers. Arrow arrays are immutable, so any write produces new
+    arrays instead of touching the inherited ones.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+@lru_cache(maxsize=None)
+def template_bytes(path: str) -> bytes:
+    with open(path, "rb") as fh:
+        return fh.read()
+
+
+def open_template(path: str) -> io.BytesIO:
+    """A fresh stream over a report template that is read from disk once per process."""
+    return io.BytesIO(template_bytes(path))
+
+
+def begin():
+    """Called in the master before the app is imported: defer threads, keep the heap compact."""
+    global _preloading
+    _preloading = True
+    # no collections while the shared structures are built, so they are not scattered among freed gaps
+    gc.disable()
+
+
+def preloading() -> bool:
+    return _preloading
+
+
+def warm():
+    """Load everything workers would otherwise build on first use, then freeze it for the GC."""
+    import report_docx
+    import report_pptx
+    from product_catalog import product_catalog
+
+    for path in (report_docx.DOCX_TEMPLATE, report_pptx.PPTX_TEMPLATE):
+        if os.path.exists(path):
+            template_bytes(path)
+    product_catalog.preload()
+    gc.collect()
+    # keep the collector in workers from touching (and so copying) inherited objects
+    gc.freeze()
+    # the heap is laid out; the long-lived master needs its cyclic collector back
+    gc.enable()
+    print(f"[DEBUG] Preloaded shared state; {gc.get_freeze_count()} objects frozen", flush=True)
+
+
+def start_background_services():
+    from generate_assessment import session_storage
+    from webhook_outbox import WEBHOOK_OUTBOX_ENABLED, webhook_outbox
+
+    session_storage.start_sweeper()
+    if WEBHOOK_OUTBOX_ENABLED:
+        webhook_outbox.start_dispatcher()
+
+
+def after_fork():
+    """
+    Called in each worker right after the fork. Rebuilds the clients whose
+    connections must not be shared between processes and starts the
+    background threads deferred in the master.
+    """
+    global _preloading
+    if not _preloading:
+        return
+    _preloading = False
+    gc.enable()
+    reset_clients()
+    start_background_services()
+
+
+def reset_clients():
+    """Drop pooled HTTP connections inherited from a parent process, which every child would otherwise share."""
+    import drive_utils
+    from openai_limiter import reset_openai_client
+
+    reset_openai_client()
+    drive_utils.reset_drive_service()
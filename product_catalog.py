@@ -0,0 +1,227 @@
+import csv
+import fcntl
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "templates")
+
+# Seed data (CSV) and the indexed SQLite catalog built from it
+PRODUCT_CATALOG_SOURCE = os.getenv("PRODUCT_CATALOG_SOURCE", os.path.join(TEMPLATES_DIR, "ProductCatalog.csv"))
+PRODUCT_CATALOG_PATH = os.getenv("PRODUCT_CATALOG_PATH", os.path.join("cache", "product_catalog.sqlite3"))
+# Minimum similarity for a name to count as a match (0..1)
+CATALOG_MIN_SCORE = float(os.getenv("CATALOG_MIN_SCORE", "0.5"))
+
+_SCHEMA = """
+CREATE TABLE products (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    vendor TEXT NOT NULL,
+    model TEXT NOT NULL,
+    family TEXT,
+    generation INTEGER,
+    release_date TEXT,
+    end_of_sale TEXT,
+    end_of_life TEXT,
+    price_usd REAL,
+    lead_time_days INTEGER,
+    successor_id INTEGER REFERENCES products(id),
+    trigram_count INTEGER NOT NULL
+);
+CREATE TABLE trigrams (
+    trigram TEXT NOT NULL,
+    product_id INTEGER NOT NULL REFERENCES products(id),
+    PRIMARY KEY (trigram, product_id)
+) WITHOUT ROWID;
+CREATE INDEX idx_products_kind ON products(kind, model);
+"""
+
+
+def normalize_name(name) -> str:
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", str(name).lower()).split())
+
+
+def trigrams(name) -> set:
+    """Character trigrams of the normalised name, padded so word starts count."""
+    text = f"  {normalize_name(name)} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _int(value):
+    return int(float(value)) if value not in ("", None) else None
+
+
+def _float(value):
+    return float(value) if value not in ("", None) else None
+
+
+def build_catalog(source=PRODUCT_CATALOG_SOURCE, path=PRODUCT_CATALOG_PATH) -> int:
+    """
+    (Re)build the SQLite catalog from the CSV seed, including the trigram
+    index over ``vendor model``. Written to a temp file and swapped in, so
+    readers never see a half-built catalog. Returns the product count.
+    """
+    with open(source, newline="", encoding="utf-8") as fh:
+        rows = list(csv.DictReader(fh))
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    # plain rollback journal (not WAL): the file is replaced wholesale on rebuild
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(_SCHEMA)
+        ids = {}
+        for i, row in enumerate(rows, start=1):
+            grams = trigrams(f"{row['vendor']} {row['model']}")
+            conn.execute(
+                "INSERT INTO products (id, kind, vendor, model, family, generation, release_date, end_of_sale,"
+                " end_of_life, price_usd, lead_time_days, trigram_count) VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
+                (i, row["kind"], row["vendor"], row["model"], row.get("family") or None, _int(row.get("generation")),
+                 row.get("release_date") or None, row.get("end_of_sale") or None, row.get("end_of_life") or None,
+                 _float(row.get("price_usd")), _int(row.get("lead_time_days")), len(grams)),
+            )
+            conn.executemany("INSERT INTO trigrams (trigram, product_id) VALUES (?, ?)", [(g, i) for g in grams])
+            ids[(row["kind"], row["model"])] = i
+        for row in rows:
+            successor = row.get("successor")
+            if successor:
+                conn.execute("UPDATE products SET successor_id = ? WHERE id = ?",
+                             (ids.get((row["kind"], successor)), ids[(row["kind"], row["model"])]))
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+    print(f"[DEBUG] Built product catalog {path} with {len(rows)} products", flush=True)
+    return len(rows)
+
+
+class ProductCatalog:
+    """
+    Local replacement catalog. Products and the trigram index live in
+    SQLite; the index is loaded into memory once per process (and again
+    whenever the file changes), so matching a name costs a few dictionary
+    lookups rather than a query.
+    """
+
+    def __init__(self, path=PRODUCT_CATALOG_PATH, source=PRODUCT_CATALOG_SOURCE, min_score=CATALOG_MIN_SCORE):
+        self.path = path
+        self.source = source
+        self.min_score = min_score
+        self._lock = threading.Lock()
+        self._loaded_mtime = None
+        # (products, postings, defaults), swapped as one object on reload
+        self._index = ({}, {}, {})
+
+    def _ensure_built(self):
+        stale = not os.path.exists(self.path) or (
+            os.path.exists(self.source) and os.path.getmtime(self.source) > os.path.getmtime(self.path))
+        if not stale:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # one worker builds; the others wait and then load its result
+        with open(f"{self.path}.lock", "a+") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if not os.path.exists(self.path) or (
+                        os.path.exists(self.source) and os.path.getmtime(self.source) > os.path.getmtime(self.path)):
+                    build_catalog(self.source, self.path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _load(self):
+        with self._lock:
+            self._ensure_built()
+            mtime = os.path.getmtime(self.path)
+            if mtime != self._loaded_mtime:
+                self._index = self._read_index()
+                self._loaded_mtime = mtime
+        return self._index
+
+    def _read_index(self):
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            conn.row_factory = sqlite3.Row
+            products = {row["id"]: dict(row) for row in conn.execute("SELECT * FROM products ORDER BY id")}
+            postings = {}
+            for gram, product_id in conn.execute("SELECT trigram, product_id FROM trigrams"):
+                postings.setdefault(gram, []).append(product_id)
+        finally:
+            conn.close()
+        defaults = {}
+        for product in products.values():
+            if product["successor_id"] is None:
+                defaults.setdefault(product["kind"], product["id"])
+        return products, postings, defaults
+
+    @staticmethod
+    def _current(products, product_id):
+        """Follow the successor chain to the current-generation product."""
+        seen = set()
+        product = products[product_id]
+        while product["successor_id"] is not None and product["id"] not in seen:
+            seen.add(product["id"])
+            product = products.get(product["successor_id"], product)
+        return product
+
+    @staticmethod
+    def _best(products, postings, name, kind):
+        query = trigrams(name)
+        if not query:
+            return None, 0.0
+        shared = Counter()
+        for gram in query:
+            for product_id in postings.get(gram, ()):
+                if products[product_id]["kind"] == kind:
+                    shared[product_id] += 1
+        best, best_score = None, 0.0
+        for product_id, count in shared.items():
+            union = len(query) + products[product_id]["trigram_count"] - count
+            # half containment (short names like "R740"), half Jaccard (penalise loose matches)
+            score = 0.5 * count / len(query) + 0.5 * count / union
+            if score > best_score:
+                best, best_score = product_id, score
+        return best, best_score
+
+    def preload(self):
+        """Build and load the index now (e.g. in the gunicorn master) rather than on the first match."""
+        self._load()
+
+    def match_many(self, names, kind: str = "hardware") -> list:
+        """
+        Match each name to its nearest catalog product and return the
+        current-generation successor of that product, one dict per name
+        (``None`` below ``min_score``). Repeated names are matched once.
+        """
+        products, postings, _ = self._load()
+        results = {}
+        for name in names:
+            if name in results:
+                continue
+            product_id, score = self._best(products, postings, name, kind)
+            if product_id is None or score < self.min_score:
+                results[name] = None
+                continue
+            matched = products[product_id]
+            results[name] = {**self._current(products, product_id), "matched_model": matched["model"],
+                             "match_score": round(score, 3)}
+        return [results[name] for name in names]
+
+    def match(self, name, kind: str = "hardware"):
+        return self.match_many([name], kind)[0]
+
+    def default_product(self, kind: str = "hardware"):
+        """First current-generation product of ``kind`` in catalog order."""
+        products, _, defaults = self._load()
+        product_id = defaults.get(kind)
+        return dict(products[product_id]) if product_id is not None else None
+
+
+product_catalog = ProductCatalog()
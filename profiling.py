@@ -0,0 +1,176 @@
+import functools
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Admin token required to profile a run; profiling is unavailable while unset
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+# Seconds between stack samples
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_SECONDS", "0.005"))
+# Hot functions listed in the summary
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "25"))
+
+PROFILE_HEADER = "X-Profile"
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+PROFILE_DIR = "profile"
+
+# The profiler of the run executing in this context, if any
+active_profiler = ContextVar("active_profiler", default=None)
+
+
+def profiling_requested(headers, data: dict) -> bool:
+    """True when the request asks for profiling via the header or the body."""
+    header = str(headers.get(PROFILE_HEADER, "")).strip().lower()
+    return header in ("1", "true", "yes") or data.get("profile") is True
+
+
+def profiling_authorized(headers) -> bool:
+    token = headers.get(ADMIN_TOKEN_HEADER, "")
+    return bool(PROFILE_ADMIN_TOKEN) and hmac.compare_digest(str(token), PROFILE_ADMIN_TOKEN)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of the threads working on one run. The run's
+    own thread is followed from ``start``; worker threads join through
+    ``follow``. Samples are kept as collapsed stacks, the format
+    flamegraph.pl and speedscope read directly.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._threads = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._started = self._ended = None
+
+    def add_thread(self, ident: int):
+        with self._lock:
+            self._threads[ident] = self._threads.get(ident, 0) + 1
+
+    def remove_thread(self, ident: int):
+        with self._lock:
+            if self._threads.get(ident, 0) <= 1:
+                self._threads.pop(ident, None)
+            else:
+                self._threads[ident] -= 1
+
+    def sample(self):
+        frames = sys._current_frames()
+        with self._lock:
+            idents = list(self._threads)
+        for ident in idents:
+            frame = frames.get(ident)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self._started = time.monotonic()
+        self.add_thread(threading.get_ident())
+        self._sampler = threading.Thread(target=self._loop, name="profiler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self.remove_thread(threading.get_ident())
+        self._ended = time.monotonic()
+
+    def top(self, n: int = PROFILE_TOP_N) -> list:
+        """Hottest functions by samples on top of the stack (self) and anywhere on it (total)."""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for label in set(frames):
+                total[label] += count
+        samples = self.samples or 1
+        return [
+            {"function": label, "self_samples": own[label], "total_samples": total[label],
+             "self_percent": round(100.0 * own[label] / samples, 1),
+             "total_percent": round(100.0 * total[label] / samples, 1)}
+            for label, _ in sorted(total.items(), key=lambda item: (-own[item[0]], -item[1]))[:n]
+        ]
+
+    def write(self, folder: str, top_n: int = PROFILE_TOP_N) -> dict:
+        """Write ``profile/stacks.folded`` and ``profile/top.json`` under ``folder``; returns the summary."""
+        directory = os.path.join(folder, PROFILE_DIR)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "stacks.folded"), "w", encoding="utf-8") as fh:
+            for stack, count in self.stacks.most_common():
+                fh.write(f"{stack} {count}\n")
+        summary = {
+            "seconds": round((self._ended or time.monotonic()) - (self._started or time.monotonic()), 3),
+            "interval_seconds": self.interval,
+            "samples": self.samples,
+            "files": [f"{PROFILE_DIR}/stacks.folded", f"{PROFILE_DIR}/top.json"],
+            "top": self.top(top_n),
+        }
+        with open(os.path.join(directory, "top.json"), "w", encoding="utf-8") as fh:
+            json.dump(summary, fh, indent=2)
+        return summary
+
+
+def follow(fn):
+    """
+    ``fn`` wrapped so the thread running it is sampled by the active
+    profiler. Call from the submitting thread; returns ``fn`` itself when
+    no run is being profiled.
+    """
+    profiler = active_profiler.get()
+    if profiler is None:
+        return fn
+
+    @functools.wraps(fn)
+    def followed(*args, **kwargs):
+        ident = threading.get_ident()
+        profiler.add_thread(ident)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.remove_thread(ident)
+    return followed
+
+
+@contextmanager
+def profile_run(folder: str):
+    """
+    Sample the enclosed run and its followed worker threads, then write the
+    flamegraph input and the hot-function summary into ``folder``. Yields a
+    dict that holds the summary once the block exits.
+    """
+    profiler = SamplingProfiler()
+    token = active_profiler.set(profiler)
+    outcome = {}
+    profiler.start()
+    try:
+        yield outcome
+    finally:
+        profiler.stop()
+        active_profiler.reset(token)
+        outcome.update(profiler.write(folder))
+        print(f"[DEBUG] Profile written to {folder}/{PROFILE_DIR} ({profiler.samples} samples)", flush=True)
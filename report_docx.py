@@ -3,9 +3,28 @@ from docx import Document
 from docx.shared import Inches
 import os
 
+from artifact_store import image_source, render_artifact
+from preload import open_template
+
 TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "templates")
+DOCX_TEMPLATE = os.path.join(TEMPLATES_DIR, "IT_Current_Status_Assessment_Report_Template.docx")
+
+def _add_table(document, df, max_rows=None):
+    shown = df if max_rows is None else df.head(max_rows)
+    table = document.add_table(rows=1, cols=len(df.columns))
+    hdr_cells = table.rows[0].cells
+    for i, col in enumerate(df.columns):
+        hdr_cells[i].text = str(col)
+    for _, row in shown.iterrows():
+        row_cells = table.add_row().cells
+        for i, val in enumerate(row):
+            row_cells[i].text = str(val)
+    if len(shown) < len(df):
+        document.add_paragraph(
+            f"Showing {len(shown)} of {len(df)} rows; the full list is in the gap analysis workbook."
+        )
 
-def generate_docx_report(session_id, hw_df, sw_df, chart_paths):
+def generate_docx_report(session_id, hw_df, sw_df, chart_paths, as_artifact=False, max_table_rows=None):
     """Generate a detailed DOCX report.
 
     Parameters
@@ -17,59 +36,51 @@ def generate_docx_report(session_id, hw_df, sw_df, chart_paths):
     sw_df : pandas.DataFrame
         Software dataframe to summarize.
     chart_paths : dict
-        Dictionary of chart names to file paths returned by
-        :func:`visualization.generate_charts`.
+        Dictionary of chart names to file paths or in-memory artifacts
+        returned by :func:`visualization.generate_charts`.
+    as_artifact : bool
+        Return the document as an in-memory artifact instead of saving it.
+    max_table_rows : int, optional
+        Cap each inventory table at this many rows (summary-only tables).
 
     Returns
     -------
-    str or None
-        Path to the generated DOCX file or ``None`` if generation failed.
+    str, Artifact or None
+        Path to (or artifact of) the generated DOCX file or ``None`` if
+        generation failed.
     """
     try:
-        output_path = os.path.join("temp_sessions", session_id, "IT_Current_Status_Assessment_Report.docx")
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        output_name = "IT_Current_Status_Assessment_Report.docx"
+        output_path = os.path.join("temp_sessions", session_id, output_name)
 
-        template_path = os.path.join(
-            TEMPLATES_DIR, "IT_Current_Status_Assessment_Report_Template.docx"
-        )
-        document = Document(template_path)
+        document = Document(open_template(DOCX_TEMPLATE))
 
         document.add_heading('Session ID', level=1)
         document.add_paragraph(session_id)
 
         document.add_heading('Hardware Summary', level=1)
         if hw_df is not None and not hw_df.empty:
-            table = document.add_table(rows=1, cols=len(hw_df.columns))
-            hdr_cells = table.rows[0].cells
-            for i, col in enumerate(hw_df.columns):
-                hdr_cells[i].text = str(col)
-            for _, row in hw_df.iterrows():
-                row_cells = table.add_row().cells
-                for i, val in enumerate(row):
-                    row_cells[i].text = str(val)
+            _add_table(document, hw_df, max_table_rows)
         else:
             document.add_paragraph("No hardware data available.")
 
         document.add_heading('Software Summary', level=1)
         if sw_df is not None and not sw_df.empty:
-            table = document.add_table(rows=1, cols=len(sw_df.columns))
-            hdr_cells = table.rows[0].cells
-            for i, col in enumerate(sw_df.columns):
-                hdr_cells[i].text = str(col)
-            for _, row in sw_df.iterrows():
-                row_cells = table.add_row().cells
-                for i, val in enumerate(row):
-                    row_cells[i].text = str(val)
+            _add_table(document, sw_df, max_table_rows)
         else:
             document.add_paragraph("No software data available.")
 
         document.add_heading('Charts & Visualizations', level=1)
         for chart_path in chart_paths.values():
-            if os.path.exists(chart_path):
-                document.add_picture(chart_path, width=Inches(5.5))
+            source = image_source(chart_path)
+            if source is not None:
+                document.add_picture(source, width=Inches(5.5))
             else:
                 document.add_paragraph(f"⚠️ Missing chart: {chart_path}")
 
+        if as_artifact:
+            return render_artifact(output_name, document.save)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
         document.save(output_path)
         return output_path
 
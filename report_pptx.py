@@ -5,9 +5,14 @@ from pptx.util import Inches, Pt
 from pptx.enum.shapes import MSO_SHAPE
 from pptx.dml.color import RGBColor
 
+from artifact_store import image_source, render_artifact
+from dtype_compaction import observed_counts
+from preload import open_template
+
 TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "templates")
+PPTX_TEMPLATE = os.path.join(TEMPLATES_DIR, "IT_Current_Status_Executive_Report_Template.pptx")
 
-def generate_pptx_report(session_id, hw_df, sw_df, chart_paths):
+def generate_pptx_report(session_id, hw_df, sw_df, chart_paths, as_artifact=False):
     """Generate an executive summary PPTX report.
 
     Parameters
@@ -19,23 +24,23 @@ def generate_pptx_report(session_id, hw_df, sw_df, chart_paths):
     sw_df : pandas.DataFrame
         Software dataframe to summarize.
     chart_paths : dict
-        Dictionary of chart names to file paths returned by
-        :func:`visualization.generate_charts`.
+        Dictionary of chart names to file paths or in-memory artifacts
+        returned by :func:`visualization.generate_charts`.
+    as_artifact : bool
+        Return the presentation as an in-memory artifact instead of saving it.
 
     Returns
     -------
-    str or None
-        Path to the generated PPTX file or ``None`` if generation failed.
+    str, Artifact or None
+        Path to (or artifact of) the generated PPTX file or ``None`` if
+        generation failed.
     """
     try:
         output_dir = os.path.join("temp_sessions", session_id)
-        os.makedirs(output_dir, exist_ok=True)
-        output_path = os.path.join(output_dir, "IT_Current_Status_Executive_Report.pptx")
+        output_name = "IT_Current_Status_Executive_Report.pptx"
+        output_path = os.path.join(output_dir, output_name)
 
-        template_path = os.path.join(
-            TEMPLATES_DIR, "IT_Current_Status_Executive_Report_Template.pptx"
-        )
-        prs = Presentation(template_path) if os.path.exists(template_path) else Presentation()
+        prs = Presentation(open_template(PPTX_TEMPLATE)) if os.path.exists(PPTX_TEMPLATE) else Presentation()
         # remove template slides to start clean
         while len(prs.slides) > 0:
             rId = prs.slides._sldIdLst[0].rId
@@ -55,7 +60,7 @@ def generate_pptx_report(session_id, hw_df, sw_df, chart_paths):
         slide.shapes.title.text = "Hardware Summary"
         if hw_df is not None and not hw_df.empty:
             if 'Tier' in hw_df.columns:
-                tier_text = hw_df['Tier'].value_counts().to_string()
+                tier_text = observed_counts(hw_df['Tier']).to_string()
             else:
                 tier_text = "No tier data."
             hw_summary = f"Total HW Devices: {len(hw_df)}\nTier Distribution:\n{tier_text}"
@@ -68,7 +73,7 @@ def generate_pptx_report(session_id, hw_df, sw_df, chart_paths):
         slide.shapes.title.text = "Software Summary"
         if sw_df is not None and not sw_df.empty:
             if 'Tier' in sw_df.columns:
-                tier_text = sw_df['Tier'].value_counts().to_string()
+                tier_text = observed_counts(sw_df['Tier']).to_string()
             else:
                 tier_text = "No tier data."
             sw_summary = f"Total SW Packages: {len(sw_df)}\nTier Distribution:\n{tier_text}"
@@ -78,13 +83,17 @@ def generate_pptx_report(session_id, hw_df, sw_df, chart_paths):
 
         # Charts
         for path in chart_paths.values():
-            if os.path.exists(path):
+            source = image_source(path)
+            if source is not None:
                 slide = prs.slides.add_slide(blank_layout)
                 left = Inches(1)
                 top = Inches(1)
                 height = Inches(5)
-                slide.shapes.add_picture(path, left, top, height=height)
+                slide.shapes.add_picture(source, left, top, height=height)
 
+        if as_artifact:
+            return render_artifact(output_name, prs.save)
+        os.makedirs(output_dir, exist_ok=True)
         prs.save(output_path)
         return output_path
 
@@ -0,0 +1,182 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Breaker tuning (all overridable from the environment)
+REPORT_BREAKER_FAILURES = int(os.getenv("REPORT_BREAKER_FAILURES", "3"))
+REPORT_BREAKER_WINDOW = int(os.getenv("REPORT_BREAKER_WINDOW", "10"))
+REPORT_BREAKER_RESET_SECONDS = float(os.getenv("REPORT_BREAKER_RESET_SECONDS", "60"))
+REPORT_BREAKER_SLOW_SECONDS = float(os.getenv("REPORT_BREAKER_SLOW_SECONDS", "20"))
+# Start local generation speculatively once the remote call has taken this long (0 disables)
+REPORT_HEDGE_AFTER_SECONDS = float(os.getenv("REPORT_HEDGE_AFTER_SECONDS", "0"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a call is short-circuited by an open breaker."""
+
+
+class CircuitBreaker:
+    """
+    Track recent outcomes and latency of a remote dependency.
+
+    The breaker opens after ``failure_threshold`` failures within the last
+    ``window`` calls (calls slower than ``slow_seconds`` count as failures).
+    While open every call is rejected until ``reset_seconds`` have passed,
+    after which a single trial call is let through (half-open).
+    """
+
+    def __init__(self, name, failure_threshold=REPORT_BREAKER_FAILURES, window=REPORT_BREAKER_WINDOW,
+                 reset_seconds=REPORT_BREAKER_RESET_SECONDS, slow_seconds=REPORT_BREAKER_SLOW_SECONDS,
+                 clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.slow_seconds = slow_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)
+        self._latencies = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._stats = {"calls": 0, "successes": 0, "failures": 0, "short_circuited": 0, "hedged": 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_seconds:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow_request(self):
+        """Return True if a remote call may be attempted right now."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self._stats["short_circuited"] += 1
+            return False
+
+    def record(self, success, latency):
+        """Record the outcome of a remote call that was allowed through."""
+        with self._lock:
+            if success and latency > self.slow_seconds:
+                success = False
+            self._stats["calls"] += 1
+            self._stats["successes" if success else "failures"] += 1
+            self._outcomes.append(success)
+            self._latencies.append(latency)
+            state = self._current_state()
+            if state == HALF_OPEN:
+                self._trial_in_flight = False
+                if success:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._trip()
+            elif state == CLOSED and self._outcomes.count(False) >= self.failure_threshold:
+                self._trip()
+
+    def record_hedge(self):
+        with self._lock:
+            self._stats["hedged"] += 1
+
+    def _trip(self):
+        self._state = OPEN
+        self._opened_at = self._clock()
+        print(f"[WARN] Circuit '{self.name}' opened", flush=True)
+
+    def snapshot(self):
+        """Return a JSON-serialisable view of the breaker for monitoring."""
+        with self._lock:
+            state = self._current_state()
+            latencies = sorted(self._latencies)
+            retry_in = None
+            if state == OPEN:
+                retry_in = max(0.0, self.reset_seconds - (self._clock() - self._opened_at))
+            return {
+                "name": self.name,
+                "state": state,
+                "recent_failures": self._outcomes.count(False),
+                "recent_calls": len(self._outcomes),
+                "p50_latency_s": latencies[len(latencies) // 2] if latencies else None,
+                "max_latency_s": latencies[-1] if latencies else None,
+                "retry_in_s": retry_in,
+                **self._stats,
+            }
+
+
+report_breaker = CircuitBreaker("docx_service")
+
+
+def _timed_remote(remote_fn, breaker):
+    started = time.monotonic()
+    try:
+        result = remote_fn()
+    except Exception:
+        breaker.record(False, time.monotonic() - started)
+        raise
+    breaker.record(True, time.monotonic() - started)
+    return result
+
+
+def render_reports(remote_fn, local_fn, breaker=report_breaker, hedge_after=None):
+    """
+    Produce ``(docx_url, pptx_url)`` from the remote report service, falling
+    back to local generation.
+
+    ``remote_fn`` must return the pair or raise; ``local_fn`` is the local
+    fallback. While ``breaker`` is open the remote service is skipped. When
+    ``hedge_after`` seconds pass without a remote answer, local generation is
+    started speculatively and whichever finishes first successfully wins.
+    """
+    if hedge_after is None:
+        hedge_after = REPORT_HEDGE_AFTER_SECONDS
+
+    if not breaker.allow_request():
+        print(f"[DEBUG] Circuit '{breaker.name}' open; generating reports locally", flush=True)
+        return local_fn()
+
+    if not hedge_after or hedge_after <= 0:
+        try:
+            return _timed_remote(remote_fn, breaker)
+        except Exception as e:
+            print(f"[DEBUG] Remote report service failed ({e}); generating reports locally", flush=True)
+            return local_fn()
+
+    pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="report-hedge")
+    try:
+        remote = pool.submit(_timed_remote, remote_fn, breaker)
+        done, _ = wait([remote], timeout=hedge_after)
+        if done:
+            try:
+                return remote.result()
+            except Exception as e:
+                print(f"[DEBUG] Remote report service failed ({e}); generating reports locally", flush=True)
+                return local_fn()
+
+        print(f"[DEBUG] Remote report service slower than {hedge_after}s; hedging with local generation", flush=True)
+        breaker.record_hedge()
+        local = pool.submit(local_fn)
+        pending = {remote, local}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is None:
+                    return fut.result()
+        # both failed: surface the local error, it is the one we own
+        return local.result()
+    finally:
+        # never block the request on the losing call
+        pool.shutdown(wait=False)
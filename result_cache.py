@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+import time
+
+from session_storage import SESSION_TTL_SECONDS
+from sqlite_store import connect
+
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "0") == "1"
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", os.path.join("cache", "results.sqlite3"))
+# Never longer than the session folders the cached links point into
+RESULT_CACHE_TTL_SECONDS = min(int(os.getenv("RESULT_CACHE_TTL_SECONDS", str(SESSION_TTL_SECONDS))),
+                               SESSION_TTL_SECONDS)
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "500"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    cache_key TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_created_at ON results (created_at);
+"""
+
+
+def input_fingerprint(session_id: str, goal: str, file_hashes: list, **fields) -> str:
+    """
+    Key a run on its session, goal, the content hashes of its inventory
+    files and every other request field that ends up in the payload
+    (``folder_id``, ``email``, ``next_action_webhook``, ...). File order
+    does not matter.
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps([session_id, goal, sorted(file_hashes), fields], sort_keys=True, default=str).encode("utf-8"))
+    return "inputs:" + h.hexdigest()
+
+
+def idempotency_fingerprint(session_id: str, idempotency_key: str) -> str:
+    """Key a run on a client-supplied ``Idempotency-Key`` header."""
+    return f"idem:{session_id}:{idempotency_key}"
+
+
+class ResultCache:
+    """
+    Persistent store of completed ``market_payload`` results.
+
+    Entries expire after ``ttl_seconds`` and the table is trimmed to the
+    newest ``max_entries`` rows whenever a result is stored.
+    """
+
+    def __init__(self, path=RESULT_CACHE_PATH, ttl_seconds=RESULT_CACHE_TTL_SECONDS,
+                 max_entries=RESULT_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+    def get(self, cache_key: str):
+        if not cache_key:
+            return None
+        with connect(self.path, _SCHEMA) as conn:
+            row = conn.execute(
+                "SELECT payload, created_at FROM results WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return json.loads(row[0])
+
+    def put(self, cache_keys: list, session_id: str, payload: dict) -> None:
+        now = time.time()
+        body = json.dumps(payload, default=str)
+        with connect(self.path, _SCHEMA) as conn:
+            for key in filter(None, cache_keys):
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (cache_key, session_id, payload, created_at) VALUES (?, ?, ?, ?)",
+                    (key, session_id, body, now),
+                )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl_seconds,))
+        conn.execute(
+            "DELETE FROM results WHERE cache_key NOT IN "
+            "(SELECT cache_key FROM results ORDER BY created_at DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+
+
+result_cache = ResultCache()
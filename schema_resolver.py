@@ -0,0 +1,108 @@
+import difflib
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# Canonical field -> header variants seen in client exports (compared after normalisation)
+COMMON_SYNONYMS = {
+    "Category": ["category", "hardware type", "asset type", "device type", "software category"],
+    "Compliance Tags": ["compliance tags", "compliance", "compliance requirements", "compliance tag"],
+    "Vulnerabilities": ["vulnerabilities", "vulnerability count", "open vulnerabilities", "cves"],
+    "Vulnerability Severity": ["vulnerability severity", "severity", "max severity"],
+}
+
+HW_SYNONYMS = {
+    "Device Name": ["device name", "device name hostname", "hostname", "host name", "server name",
+                    "asset name", "computer name", "device", "server", "name"],
+    "Asset ID": ["asset id", "asset tag", "asset tag serial number", "device id", "server id", "serial number"],
+    "RAM (GB)": ["ram gb", "ram", "memory gb", "memory", "ram size gb"],
+    "Storage Capacity (Raw & Usable)": ["storage capacity raw usable", "storage capacity", "storage",
+                                        "disk capacity", "storage gb", "disk size"],
+    "Processor / CPU Specs": ["processor cpu specs", "processor", "cpu", "cpu specs", "cpu model"],
+    "Warranty Expiry Date": ["warranty expiry date", "warranty expiry", "warranty end date", "warranty end",
+                             "warranty expiration"],
+    "End of Life (EOL)": ["end of life eol", "end of life", "eol", "eol date", "end of life date"],
+    "Purchase Date": ["purchase date", "purchased", "acquisition date"],
+}
+
+SW_SYNONYMS = {
+    "App Name": ["app name", "application name", "application", "software name", "software", "app", "name"],
+    "App ID": ["app id", "application id", "software id"],
+    "License Status": ["license status", "licence status", "license state"],
+    "Throughput (Mbps)": ["throughput mbps", "throughput"],
+    "Latency (ms)": ["latency ms", "latency"],
+    "Uptime (%)": ["uptime", "uptime pct", "availability pct"],
+    "Max Users": ["max users", "number of users", "user count", "users"],
+}
+
+# Identifier fields in priority order; any header ending in 'id' is the fallback
+ID_FIELDS = {"hardware": ["Device Name", "Asset ID"], "software": ["App Name", "App ID"]}
+
+FUZZY_CUTOFF = 0.88
+
+ResolvedSchema = namedtuple("ResolvedSchema", ["renames", "id_column"])
+
+
+def normalize_header(header) -> str:
+    """Lowercase, drop punctuation and collapse whitespace: ``" RAM (GB) "`` -> ``"ram gb"``."""
+    text = re.sub(r"[^0-9a-z]+", " ", str(header).lower())
+    return " ".join(text.split())
+
+
+def _synonyms(kind):
+    table = dict(COMMON_SYNONYMS)
+    table.update(HW_SYNONYMS if kind == "hardware" else SW_SYNONYMS)
+    return {canonical: [normalize_header(s) for s in [canonical, *variants]]
+            for canonical, variants in table.items()}
+
+
+@lru_cache(maxsize=256)
+def resolve_schema(columns: tuple, kind: str) -> ResolvedSchema:
+    """
+    Map a file's headers to canonical field names, once per distinct header
+    signature. Exact synonym matches win; remaining headers are fuzzy-matched.
+    Headers that are already canonical, or whose canonical name is taken,
+    are left alone.
+    """
+    synonyms = _synonyms(kind)
+    lookup = {}
+    for canonical, variants in synonyms.items():
+        for variant in variants:
+            lookup.setdefault(variant, canonical)
+
+    present = set(columns)
+    taken = {c for c in columns if c in synonyms}
+    renames = {}
+    unresolved = []
+    for col in columns:
+        if col in synonyms:
+            continue
+        canonical = lookup.get(normalize_header(col))
+        if canonical and canonical not in taken and canonical not in present:
+            renames[col] = canonical
+            taken.add(canonical)
+        else:
+            unresolved.append(col)
+
+    variants = list(lookup)
+    for col in unresolved:
+        match = difflib.get_close_matches(normalize_header(col), variants, n=1, cutoff=FUZZY_CUTOFF)
+        if match:
+            canonical = lookup[match[0]]
+            if canonical not in taken and canonical not in present:
+                renames[col] = canonical
+                taken.add(canonical)
+
+    resolved = [renames.get(c, c) for c in columns]
+    id_column = next((f for f in ID_FIELDS[kind] if f in resolved), None)
+    if id_column is None:
+        id_column = next((c for c in resolved if str(c).lower().endswith("id")), None)
+    return ResolvedSchema(renames, id_column)
+
+
+def apply_schema(df, kind: str):
+    """Rename ``df``'s headers to canonical names; returns ``(df, schema)``."""
+    schema = resolve_schema(tuple(df.columns), kind)
+    if schema.renames:
+        df = df.rename(columns=schema.renames)
+    return df, schema
@@ -0,0 +1,231 @@
+import fcntl
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(24 * 3600)))
+SESSION_STORAGE_MAX_BYTES = int(os.getenv("SESSION_STORAGE_MAX_BYTES", str(2 * 1024 ** 3)))
+SESSION_SWEEP_INTERVAL = int(os.getenv("SESSION_SWEEP_INTERVAL", "300"))
+# pins older than this are treated as leaked by a crashed worker
+SESSION_PIN_MAX_AGE = int(os.getenv("SESSION_PIN_MAX_AGE", str(6 * 3600)))
+
+ACCESS_MARKER = ".last_access"
+PINS_DIR = ".pins"
+LOCK_FILE = ".storage.lock"
+STATS_FILE = ".storage_stats.json"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    stack = [path]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        total += entry.stat(follow_symlinks=False).st_size
+                except FileNotFoundError:
+                    continue
+    return total
+
+
+class SessionStorage:
+    """
+    Bound the size and age of the ``temp_sessions`` tree.
+
+    Sessions idle for longer than ``ttl_seconds`` are removed, then the least
+    recently used ones until the tree fits in ``max_bytes``. Sessions pinned
+    by an in-flight assessment are never evicted. All bookkeeping lives in
+    the directory itself (marker files plus an flock), so several gunicorn
+    workers can share it.
+    """
+
+    def __init__(self, root, ttl_seconds=SESSION_TTL_SECONDS, max_bytes=SESSION_STORAGE_MAX_BYTES,
+                 pin_max_age=SESSION_PIN_MAX_AGE):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.pin_max_age = pin_max_age
+        self._sweeper = None
+        self._stop = threading.Event()
+
+    def _session_dir(self, session_id):
+        return os.path.join(self.root, session_id)
+
+    def touch(self, session_id: str) -> None:
+        """Record an access so LRU eviction sees the session as recently used."""
+        session_dir = self._session_dir(session_id)
+        if not os.path.isdir(session_dir):
+            return
+        marker = os.path.join(session_dir, ACCESS_MARKER)
+        with open(marker, "a"):
+            pass
+        os.utime(marker)
+
+    @contextmanager
+    def pin(self, session_id: str):
+        """Protect a session from eviction while the block runs."""
+        pins = os.path.join(self._session_dir(session_id), PINS_DIR)
+        pin_path = os.path.join(pins, f"{os.getpid()}-{uuid.uuid4().hex}")
+        # a sweep holds the lock exclusively: the pin lands before its scan or after its deletions
+        with self._locked(shared=True):
+            os.makedirs(pins, exist_ok=True)
+            with open(pin_path, "w"):
+                pass
+        try:
+            yield
+        finally:
+            try:
+                os.remove(pin_path)
+            except FileNotFoundError:
+                pass
+            self.touch(session_id)
+
+    def _is_pinned(self, session_dir, now):
+        pins = os.path.join(session_dir, PINS_DIR)
+        if not os.path.isdir(pins):
+            return False
+        for name in os.listdir(pins):
+            path = os.path.join(pins, name)
+            try:
+                pid = int(name.split("-", 1)[0])
+                age = now - os.stat(path).st_mtime
+            except (ValueError, FileNotFoundError):
+                continue
+            if _pid_alive(pid) and age < self.pin_max_age:
+                return True
+        return False
+
+    def _scan(self, now):
+        sessions = []
+        if not os.path.isdir(self.root):
+            return sessions
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if entry.name.startswith(".") or not entry.is_dir(follow_symlinks=False):
+                    continue
+                marker = os.path.join(entry.path, ACCESS_MARKER)
+                try:
+                    last_used = max(entry.stat().st_mtime, os.stat(marker).st_mtime)
+                except FileNotFoundError:
+                    last_used = entry.stat().st_mtime
+                sessions.append({
+                    "session_id": entry.name,
+                    "path": entry.path,
+                    "bytes": _dir_size(entry.path),
+                    "last_used": last_used,
+                    "pinned": self._is_pinned(entry.path, now),
+                })
+        return sessions
+
+    @contextmanager
+    def _locked(self, blocking=True, shared=False):
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, LOCK_FILE), "a+") as fh:
+            try:
+                mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+                fcntl.flock(fh, mode | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _read_counters(self):
+        try:
+            with open(os.path.join(self.root, STATS_FILE)) as fh:
+                return json.load(fh)
+        except (FileNotFoundError, ValueError):
+            return {"evicted_sessions": 0, "evicted_bytes": 0, "expired": 0, "over_budget": 0, "last_sweep": None}
+
+    def _write_counters(self, counters):
+        path = os.path.join(self.root, STATS_FILE)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(counters, fh)
+        os.replace(tmp, path)
+
+    def sweep(self) -> dict:
+        """Evict expired and over-budget sessions; returns this sweep's evictions."""
+        now = time.time()
+        result = {"evicted": [], "bytes_freed": 0}
+        with self._locked(blocking=False) as acquired:
+            if not acquired:
+                # another worker is sweeping right now
+                return result
+            counters = self._read_counters()
+            sessions = self._scan(now)
+            candidates = sorted((s for s in sessions if not s["pinned"]), key=lambda s: s["last_used"])
+            total = sum(s["bytes"] for s in sessions)
+
+            for s in candidates:
+                expired = now - s["last_used"] > self.ttl_seconds
+                over_budget = total > self.max_bytes
+                if not (expired or over_budget):
+                    continue
+                # the scan is a snapshot; never delete a session pinned since
+                if self._is_pinned(s["path"], time.time()):
+                    continue
+                shutil.rmtree(s["path"], ignore_errors=True)
+                total -= s["bytes"]
+                result["evicted"].append(s["session_id"])
+                result["bytes_freed"] += s["bytes"]
+                counters["expired" if expired else "over_budget"] += 1
+
+            counters["evicted_sessions"] += len(result["evicted"])
+            counters["evicted_bytes"] += result["bytes_freed"]
+            counters["last_sweep"] = now
+            self._write_counters(counters)
+        if result["evicted"]:
+            print(f"[STORAGE] Evicted {len(result['evicted'])} sessions, freed {result['bytes_freed']} bytes", flush=True)
+        return result
+
+    def stats(self) -> dict:
+        """Current usage of the session tree plus cumulative eviction counters."""
+        now = time.time()
+        sessions = self._scan(now)
+        return {
+            "sessions": len(sessions),
+            "pinned_sessions": sum(1 for s in sessions if s["pinned"]),
+            "bytes": sum(s["bytes"] for s in sessions),
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            **self._read_counters(),
+        }
+
+    def start_sweeper(self, interval=SESSION_SWEEP_INTERVAL):
+        """Run ``sweep`` every ``interval`` seconds on a daemon thread."""
+        if interval <= 0 or (self._sweeper and self._sweeper.is_alive()):
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"[WARN] Session sweep failed: {e}", flush=True)
+
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=loop, name="session-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stop.set()
@@ -0,0 +1,60 @@
+import threading
+from contextvars import ContextVar
+
+# Set by the batch runner so concurrent sessions share lookups and narratives.
+# Outside a batch both are None and every call computes directly.
+market_memo = ContextVar("market_memo", default=None)
+narrative_memo = ContextVar("narrative_memo", default=None)
+
+
+class SharedMemo:
+    """
+    Thread-safe single-flight memo: the first caller for a key computes the
+    value while concurrent callers for the same key wait for it. Failures
+    are not cached, so the next caller retries. This only deduplicates
+    identical calls; it does not group different prompts into one request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        while True:
+            with self._lock:
+                if key in self._values:
+                    self.hits += 1
+                    return self._values[key]
+                event = self._inflight.get(key)
+                if event is None:
+                    event = self._inflight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            event.wait()
+        try:
+            value = compute()
+        except BaseException:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+            raise
+        with self._lock:
+            self._values[key] = value
+            del self._inflight[key]
+        event.set()
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._values), "hits": self.hits, "misses": self.misses}
+
+
+def memoized(var: ContextVar, key, compute):
+    """``compute()`` through the memo bound to ``var``, or directly when none is bound."""
+    memo = var.get()
+    if memo is None:
+        return compute()
+    return memo.get_or_compute(key, compute)
@@ -0,0 +1,165 @@
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Coalesce duplicate assessment requests for the same session and inputs
+COALESCE_ENABLED = os.getenv("COALESCE_ENABLED", "1") == "1"
+# Seconds a finished run's result is also handed to duplicates arriving after it (0 = only while in flight)
+COALESCE_RESULT_SECONDS = float(os.getenv("COALESCE_RESULT_SECONDS", "120"))
+# Longest a request waits for another run of its session before giving up with 409 (capped by its deadline)
+COALESCE_WAIT_SECONDS = float(os.getenv("COALESCE_WAIT_SECONDS", "300"))
+
+# Under the session folder; dot-prefixed so it is never served or bundled
+INFLIGHT_DIR = ".inflight"
+LOCK_NAME = "session.lock"
+
+_POLL_SECONDS = 0.2
+# Retry-After suggested to a request that gave up waiting for its session
+_RETRY_AFTER_SECONDS = 30
+
+# Request fields that make two requests the same run
+FINGERPRINT_FIELDS = ("session_id", "email", "goal", "files", "next_action_webhook", "folder_id",
+                      "incremental", "chunked", "profile", "local_only")
+
+
+def request_fingerprint(data: dict) -> str:
+    """Hash of the request fields that determine a run; key order and unrelated fields do not matter."""
+    fields = {k: data.get(k) for k in FINGERPRINT_FIELDS}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class SessionBusy(Exception):
+    """Raised when another run of the session did not finish within the wait."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs each ``(session_id, fingerprint)`` once at a time. Duplicates in the
+    same process wait for the running call and share its result. Across
+    gunicorn workers, an flock on the session's lock file serialises runs of
+    the session; a worker that gets the lock first checks for a result the
+    previous holder stored for the same fingerprint. Runs of one session
+    with different inputs wait for each other instead of racing on the
+    session folder. Waits are bounded, so a stuck run cannot hold the
+    callers' admission slots indefinitely.
+    """
+
+    def __init__(self, root: str, result_seconds: float = COALESCE_RESULT_SECONDS,
+                 wait_seconds: float = COALESCE_WAIT_SECONDS):
+        self.root = root
+        self.result_seconds = result_seconds
+        self.wait_seconds = wait_seconds
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.coalesced = 0
+
+    def run(self, session_id: str, fingerprint: str, compute, max_wait: float = None):
+        """
+        ``compute()`` once per duplicate group; raises ``SessionBusy`` when the
+        session stays busy for ``max_wait`` seconds (default ``wait_seconds``).
+        """
+        max_wait = self.wait_seconds if max_wait is None else min(max_wait, self.wait_seconds)
+        key = (session_id, fingerprint)
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            print(f"[DEBUG] Attaching duplicate request to the running assessment for {session_id}", flush=True)
+            if not flight.done.wait(max(0.0, max_wait)):
+                raise SessionBusy(f"Assessment for {session_id} is still running", _RETRY_AFTER_SECONDS)
+            with self._lock:
+                self.coalesced += 1
+            if flight.error is not None:
+                raise flight.error
+            return self._mark(flight.result)
+        try:
+            flight.result = self._run_locked(session_id, fingerprint, compute, max_wait)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    @staticmethod
+    def _mark(result):
+        return {**result, "coalesced": True} if isinstance(result, dict) else result
+
+    def _lock_session(self, fh, session_id, max_wait):
+        # polled, so a run of this session in another worker can only hold us up for max_wait
+        give_up = time.monotonic() + max_wait
+        while True:
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                remaining = give_up - time.monotonic()
+                if remaining <= 0:
+                    raise SessionBusy(f"Another assessment of {session_id} is still running",
+                                      _RETRY_AFTER_SECONDS)
+                time.sleep(min(_POLL_SECONDS, remaining))
+
+    def _run_locked(self, session_id, fingerprint, compute, max_wait):
+        directory = os.path.join(self.root, session_id, INFLIGHT_DIR)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, LOCK_NAME), "a+") as fh:
+            self._lock_session(fh, session_id, max_wait)
+            try:
+                stored = self._load(directory, fingerprint)
+                if stored is not None:
+                    with self._lock:
+                        self.coalesced += 1
+                    print(f"[DEBUG] Serving duplicate request for {session_id} from the run that just finished",
+                          flush=True)
+                    return self._mark(stored)
+                result = compute()
+                if self.result_seconds > 0 and isinstance(result, dict) and "error" not in result:
+                    self._store(directory, fingerprint, result)
+                return result
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _load(self, directory, fingerprint):
+        path = os.path.join(directory, f"{fingerprint}.json")
+        try:
+            if time.time() - os.path.getmtime(path) > self.result_seconds:
+                return None
+            with open(path) as fh:
+                return json.load(fh)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _store(self, directory, fingerprint, result):
+        now = time.time()
+        # only the newest results are ever read back
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith(".json") and now - os.path.getmtime(path) > self.result_seconds:
+                os.remove(path)
+        path = os.path.join(directory, f"{fingerprint}.json")
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(result, fh, default=str)
+        os.replace(tmp, path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._flights), "coalesced": self.coalesced}
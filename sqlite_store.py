@@ -0,0 +1,25 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+
+@contextmanager
+def connect(path: str, schema: str = ""):
+    """
+    Open a SQLite database that is safe to share between threads and gunicorn
+    workers: one short-lived autocommit connection per use, WAL journaling and
+    a generous busy timeout. ``schema`` is executed on every open, so it
+    should only contain ``CREATE ... IF NOT EXISTS`` statements.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if schema:
+            conn.executescript(schema)
+        yield conn
+    finally:
+        conn.close()
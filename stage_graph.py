@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextvars import copy_context
+
+from profiling import follow
+
+# Threads available to one pipeline run
+STAGE_WORKERS = int(os.getenv("STAGE_WORKERS", "8"))
+# Worker processes shared by CPU-bound stages (0 runs them on the thread pool instead)
+STAGE_PROCESS_WORKERS = int(os.getenv("STAGE_PROCESS_WORKERS", "0"))
+
+Stage = namedtuple("Stage", ["name", "fn", "inputs", "outputs", "pool"])
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def process_pool():
+    """The shared process pool for ``pool="process"`` stages, or ``None`` when disabled."""
+    global _process_pool
+    if STAGE_PROCESS_WORKERS <= 0:
+        return None
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=STAGE_PROCESS_WORKERS)
+        return _process_pool
+
+
+def _timed(fn, kwargs):
+    # wall-clock stamps so timings from worker processes line up with the parent's
+    started = time.time()
+    result = fn(**kwargs)
+    return started, time.time(), result
+
+
+class StageGraph:
+    """
+    A pipeline of named stages. Each stage declares the values it reads and
+    the values it produces; a stage starts as soon as every value it reads
+    is available, so independent stages run concurrently. Stage functions
+    are called with their inputs as keyword arguments and return their
+    single output, or a tuple when they declare several.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self._producers = {}
+
+    def add(self, name, fn, inputs=(), outputs=(), pool="thread"):
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage {name}")
+        for output in outputs:
+            if output in self._producers:
+                raise ValueError(f"{output} is produced by both {self._producers[output]} and {name}")
+            self._producers[output] = name
+        self.stages[name] = Stage(name, fn, tuple(inputs), tuple(outputs), pool)
+        return self
+
+    def dependencies(self, available=()) -> dict:
+        """Map each stage to the stages producing its inputs; rejects missing inputs and cycles."""
+        deps = {}
+        for stage in self.stages.values():
+            needed = set()
+            for value in stage.inputs:
+                if value in self._producers:
+                    needed.add(self._producers[value])
+                elif value not in available:
+                    raise ValueError(f"Stage {stage.name} needs {value}, which no stage produces")
+            deps[stage.name] = needed
+        self._order(deps)
+        return deps
+
+    @staticmethod
+    def _order(deps):
+        order, remaining = [], {name: set(d) for name, d in deps.items()}
+        while remaining:
+            ready = [name for name, d in remaining.items() if not d]
+            if not ready:
+                raise ValueError(f"Stage cycle between {sorted(remaining)}")
+            for name in ready:
+                order.append(name)
+                del remaining[name]
+            for d in remaining.values():
+                d.difference_update(ready)
+        return order
+
+    def run(self, context: dict, workers: int = STAGE_WORKERS, processes=None, monitor=None):
+        """
+        Run every stage and return ``(values, report)``: the context extended
+        with all stage outputs, and per-stage timings plus the critical path.
+        With a running ``memory_budget.MemoryMonitor`` the report also carries
+        each stage's peak memory. The first stage failure is re-raised once
+        in-flight stages finish; stages depending on it never start.
+        """
+        values = dict(context)
+        deps = self.dependencies(values)
+        waiting = {name: set(d) for name, d in deps.items()}
+        dependents = {name: [n for n, d in deps.items() if name in d] for name in deps}
+        timings, futures, failure = {}, {}, None
+        processes = processes if processes is not None else process_pool()
+        origin = time.time()
+
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="stage") as threads:
+            def submit(name):
+                stage = self.stages[name]
+                kwargs = {value: values[value] for value in stage.inputs}
+                if stage.pool == "process" and processes is not None:
+                    future = processes.submit(_timed, stage.fn, kwargs)
+                else:
+                    # thread stages see the caller's context variables (e.g. batch memos)
+                    future = threads.submit(copy_context().run, follow(_timed), stage.fn, kwargs)
+                futures[future] = name
+
+            for name in self._order(deps):
+                if not waiting[name]:
+                    submit(name)
+            while futures:
+                done, _ = wait(list(futures), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = futures.pop(future)
+                    try:
+                        started, ended, result = future.result()
+                    except Exception as e:
+                        print(f"[DEBUG] Stage {name} failed: {e}", flush=True)
+                        failure = failure or e
+                        continue
+                    timings[name] = (started, ended)
+                    outputs = self.stages[name].outputs
+                    if len(outputs) == 1:
+                        values[outputs[0]] = result
+                    elif outputs:
+                        values.update(zip(outputs, result))
+                    if failure is None:
+                        for dependent in dependents[name]:
+                            waiting[dependent].discard(name)
+                            if not waiting[dependent]:
+                                submit(dependent)
+
+        if failure is not None:
+            raise failure
+        report = self._report(timings, deps, origin, time.time(), monitor)
+        print(f"[DEBUG] Stages finished in {report['wall_seconds']}s "
+              f"(critical path {report['critical_path_seconds']}s: {' -> '.join(report['critical_path'])})", flush=True)
+        return values, report
+
+    def _report(self, timings, deps, origin, finished, monitor=None):
+        durations = {name: ended - started for name, (started, ended) in timings.items()}
+        path_seconds, previous = {}, {}
+        for name in self._order(deps):
+            before = max(deps[name], key=lambda n: path_seconds[n], default=None)
+            path_seconds[name] = durations[name] + (path_seconds[before] if before else 0.0)
+            previous[name] = before
+        path = []
+        name = max(path_seconds, key=path_seconds.get, default=None)
+        critical_seconds = path_seconds.get(name, 0.0)
+        while name is not None:
+            path.append(name)
+            name = previous[name]
+        stages = {}
+        for name, (started, ended) in sorted(timings.items(), key=lambda item: item[1][0]):
+            stages[name] = {"start": round(started - origin, 3), "seconds": round(durations[name], 3),
+                            "pool": self.stages[name].pool}
+            if monitor is not None:
+                stages[name]["memory"] = monitor.window(started, ended)
+        report = {
+            "stages": stages,
+            "critical_path": path[::-1],
+            "critical_path_seconds": round(critical_seconds, 3),
+            "stage_seconds": round(sum(durations.values()), 3),
+            "wall_seconds": round(finished - origin, 3),
+        }
+        if monitor is not None:
+            report["memory"] = monitor.summary()
+        return report
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.getcwd())
+
+import webhook_outbox
+
+
+@pytest.fixture(autouse=True)
+def isolated_outbox(tmp_path, monkeypatch):
+    # runs enqueue into the shared outbox; keep them out of the working directory's cache/
+    monkeypatch.setattr(webhook_outbox.webhook_outbox, "path", str(tmp_path / "webhook_outbox.sqlite3"))
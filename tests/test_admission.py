@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.getcwd())
+
+import app as app_module
+from admission import AdmissionController, AdmissionRejected, inventory_weight
+
+
+def test_inventory_weight(tmp_path):
+    src = tmp_path / "hw.xlsx"
+    src.write_bytes(b"x" * 250)
+    assert inventory_weight([]) == 1
+    assert inventory_weight([{"file_url": str(src)}], bytes_per_unit=100, max_weight=5) == 3
+    assert inventory_weight([{"size": 10 ** 9}], bytes_per_unit=100, max_weight=2) == 2
+
+
+def test_global_slots_are_shared_between_controllers(tmp_path):
+    # two controllers stand in for two gunicorn workers sharing the lock dir
+    a = AdmissionController(local_capacity=2, global_capacity=2, queue_size=0, wait_seconds=0.2,
+                            lock_dir=str(tmp_path), reserved_light=0)
+    b = AdmissionController(local_capacity=2, global_capacity=2, queue_size=1, wait_seconds=0.2,
+                            lock_dir=str(tmp_path), reserved_light=0)
+    with a.admit(), a.admit():
+        with pytest.raises(AdmissionRejected) as exc:
+            with b.admit():
+                pass
+        assert exc.value.retry_after >= 1
+    with b.admit():
+        assert b.snapshot()["local_used"] == 1
+
+
+def test_heavy_jobs_leave_reserved_slot_for_light_ones(tmp_path):
+    ctl = AdmissionController(local_capacity=3, global_capacity=3, queue_size=0, wait_seconds=0.1,
+                              lock_dir=str(tmp_path), reserved_light=1)
+    with ctl.admit(weight=2):
+        with pytest.raises(AdmissionRejected):
+            with ctl.admit(weight=2):
+                pass
+        with ctl.admit(weight=1):
+            pass
+
+
+def test_start_assessment_returns_429_when_full(monkeypatch, tmp_path):
+    ctl = AdmissionController(local_capacity=1, global_capacity=1, queue_size=0, wait_seconds=0.1,
+                              lock_dir=str(tmp_path), reserved_light=0)
+    monkeypatch.setattr(app_module, "admission", ctl)
+    monkeypatch.setattr(app_module, "process_assessment", lambda data: {"ok": True})
+    client = app_module.app.test_client()
+    body = {"session_id": "s", "email": "e", "goal": "g", "files": []}
+    with ctl.admit():
+        resp = client.post("/start_assessment", json=body)
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+    assert client.post("/start_assessment", json=body).status_code == 200
@@ -0,0 +1,67 @@
+import io
+import os
+import sys
+import zipfile
+
+sys.path.insert(0, os.getcwd())
+
+from app import app
+
+
+def make_session(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    session_dir = tmp_path / "temp_sessions" / "s1"
+    (session_dir / "charts").mkdir(parents=True)
+    (session_dir / "report.docx").write_bytes(b"docx-bytes" * 100)
+    (session_dir / "summary.json").write_text('{"k": "v"}' * 500)
+    (session_dir / "charts" / "hw_tier_chart.png").write_bytes(b"png")
+    return session_dir
+
+
+def test_conditional_and_range_requests(tmp_path, monkeypatch):
+    make_session(tmp_path, monkeypatch)
+    client = app.test_client()
+
+    first = client.get("/files/s1/report.docx")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert not etag.startswith("W/")
+
+    again = client.get("/files/s1/report.docx", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+
+    partial = client.get("/files/s1/report.docx", headers={"Range": "bytes=0-3"})
+    assert partial.status_code == 206
+    assert partial.data == b"docx"
+
+    assert client.get("/files/s1/../../etc/passwd").status_code == 404
+
+
+def test_etag_cache_is_bounded(tmp_path, monkeypatch):
+    import artifact_serving
+    monkeypatch.setattr(artifact_serving, "ETAG_CACHE_MAX_ENTRIES", 2)
+    monkeypatch.setattr(artifact_serving, "_etag_cache", artifact_serving.OrderedDict())
+    paths = []
+    for i in range(3):
+        paths.append(tmp_path / f"a{i}.txt")
+        paths[-1].write_text(str(i))
+        artifact_serving.content_etag(str(paths[-1]))
+    assert list(artifact_serving._etag_cache) == [str(paths[1]), str(paths[2])]
+
+    paths[2].write_text("changed")
+    os.utime(paths[2], ns=(0, 0))
+    artifact_serving.content_etag(str(paths[2]))
+    assert len(artifact_serving._etag_cache) == 2
+
+
+def test_bundle_streams_all_artifacts(tmp_path, monkeypatch):
+    make_session(tmp_path, monkeypatch)
+    client = app.test_client()
+
+    resp = client.get("/bundles/s1.zip")
+    assert resp.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(resp.data)) as zf:
+        assert sorted(zf.namelist()) == ["charts/hw_tier_chart.png", "report.docx", "summary.json"]
+        assert zf.read("report.docx") == b"docx-bytes" * 100
+
+    assert client.get("/bundles/missing.zip").status_code == 404
@@ -0,0 +1,71 @@
+import os
+import sys
+import zipfile
+
+import matplotlib
+import pandas as pd
+
+sys.path.insert(0, os.getcwd())
+
+import generate_assessment
+from artifact_store import ArtifactStore, image_source, make_artifact, render_artifact
+from report_docx import generate_docx_report
+from report_pptx import generate_pptx_report
+from visualization import generate_charts
+
+
+def test_store_persists_only_on_request(tmp_path):
+    store = ArtifactStore(str(tmp_path / "sess"))
+    artifact = store.put(render_artifact("charts/a.png", lambda buf: buf.write(b"png")))
+    assert artifact.mimetype == "image/png"
+    assert store.get("charts/a.png").data == b"png"
+    assert not (tmp_path / "sess").exists()
+
+    written = store.persist()
+    assert written == [str(tmp_path / "sess" / "charts" / "a.png")]
+    assert (tmp_path / "sess" / "charts" / "a.png").read_bytes() == b"png"
+    assert image_source(written[0]) == written[0]
+    assert image_source(artifact).read() == b"png"
+    assert image_source("missing.png") is None
+
+
+def test_reports_embed_in_memory_charts(tmp_path, monkeypatch):
+    matplotlib.use("Agg")
+    monkeypatch.chdir(tmp_path)
+    hw_df = pd.DataFrame({"Tier": ["1"], "Status": ["Active"]})
+    charts = generate_charts(hw_df, None, "temp_sessions/mem", in_memory=True)
+    assert sorted(charts) == ["hw_status_chart", "hw_tier_chart"]
+
+    docx = generate_docx_report("mem", hw_df, None, charts, as_artifact=True)
+    pptx = generate_pptx_report("mem", hw_df, None, charts, as_artifact=True)
+    assert not os.path.exists("temp_sessions")
+    with zipfile.ZipFile(image_source(docx)) as zf:
+        assert any(name.startswith("word/media/") for name in zf.namelist())
+    with zipfile.ZipFile(image_source(pptx)) as zf:
+        assert any(name.startswith("ppt/media/") for name in zf.namelist())
+
+
+def test_upload_artifact_streams_from_memory(tmp_path, monkeypatch):
+    streamed = []
+
+    def fake_stream(stream, name, folder_id, mimetype, local_path=None):
+        streamed.append((stream.read(), name, mimetype, local_path))
+        return f"https://drive/{name}"
+
+    monkeypatch.setattr(generate_assessment, "upload_stream_to_drive", fake_stream)
+    monkeypatch.setattr(generate_assessment, "drive_configured", lambda: True)
+    store = ArtifactStore(str(tmp_path))
+    link = generate_assessment.upload_artifact(make_artifact("Report.docx", b"doc"), store, "folder")
+    assert link == "https://drive/Report.docx"
+    assert streamed[0][0] == b"doc"
+    assert streamed[0][3] == str(tmp_path / "Report.docx")
+    assert store.names() == ["Report.docx"]
+
+
+def test_upload_without_drive_returns_a_written_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(generate_assessment, "drive_configured", lambda: False)
+    store = ArtifactStore(str(tmp_path))
+    path = generate_assessment.upload_artifact(make_artifact("Report.docx", b"doc"), store, "folder")
+    assert path == str(tmp_path / "Report.docx")
+    with open(path, "rb") as fh:
+        assert fh.read() == b"doc"
@@ -0,0 +1,116 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.getcwd())
+
+import app as app_module
+import batch
+import market_lookup
+from shared_work import SharedMemo
+
+
+def test_shared_memo_single_flight():
+    memo = SharedMemo()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(memo.get_or_compute("k", compute))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    assert memo.stats() == {"entries": 1, "hits": 4, "misses": 1}
+
+
+def test_batch_shares_lookups_and_isolates_failures(monkeypatch):
+    lookups = []
+
+    def fake_fetch(name, kind="hardware"):
+        lookups.append(name)
+        return {"Recommended Model": f"new-{name}"}
+
+    def fake_process(data):
+        if data["session_id"] == "bad":
+            raise RuntimeError("boom")
+        hw = market_lookup.pd.DataFrame({"Device Name": ["srv1", "srv2", "srv1"]})
+        out = market_lookup.suggest_hw_replacements(hw)
+        return {"session_id": data["session_id"], "models": out["Recommended Model"].tolist()}
+
+    monkeypatch.setattr(market_lookup, "fetch_market_device_data", fake_fetch)
+    monkeypatch.setattr(batch, "process_assessment", fake_process)
+    specs = [
+        {"session_id": "a", "email": "a@x", "goal": "g"},
+        {"session_id": "bad", "email": "b@x", "goal": "g"},
+        {"session_id": "c", "email": "c@x", "goal": "g"},
+        {"session_id": "d", "email": "d@x"},
+    ]
+    out = batch.run_batch(specs, workers=3)
+
+    statuses = [s["status"] for s in out["sessions"]]
+    assert [s["session_id"] for s in out["sessions"]] == ["a", "bad", "c", "d"]
+    assert statuses == ["ok", "error", "ok", "error"]
+    assert out["sessions"][0]["result"]["models"] == ["new-srv1", "new-srv2", "new-srv1"]
+    assert "goal" in out["sessions"][3]["error"]
+    assert sorted(lookups) == ["srv1", "srv2"]
+    assert out["summary"] == {"ok": 2, "error": 2, "rejected": 0}
+
+
+def _wait_for(jobs, job_id, timeout=5):
+    end = time.time() + timeout
+    while time.time() < end:
+        job = jobs.get(job_id)
+        if job["status"] != "running":
+            return job
+        time.sleep(0.02)
+    raise AssertionError("batch job did not finish")
+
+
+def test_batch_endpoint_runs_in_background(tmp_path, monkeypatch):
+    release = threading.Event()
+    def slow_batch(specs):
+        release.wait(5)
+        return {"sessions": specs}
+    monkeypatch.setattr(batch, "run_batch", slow_batch)
+    monkeypatch.setattr(app_module, "batch_jobs", batch.BatchJobs(str(tmp_path / "jobs.sqlite3")))
+    client = app_module.app.test_client()
+    assert client.post("/batch_assessment", json={}).status_code == 400
+    assert client.post("/batch_assessment", json={"sessions": ["x"]}).status_code == 400
+    assert client.get("/batch_assessment/unknown").status_code == 404
+
+    resp = client.post("/batch_assessment", json={"sessions": [{"session_id": "a"}]})
+    assert resp.status_code == 202
+    job_id = resp.get_json()["job_id"]
+    assert resp.get_json()["status_url"] == f"/batch_assessment/{job_id}"
+    assert client.get(f"/batch_assessment/{job_id}").get_json()["status"] == "running"
+
+    release.set()
+    _wait_for(app_module.batch_jobs, job_id)
+    job = client.get(f"/batch_assessment/{job_id}").get_json()
+    assert job["status"] == "done" and job["sessions"] == 1
+    assert job["result"]["sessions"] == [{"session_id": "a"}]
+
+
+def test_batch_job_failures_and_lost_workers(tmp_path, monkeypatch):
+    jobs = batch.BatchJobs(str(tmp_path / "jobs.sqlite3"))
+    def broken(specs):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(batch, "run_batch", broken)
+    job = _wait_for(jobs, jobs.submit([{"session_id": "a"}]))
+    assert job["status"] == "failed" and job["error"] == "boom"
+
+    # a job left running by a worker that no longer exists
+    hold = threading.Event()
+    monkeypatch.setattr(batch, "run_batch", lambda specs: hold.wait(5) and {})
+    job_id = jobs.submit([{"session_id": "b"}])
+    monkeypatch.setattr(batch, "_pid_alive", lambda pid: False)
+    assert jobs.get(job_id)["status"] == "lost"
+    hold.set()
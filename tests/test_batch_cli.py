@@ -0,0 +1,92 @@
+import csv
+import json
+import os
+import shutil
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.getcwd())
+
+import batch_cli
+import generate_assessment
+
+
+def write_inventory(path, **columns):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pd.DataFrame(columns).to_excel(path, index=False)
+
+
+def test_discover_sessions_from_directory(tmp_path):
+    write_inventory(str(tmp_path / "clientA" / "servers.xlsx"), **{"Device Name": ["srv1"]})
+    write_inventory(str(tmp_path / "clientA" / "apps.xlsx"), **{"App Name": ["Office"]})
+    write_inventory(str(tmp_path / "clientB.xlsx"), **{"Device Name": ["srv2"]})
+    (tmp_path / "notes.txt").write_text("not an inventory")
+
+    specs = batch_cli.discover_sessions(str(tmp_path), goal="g", email="e")
+    assert [s["session_id"] for s in specs] == ["clientA", "clientB"]
+    assert [f["file_name"] for f in specs[0]["files"]] == ["apps.xlsx", "servers.xlsx"]
+    assert specs[1]["files"][0] == {"file_name": "clientB.xlsx", "file_url": str(tmp_path / "clientB.xlsx"),
+                                    "type": "asset_inventory"}
+    assert specs[0]["goal"] == "g" and specs[0]["email"] == "e"
+
+
+def test_discover_sessions_from_manifests(tmp_path):
+    (tmp_path / "sessions.json").write_text(json.dumps({"sessions": [
+        {"session_id": "s1", "goal": "own goal", "files": ["a.xlsx", {"file_url": "b.xlsx", "type": "software"}]},
+    ]}))
+    specs = batch_cli.discover_sessions(str(tmp_path / "sessions.json"), goal="g")
+    assert specs[0]["goal"] == "own goal"
+    assert [f["file_url"] for f in specs[0]["files"]] == [str(tmp_path / "a.xlsx"), str(tmp_path / "b.xlsx")]
+    assert specs[0]["files"][1]["type"] == "software"
+
+    with open(tmp_path / "sessions.csv", "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerows([("session_id", "file", "type"), ("s1", "a.xlsx", "hardware"), ("s1", "b.xlsx", ""),
+                          ("s2", "c.xlsx", "")])
+    specs = batch_cli.discover_sessions(str(tmp_path / "sessions.csv"))
+    assert [(s["session_id"], len(s["files"])) for s in specs] == [("s1", 2), ("s2", 1)]
+    assert [f["type"] for f in specs[0]["files"]] == ["hardware", "asset_inventory"]
+
+
+def test_drain_outbox_delivers_past_one_pass(tmp_path, monkeypatch):
+    import webhook_outbox
+    posted = []
+    monkeypatch.setattr(webhook_outbox, "post_webhook", lambda url, payload, key=None: posted.append(payload))
+    outbox = webhook_outbox.WebhookOutbox(str(tmp_path / "outbox.sqlite3"))
+    monkeypatch.setattr(batch_cli, "webhook_outbox", outbox)
+    for i in range(120):
+        outbox.enqueue("http://hook", {"session_id": f"s{i}"})
+
+    assert batch_cli.drain_outbox() == {"delivered": 120, "retrying": 0, "failed": 0}
+    assert len(posted) == 120 and outbox.stats()["pending"] == 0
+
+
+def test_local_batch_writes_artifacts_and_summary(tmp_path, monkeypatch):
+    # forked workers inherit these patches: no model, Drive or webhook calls
+    monkeypatch.setattr(generate_assessment, "is_trivial", lambda summary: True)
+    monkeypatch.setattr(generate_assessment, "RESULT_CACHE_ENABLED", False)
+    monkeypatch.setattr(batch_cli, "warm", lambda: None)
+
+    def no_network(*args, **kwargs):
+        raise AssertionError("offline runs make no network calls")
+    for name in ("upload_file_to_drive", "upload_stream_to_drive"):
+        monkeypatch.setattr(generate_assessment, name, no_network)
+    monkeypatch.setattr(generate_assessment.requests, "post", no_network)
+
+    write_inventory(str(tmp_path / "inv" / "cli_ok.xlsx"), **{"Device Name": ["srv1", "srv2"]})
+    (tmp_path / "inv" / "cli_bad.xlsx").write_bytes(b"not a workbook")
+    summary = tmp_path / "summary.csv"
+    try:
+        code = batch_cli.main([str(tmp_path / "inv"), "--local", "--workers", "2", "--summary", str(summary),
+                               "--log-dir", str(tmp_path / "logs")])
+        reports = os.listdir(os.path.join(generate_assessment.OUTPUT_DIR, "cli_ok"))
+    finally:
+        for session_id in ("cli_ok", "cli_bad"):
+            shutil.rmtree(os.path.join(generate_assessment.OUTPUT_DIR, session_id), ignore_errors=True)
+
+    assert code == 1  # one session failed
+    rows = {row["session_id"]: row for row in csv.DictReader(open(summary))}
+    assert rows["cli_ok"]["status"] == "ok" and rows["cli_bad"]["status"] == "error" and rows["cli_bad"]["error"]
+    assert "IT_Current_Status_Assessment_Report.docx" in reports and "HWGapAnalysis.xlsx" in reports
+    assert os.path.getsize(tmp_path / "logs" / "cli_ok.log") > 0
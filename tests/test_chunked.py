@@ -0,0 +1,74 @@
+import os
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.getcwd())
+
+import generate_assessment
+from chunked import (
+    GapWorkbookWriter, InventoryAccumulator, chunked_section_summaries, iter_inventory_chunks
+)
+from value_normalization import normalize_values
+
+
+def test_iter_chunks_and_incremental_writer(tmp_path):
+    df = pd.DataFrame({" Device Name ": [f"srv{i}" for i in range(10)], "RAM (GB)": range(10)})
+    src = tmp_path / "servers.xlsx"
+    df.to_excel(src, index=False)
+
+    chunks = list(iter_inventory_chunks(str(src), chunk_size=4))
+    assert [len(c) for c in chunks] == [4, 4, 2]
+    assert list(chunks[0].columns) == ["Device Name", "RAM (GB)"]
+    assert list(chunks[2].index) == [8, 9]
+
+    out = tmp_path / "HWGapAnalysis.xlsx"
+    writer = GapWorkbookWriter(str(out))
+    for chunk in chunks:
+        writer.append(chunk)
+    writer.close()
+    pd.testing.assert_frame_equal(pd.read_excel(out), df.rename(columns=str.strip))
+
+
+def test_workbook_keeps_columns_first_seen_in_later_chunks(tmp_path):
+    out = tmp_path / "HWGapAnalysis.xlsx"
+    writer = GapWorkbookWriter(str(out))
+    writer.append(pd.DataFrame({"Device Name": ["a"], "RAM (GB)": [8]}))
+    writer.append(pd.DataFrame({"Device Name": ["b"], "Serial": ["000123"]}))
+    writer.append(pd.DataFrame({"Device Name": ["c"], "RAM (GB)": [16]}))
+    writer.append(pd.DataFrame({"Device Name": ["d"], "Rack": ["R1"]}))
+    writer.close()
+
+    back = pd.read_excel(out, dtype={"Serial": str})
+    assert list(back.columns) == ["Device Name", "RAM (GB)", "Serial", "Rack"]
+    assert back["Device Name"].tolist() == ["a", "b", "c", "d"]
+    assert back["RAM (GB)"].tolist()[::2] == [8, 16]
+    assert back["Serial"].tolist()[1] == "000123" and pd.isna(back["Serial"].iloc[0])
+    assert back["Rack"].tolist()[3] == "R1" and back["Rack"].iloc[:3].isna().all()
+    assert [p.name for p in tmp_path.iterdir()] == ["HWGapAnalysis.xlsx"]  # no narrower copy left behind
+
+
+def test_accumulators_match_whole_frame_builders():
+    hw = pd.DataFrame({
+        "Device Name": ["a", "b", "a", "c", "a"],
+        "Category": ["Server", "Server", "Storage", None, "Server"],
+        "End of Life (EOL)": ["2001-01-01", "2999-01-01", None, "2999-06-01", "2002-01-01"],
+        "Vulnerabilities": [1, 0, 3, None, 2],
+        "Vulnerability Severity": ["High", None, "Low", None, "High"],
+    })
+    sw = pd.DataFrame({
+        "App Name": ["crm", "erp", "crm"],
+        "License Status": ["Active", "Expired", None],
+        "Uptime (%)": [99.0, 97.0, None],
+        "Max Users": [10, 50, 3],
+    })
+    # builders read the typed columns produced right after ingestion
+    hw, sw = normalize_values(hw), normalize_values(sw)
+    hw_acc, sw_acc = InventoryAccumulator(), InventoryAccumulator()
+    for start in range(0, len(hw), 2):
+        hw_acc.add(hw.iloc[start:start + 2])
+    sw_acc.add(sw.iloc[:1])
+    sw_acc.add(sw.iloc[1:])
+
+    streamed = dict(chunked_section_summaries(hw_acc, sw_acc, {}))
+    for func in generate_assessment.SECTION_FUNCS[:18]:
+        assert streamed[func.__name__] == func(hw, sw), func.__name__
@@ -0,0 +1,85 @@
+import os
+import sys
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+sys.path.insert(0, os.getcwd())
+
+from columnar import ColumnarWriter, gap_schema, read_gap_frame, read_gap_table, render_columnar, to_gap_table
+
+
+def _frame(tiers, eol):
+    return pd.DataFrame({
+        "Device Name": [f"srv{i}" for i in range(len(tiers))],
+        "Tier": tiers,
+        "End of Life (EOL)": pd.to_datetime(eol),
+        "RAM (GB)": pd.Series([16.0] * len(tiers), dtype="float32"),
+        "Category": pd.Categorical(["Server"] * len(tiers)),
+        "Compliance PCI": [True] * len(tiers),
+    })
+
+
+def test_schema_depends_only_on_column_names():
+    full = to_gap_table(_frame([1, 2], ["2030-01-01", "2031-06-30"]), "hardware")
+    # an all-null chunk would infer different types without the fixed rules
+    empty = to_gap_table(_frame([None, None], [None, None]), "hardware")
+    assert full.schema.equals(empty.schema)
+    assert full.schema.field("Tier").type == pa.int64()
+    assert full.schema.field("Category").type == pa.string()
+    assert full.schema.metadata[b"gap_schema_version"] == b"1"
+    assert gap_schema(["Tier"], "software").metadata[b"kind"] == b"software"
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_artifact_round_trip(tmp_path, fmt):
+    df = _frame([1, None], ["2030-01-01", None])
+    artifact = render_columnar(f"HWGapAnalysis.{fmt}", df, "hardware", fmt)
+    path = tmp_path / artifact.name
+    path.write_bytes(artifact.data)
+
+    back = read_gap_frame(str(path))
+    assert list(back.columns) == list(df.columns)
+    assert str(back["Tier"].dtype) == "Int64" and back["Tier"].isna().tolist() == [False, True]
+    assert back["End of Life (EOL)"].iloc[0] == pd.Timestamp("2030-01-01")
+    assert back["Compliance PCI"].all()
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_writer_appends_chunks_under_first_layout(tmp_path, fmt):
+    path = str(tmp_path / f"gap.{fmt}")
+    writer = ColumnarWriter(path, "hardware", fmt)
+    writer.append(_frame([1, 2], ["2030-01-01", "2031-01-01"]))
+    # later chunks may miss or reorder columns
+    writer.append(_frame([3], ["2032-01-01"]).drop(columns=["Category"])[["Tier", "Device Name", "RAM (GB)",
+                                                                         "End of Life (EOL)", "Compliance PCI"]])
+    writer.close()
+
+    table = read_gap_table(path)
+    assert table.num_rows == 3 == writer.rows
+    assert table.column_names == list(_frame([1], ["2030-01-01"]).columns)
+    assert table.column("Category").to_pylist() == ["Server", "Server", None]
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_writer_keeps_columns_of_later_chunks(tmp_path, fmt):
+    path = str(tmp_path / f"gap.{fmt}")
+    writer = ColumnarWriter(path, "hardware", fmt)
+    writer.append(_frame([1], ["2030-01-01"]))
+    writer.append(_frame([2], ["2031-01-01"]).assign(**{"Serial Number": ["000123"]}))
+    writer.append(_frame([3], ["2032-01-01"]).assign(**{"Lead Time (days)": [7]}))
+    writer.close()
+
+    table = read_gap_table(path)
+    assert table.column_names[-2:] == ["Serial Number", "Lead Time (days)"]
+    assert table.column("Tier").to_pylist() == [1, 2, 3]
+    assert table.column("Serial Number").to_pylist() == [None, "000123", None]
+    assert table.column("Lead Time (days)").to_pylist() == [None, None, 7]
+    assert sorted(os.listdir(tmp_path)) == [f"gap.{fmt}"]
+
+
+def test_empty_writer_still_produces_a_file(tmp_path):
+    path = str(tmp_path / "gap.parquet")
+    ColumnarWriter(path, "software", "parquet").close()
+    assert read_gap_table(path).num_rows == 0
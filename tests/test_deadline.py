@@ -0,0 +1,88 @@
+import os
+import shutil
+import sys
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.getcwd())
+
+import generate_assessment
+from deadline import Deadline, deadline_degraded, request_deadline
+from webhook_outbox import WebhookOutbox
+
+
+def test_deadline_budget():
+    unlimited = Deadline()
+    assert not unlimited.enabled and not unlimited.short(1e9)
+    assert unlimited.timeout(90) == 90
+
+    deadline = Deadline(100)
+    assert deadline.short(120) and not deadline.short(60)
+    assert deadline.timeout(90, reserve=15) == pytest.approx(85, abs=0.5)
+    assert deadline.timeout(30, reserve=15) == 30
+    assert Deadline(100, started=time.time() - 99).timeout(90, reserve=15) == 1.0
+    assert Deadline(1, started=time.time() - 2).summary()["met"] is False
+
+
+def test_request_deadline_sources(monkeypatch):
+    assert request_deadline({"X-Request-Timeout": "30"}, {"deadline_seconds": 60}).budget_seconds == 30
+    assert request_deadline({}, {"deadline_seconds": 60}).budget_seconds == 60
+    assert not request_deadline({}, {}).enabled
+    with pytest.raises(ValueError):
+        request_deadline({"X-Request-Timeout": "soon"})
+
+
+def test_brief_narratives_are_not_shared(monkeypatch):
+    calls = []
+    monkeypatch.setattr(generate_assessment, "ai_narrative",
+                        lambda section, summary, **options: calls.append(options) or "brief")
+    diagnostics = {}
+    summaries = [("build_section_2_overview", {"total_devices": 3, "total_applications": 5, "healthy_devices": 2})]
+    narrative = generate_assessment._stage_narrative(0, summaries, False, Deadline(90), diagnostics)
+
+    assert narrative == "brief"
+    assert calls[0]["brief"] is True and 0 < calls[0]["timeout"] <= 75
+    assert diagnostics["degraded"][0]["mode"] == "brief"
+
+
+def test_short_deadline_degrades_and_defers_uploads(tmp_path, monkeypatch):
+    outbox = WebhookOutbox(str(tmp_path / "outbox.sqlite3"))
+    uploaded = []
+    monkeypatch.setattr(generate_assessment, "webhook_outbox", outbox)
+    monkeypatch.setattr(generate_assessment, "RESULT_CACHE_ENABLED", False)
+
+    def no_model(*args, **kwargs):
+        raise AssertionError("no model call expected this close to the deadline")
+    monkeypatch.setattr(generate_assessment, "ai_narrative", no_model)
+    monkeypatch.setattr(generate_assessment, "generate_visual_charts", no_model)
+    monkeypatch.setattr(generate_assessment, "generate_docx_report", lambda *a, **k: "docx")
+    monkeypatch.setattr(generate_assessment, "generate_pptx_report", lambda *a, **k: "pptx")
+    monkeypatch.setattr(generate_assessment.requests, "post", no_model)
+    monkeypatch.setattr(generate_assessment, "upload_file_to_drive",
+                        lambda path, name=None, folder_id=None: uploaded.append(name) or f"https://drive/{name}")
+
+    src = tmp_path / "hw.xlsx"
+    pd.DataFrame({"Device Name": ["srv1", "srv2", "srv3"]}).to_excel(src, index=False)
+    files = [{"type": "hardware", "file_url": str(src), "file_name": "hw.xlsx"}]
+    try:
+        result = generate_assessment.generate_assessment("deadline", "", "", files, "http://hook", deadline=Deadline(5))
+        for thread in threading.enumerate():
+            if thread.name == "deferred-deadline":
+                thread.join(10)
+    finally:
+        shutil.rmtree(os.path.join("temp_sessions", "deadline"), ignore_errors=True)
+
+    assert "error" not in result
+    diagnostics = result["diagnostics"]
+    modes = {entry["stage"]: entry["mode"] for entry in diagnostics["degraded"]}
+    # the hardware inventory section has data; near-empty sections are written locally anyway
+    assert modes["charts"] == "skipped" and modes["narrative_2"] == "template"
+    assert modes["upload_inputs"] == "deferred"
+    assert deadline_degraded(diagnostics) and diagnostics["deadline"]["budget_seconds"] == 5
+    # the response links to the locally served copy; Drive gets it afterwards
+    assert result["files"][0]["drive_url"] == "/files/deadline/hw.xlsx"
+    assert "hw.xlsx" in uploaded
+    assert outbox.stats()["pending"] == 2  # the completion and the follow-up with Drive links
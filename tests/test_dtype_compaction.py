@@ -0,0 +1,90 @@
+import os
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.getcwd())
+
+from dtype_compaction import compact_frame, classification_lookup, attach_classification, observed_counts
+
+
+def test_compact_frame_types_and_report():
+    df = pd.DataFrame({
+        "Category": ["Server"] * 50 + ["Storage"] * 50,
+        "RAM (GB)": pd.Series([64, 128] * 50, dtype=object),
+        "Estimated Price (USD)": [4500.0, 5200.0] * 50,
+        "End of Life (EOL)": ["2030-01-01", "2020-06-30"] * 50,
+        "Device Name": [f"srv{i}" for i in range(100)],
+    })
+    compacted, report = compact_frame(df)
+
+    assert isinstance(compacted["Category"].dtype, pd.CategoricalDtype)
+    assert compacted["RAM (GB)"].dtype == "int16"
+    assert compacted["Estimated Price (USD)"].dtype == "float64"
+    assert pd.api.types.is_datetime64_any_dtype(compacted["End of Life (EOL)"])
+    assert not isinstance(compacted["Device Name"].dtype, pd.CategoricalDtype)
+    assert report["after_bytes"] < report["before_bytes"]
+
+
+def test_digit_identifiers_stay_text():
+    df = pd.DataFrame({
+        "Serial Number": ["000123", "004560", "007890"],
+        "Asset Tag": ["0001", "0002", "0001"],
+        "Qty": pd.Series([1, 2, 3], dtype=object),
+    })
+    compacted, _ = compact_frame(df)
+
+    assert compacted["Serial Number"].tolist() == ["000123", "004560", "007890"]
+    assert compacted["Asset Tag"].astype(str).tolist() == ["0001", "0002", "0001"]
+    assert compacted["Qty"].dtype == "int8"
+
+
+def test_floats_keep_their_values():
+    df = pd.DataFrame({
+        "Estimated Cost": [4599.99, 1234.56, 99.95],
+        "Uptime (%)": pd.Series([99.94, 99.9, 100.0], dtype=object),
+    })
+    compacted, _ = compact_frame(df)
+    assert compacted["Estimated Cost"].tolist() == [4599.99, 1234.56, 99.95]
+    assert compacted["Uptime (%)"].tolist() == [99.94, 99.9, 100.0]
+
+
+def test_counts_skip_categories_no_row_uses():
+    compacted, _ = compact_frame(pd.DataFrame({"Category": ["Server", "Server", "Storage", "Network"]}))
+    servers = compacted[compacted["Category"] == "Server"]
+    assert observed_counts(servers["Category"]).to_dict() == {"Server": 2}
+
+
+def test_attach_classification_matches_merge():
+    classification = pd.DataFrame({
+        "Classification Tier": ["Basic", "Standard"],
+        "Score": [1, 2],
+        "Security": ["weak", "ok"],
+    })
+    df = pd.DataFrame({"Device Name": ["a", "b", "c"], "Tier": [2, 1, 2]})
+    expanded = attach_classification(df, classification_lookup(classification), "Tier")
+    merged = df.merge(classification, how="left", left_on="Tier", right_on="Score")
+    pd.testing.assert_frame_equal(expanded, merged[expanded.columns])
+
+
+def test_exported_costs_come_back_exactly(tmp_path, monkeypatch):
+    import shutil
+    import generate_assessment
+    from columnar import read_gap_frame
+    monkeypatch.setattr(generate_assessment, "is_trivial", lambda summary: True)
+    monkeypatch.setattr(generate_assessment, "RESULT_CACHE_ENABLED", False)
+
+    costs = [4599.99, 1234.56, 99.95]
+    src = tmp_path / "hw.xlsx"
+    pd.DataFrame({"Device Name": ["a", "b", "c"], "Estimated Cost": costs}).to_excel(src, index=False)
+    files = [{"type": "hardware", "file_url": str(src), "file_name": "hw.xlsx"}]
+    session = os.path.join(generate_assessment.OUTPUT_DIR, "exact_costs")
+    try:
+        result = generate_assessment.generate_assessment("exact_costs", "", "", files, "", local_only=True)
+        exported = pd.read_excel(os.path.join(session, "HWGapAnalysis.xlsx"))
+        columnar = read_gap_frame(os.path.join(session, "HWGapAnalysis.parquet"))
+    finally:
+        shutil.rmtree(session, ignore_errors=True)
+
+    assert "error" not in result
+    assert exported["Estimated Cost"].tolist() == costs
+    assert [float(v) for v in columnar["Estimated Cost"]] == costs
@@ -0,0 +1,85 @@
+import os
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.getcwd())
+
+from incremental import IncrementalStore, enrich_incremental, row_hashes
+
+
+def test_row_hashes_only_depend_on_listed_columns():
+    a = pd.DataFrame({"RAM (GB)": [16, 32], "Notes": ["x", "y"]})
+    b = pd.DataFrame({"RAM (GB)": [16, 64], "Notes": ["changed", "y"]})
+    ha, hb = row_hashes(a, ["RAM (GB)"]), row_hashes(b, ["RAM (GB)"])
+    assert ha[0] == hb[0]
+    assert ha[1] != hb[1]
+
+
+def test_only_changed_rows_are_recomputed(tmp_path):
+    store = IncrementalStore(str(tmp_path / "inc.sqlite3"))
+    seen = []
+    def enrich(part):
+        seen.append(len(part))
+        part = part.copy()
+        part["Recommended Model"] = "M-" + part["Device Name"]
+        part["Tier Total Score"] = 2
+        return part
+
+    week1 = pd.DataFrame({"Device Name": ["a", "b", "c"], "RAM (GB)": [8, 16, 32]})
+    out1, stats1 = enrich_incremental(week1, "hardware", ["Device Name", "RAM (GB)"], enrich, store)
+    assert stats1 == {"rows": 3, "reused": 0, "recomputed": 3}
+
+    week2 = pd.DataFrame({"Device Name": ["a", "b", "d"], "RAM (GB)": [8, 64, 4]})
+    out2, stats2 = enrich_incremental(week2, "hardware", ["Device Name", "RAM (GB)"], enrich, store)
+    assert stats2 == {"rows": 3, "reused": 1, "recomputed": 2}
+    assert seen == [3, 2]
+    assert list(out2.index) == [0, 1, 2]
+    assert out2["Recommended Model"].tolist() == ["M-a", "M-b", "M-d"]
+
+
+def test_narratives_keyed_on_summary(tmp_path):
+    store = IncrementalStore(str(tmp_path / "inc.sqlite3"))
+    store.put_narrative("build_section_2_overview", {"total_devices": 3}, "three devices")
+    assert store.get_narrative("build_section_2_overview", {"total_devices": 3}) == "three devices"
+    assert store.get_narrative("build_section_2_overview", {"total_devices": 4}) is None
+
+
+def test_expired_narratives_are_purged(tmp_path):
+    import sqlite3
+    store = IncrementalStore(str(tmp_path / "inc.sqlite3"), ttl_seconds=3600)
+    store.put_narrative("build_section_2_overview", {"total_devices": 3}, "old")
+    with sqlite3.connect(store.path) as conn:
+        conn.execute("UPDATE narratives SET updated_at = updated_at - 7200")
+    store.put_narrative("build_section_2_overview", {"total_devices": 4}, "new")
+    with sqlite3.connect(store.path) as conn:
+        assert [r[0] for r in conn.execute("SELECT narrative FROM narratives")] == ["new"]
+
+
+def test_reused_rows_are_rescored_against_today(tmp_path, monkeypatch):
+    import incremental
+    import generate_assessment
+    monkeypatch.setattr(incremental, "incremental_store", IncrementalStore(str(tmp_path / "inc.sqlite3")))
+    lookups = []
+    def suggest(part):
+        lookups.append(len(part))
+        part = part.copy()
+        part["Recommended Model"] = "M-" + part["Device Name"]
+        return part
+
+    inventory = pd.DataFrame({
+        "Device Name": ["srv1"],
+        "Warranty Expiry Date": [pd.Timestamp("2026-06-01")],
+        "End of Life (EOL)": [pd.Timestamp("2026-06-01")],
+    })
+    def run_on(day):
+        monkeypatch.setattr(pd.Timestamp, "today", classmethod(lambda cls: pd.Timestamp(day)))
+        return generate_assessment.enrich_and_score(inventory.copy(), suggest, "hardware", incremental=True)
+
+    before = run_on("2026-01-01")
+    after = run_on("2029-01-01")
+    expected = generate_assessment.score_rows(suggest(inventory.copy()))
+
+    assert lookups == [1, 1]  # second run reused the enrichment; the last call is ``expected``
+    assert after["Recommended Model"].tolist() == ["M-srv1"]
+    assert after["Tier Total Score"].tolist() == expected["Tier Total Score"].tolist()
+    assert after["Tier Total Score"].tolist() != before["Tier Total Score"].tolist()
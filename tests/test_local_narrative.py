@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.insert(0, os.getcwd())
+
+import generate_assessment
+from deadline import Deadline
+from local_narrative import information_content, is_trivial, local_narrative, section_title
+
+
+def test_information_content():
+    assert information_content({"legacy_issues": []}) == 0
+    assert information_content({"active": 4, "past_eol": 0, "unknown": None}) == 1
+    assert information_content({"by_category": {"Server": 3, "Laptop": 2}, "total_devices": 5}) == 3
+    assert information_content({"hardware_risks": [{"a": 1}] * 4}) == 4
+    assert is_trivial({"text": "Analyzed 3 hardware items."})
+    assert not is_trivial({"total_devices": 3, "total_applications": 2, "healthy_devices": 1})
+
+
+def test_rules_cover_empty_and_trivial_sections():
+    assert section_title("build_section_18_environmental_sustainability") == "Environmental sustainability"
+    assert "environmental sustainability" in local_narrative(
+        "build_section_18_environmental_sustainability", {"environmental_sustainability": []})
+    assert local_narrative("build_section_7_software_compliance", {"compliant_count": 8, "expired_count": 2}) == (
+        "8 software licenses are current and 2 have expired. Expired licenses should be renewed or the "
+        "applications retired.")
+    assert "could not be assessed" in local_narrative("build_section_10_reliability", {"avg_uptime_pct": None})
+    # sections without a rule fall back to listing their facts
+    assert local_narrative("build_section_5_classification_distribution", {"classification_distribution": {"A": 2}}) \
+        == "Classification distribution: classification distribution: A (2)."
+
+
+def test_trivial_sections_skip_the_model(monkeypatch):
+    calls = []
+    monkeypatch.setattr(generate_assessment, "ai_narrative",
+                        lambda section, summary: calls.append(section) or "model")
+    summaries = [
+        ("build_section_14_cloud_migration", {"cloud_migration": []}),
+        ("build_section_2_overview", {"total_devices": 3, "total_applications": 5, "healthy_devices": 2}),
+    ]
+    diagnostics = {}
+    local = generate_assessment._stage_narrative(0, summaries, False, Deadline(), diagnostics)
+    model = generate_assessment._stage_narrative(1, summaries, False, Deadline(), diagnostics)
+
+    assert local.startswith("No cloud migration findings") and model == "model"
+    assert calls == ["build_section_2_overview"]
+    assert diagnostics["local_narratives"] == ["build_section_14_cloud_migration"]
@@ -0,0 +1,83 @@
+import os
+import shutil
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.getcwd())
+
+import generate_assessment
+import memory_budget
+from memory_budget import MemoryMonitor, fits_budget
+from report_docx import generate_docx_report
+from stage_graph import StageGraph
+
+
+def test_fits_budget(monkeypatch):
+    monkeypatch.setattr(memory_budget, "rss_mb", lambda: 100.0)
+    assert fits_budget(10_000, budget_mb=0)
+    assert fits_budget(50, budget_mb=200)
+    assert not fits_budget(150, budget_mb=200)
+
+
+def test_stage_report_includes_peak_memory():
+    def grow():
+        block = bytearray(32 * 1024 * 1024)
+        time.sleep(0.1)
+        return len(block)
+
+    graph = StageGraph().add("grow", grow, outputs=("size",))
+    with MemoryMonitor(interval=0.01, trace=True) as monitor:
+        _, report = graph.run({}, monitor=monitor)
+    memory = report["stages"]["grow"]["memory"]
+    assert memory["rss_peak_mb"] > 0
+    assert memory["traced_peak_mb"] >= 32
+    assert report["memory"]["process_peak_rss_mb"] >= memory["rss_peak_mb"] - 1
+
+
+def test_docx_summary_tables(tmp_path):
+    df = pd.DataFrame({"Device Name": [f"srv{i}" for i in range(30)], "Tier": [1] * 30})
+    artifact = generate_docx_report("summary", df, pd.DataFrame(), {}, as_artifact=True, max_table_rows=5)
+    from docx import Document
+    document = Document(generate_assessment.open_artifact(artifact))
+    assert len(document.tables[-1].rows) == 6  # header + 5 rows
+    assert any("Showing 5 of 30 rows" in p.text for p in document.paragraphs)
+
+
+def test_over_budget_run_degrades(tmp_path, monkeypatch):
+    docx_calls = []
+    monkeypatch.setattr(generate_assessment, "fits_budget", lambda estimated_mb: False)
+    monkeypatch.setattr(generate_assessment, "generate_visual_charts", lambda *a, **k: {})
+    monkeypatch.setattr(generate_assessment, "ai_narrative", lambda section, summary: "narrative")
+    monkeypatch.setattr(generate_assessment, "generate_docx_report",
+                        lambda *a, **k: docx_calls.append(k) or "docx")
+    monkeypatch.setattr(generate_assessment, "generate_pptx_report", lambda *a, **k: "pptx")
+    monkeypatch.setattr(generate_assessment, "upload_file_to_drive",
+                        lambda path, name=None, folder_id=None: f"https://drive/{os.path.basename(path)}")
+    monkeypatch.setattr(generate_assessment, "RESULT_CACHE_ENABLED", False)
+
+    class PostResp:
+        status_code = 200
+
+    def post(url, *a, **k):
+        # the report service is down, so reports are generated locally
+        if url.startswith(generate_assessment.DOCX_SERVICE_URL):
+            raise RuntimeError("report service down")
+        return PostResp()
+    monkeypatch.setattr(generate_assessment.requests, "post", post)
+
+    src = tmp_path / "hw.xlsx"
+    pd.DataFrame({"Device Name": ["srv1", "srv2"], "Model": ["PowerEdge R740"] * 2}).to_excel(src, index=False)
+    files = [{"type": "hardware", "file_url": str(src), "file_name": "hw.xlsx"}]
+    try:
+        result = generate_assessment.generate_assessment("membudget", "", "", files, "")
+    finally:
+        shutil.rmtree(os.path.join("temp_sessions", "membudget"), ignore_errors=True)
+
+    degraded = {entry["stage"]: entry["mode"] for entry in result["diagnostics"]["degraded"]}
+    assert degraded["ingest"] == "chunked"
+    assert "chunked" in result["diagnostics"]
+    assert degraded["reports"].startswith("summary tables")
+    assert docx_calls[0]["max_table_rows"] == memory_budget.DOCX_SUMMARY_ROWS
+    assert "memory" in result["diagnostics"]["stages"]["stages"]["stream_inventories"]
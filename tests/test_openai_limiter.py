@@ -0,0 +1,144 @@
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.getcwd())
+
+import openai_limiter
+from openai_limiter import AdaptiveConcurrency, RateLimiter, estimate_tokens, parse_duration
+
+
+class Raw:
+    def __init__(self, headers, total_tokens=100):
+        self.headers = headers
+        self.total_tokens = total_tokens
+
+    def parse(self):
+        message = SimpleNamespace(content=" narrative ")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)],
+                               usage=SimpleNamespace(total_tokens=self.total_tokens))
+
+
+class RateLimitError(Exception):
+    """Stands in for ``openai.RateLimitError``: the 429 response and the error code."""
+
+    def __init__(self, headers, code=None):
+        super().__init__("rate limited")
+        self.response = SimpleNamespace(status_code=429, headers=headers)
+        self.code = code
+
+
+def rate_limit_error(headers, code=None):
+    return RateLimitError(headers, code)
+
+
+def fake_openai(monkeypatch, outcomes, calls):
+    def create(model, messages, **kwargs):
+        calls.append(model)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    completions = SimpleNamespace(with_raw_response=SimpleNamespace(create=create))
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setattr(openai_limiter, "openai",
+                        SimpleNamespace(OpenAI=lambda: client, RateLimitError=RateLimitError))
+    monkeypatch.setattr(openai_limiter, "_client", None)
+
+
+def test_parse_duration():
+    assert parse_duration("20ms") == pytest.approx(0.02)
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("1h2m3.5s") == pytest.approx(3723.5)
+    assert parse_duration("7") == 7
+    assert parse_duration(None) == 0
+
+
+def test_buckets_are_shared_between_limiters(tmp_path):
+    path = str(tmp_path / "limiter.sqlite3")
+    first, second = RateLimiter(path, rpm=2, tpm=1000), RateLimiter(path, rpm=2, tpm=1000)
+
+    assert first.try_acquire("m", 100) == 0
+    assert second.try_acquire("m", 100) == 0
+    # both requests are spent; the next one refills in about half a minute (2 per minute)
+    assert second.try_acquire("m", 100) == pytest.approx(30, abs=1)
+    # tokens run out before requests do
+    assert RateLimiter(path, rpm=60, tpm=1000).try_acquire("other", 900) == 0
+    assert RateLimiter(path, rpm=60, tpm=1000).try_acquire("other", 900) > 0
+
+
+def test_headers_tighten_the_bucket_and_usage_is_reconciled(tmp_path):
+    limiter = RateLimiter(str(tmp_path / "limiter.sqlite3"), rpm=1000, tpm=10000)
+    assert limiter.try_acquire("m", 5000) == 0
+    limiter.reconcile("m", 5000, 1000)
+    assert limiter.try_acquire("m", 8000) == 0  # 4000 of the estimate came back
+
+    limiter.observe("m", {"x-ratelimit-limit-requests": "60", "x-ratelimit-remaining-requests": "0",
+                          "x-ratelimit-limit-tokens": "10000", "x-ratelimit-remaining-tokens": "9000"})
+    assert limiter.try_acquire("m", 10) == pytest.approx(1, abs=0.2)
+
+
+def test_acquire_queues_until_budget_refills(tmp_path):
+    limiter = RateLimiter(str(tmp_path / "limiter.sqlite3"), rpm=1000, tpm=600)
+    assert limiter.try_acquire("m", 600) == 0
+    assert limiter.acquire("m", 3) > 0.2  # tokens refill at 10 per second
+
+
+def test_complete_waits_out_a_429_and_retries(tmp_path, monkeypatch):
+    calls = []
+    fake_openai(monkeypatch, [rate_limit_error({"retry-after": "0.2"}), Raw({})], calls)
+    limiter = RateLimiter(str(tmp_path / "limiter.sqlite3"), concurrency=AdaptiveConcurrency(8))
+
+    resp = limiter.complete("m", [{"role": "user", "content": "hi"}])
+    assert resp.choices[0].message.content == " narrative "
+    assert calls == ["m", "m"]
+    # halved on the 429, grown back by one on the success
+    assert limiter.concurrency.limit == 5
+
+
+def test_complete_raises_quota_errors_immediately(tmp_path, monkeypatch):
+    calls = []
+    fake_openai(monkeypatch, [rate_limit_error({}, code="insufficient_quota")], calls)
+    limiter = RateLimiter(str(tmp_path / "limiter.sqlite3"))
+    with pytest.raises(RateLimitError):
+        limiter.complete("m", [{"role": "user", "content": "hi"}])
+    assert calls == ["m"]
+
+
+def test_concurrency_limit_is_enforced():
+    concurrency = AdaptiveConcurrency(2)
+    concurrency.throttled()
+    entered, release = threading.Event(), threading.Event()
+
+    def hold():
+        with concurrency:
+            entered.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    entered.wait(5)
+    blocked = threading.Thread(target=lambda: concurrency.__enter__())
+    blocked.start()
+    blocked.join(0.1)
+    assert blocked.is_alive()
+    release.set()
+    blocked.join(5)
+    holder.join(5)
+    assert not blocked.is_alive()
+
+
+def test_estimate_tokens():
+    assert estimate_tokens([{"content": "x" * 400}], completion_tokens=50) == 150
+
+
+def test_client_is_rebuilt_after_reset(monkeypatch):
+    monkeypatch.setattr(openai_limiter, "openai", SimpleNamespace(OpenAI=object))
+    monkeypatch.setattr(openai_limiter, "_client", None)
+    first = openai_limiter.openai_client()
+    assert openai_limiter.openai_client() is first
+    openai_limiter.reset_openai_client()
+    assert openai_limiter.openai_client() is not first
@@ -0,0 +1,59 @@
+import gc
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.getcwd())
+
+import drive_utils
+import openai_limiter
+import preload
+import report_docx
+from preload import open_template, shared_frame, template_bytes
+
+
+def test_shared_frame_is_arrow_backed_and_unchanged_by_writes():
+    frame = shared_frame(pd.DataFrame({"Score": [1, 2, 3], "Tier": ["Low", "Mid", "High"]}))
+    assert all(isinstance(dtype, pd.ArrowDtype) for dtype in frame.dtypes)
+    assert int((frame["Score"] - 1).abs().idxmin()) == 0
+
+    copy = frame.copy()
+    copy.loc[0, "Tier"] = "Changed"
+    assert frame.loc[0, "Tier"] == "Low"
+
+
+def test_templates_are_read_once():
+    template_bytes.cache_clear()
+    first, second = open_template(report_docx.DOCX_TEMPLATE), open_template(report_docx.DOCX_TEMPLATE)
+    assert first is not second and first.read() == second.read()
+    assert template_bytes.cache_info().misses == 1
+
+
+def test_after_fork_resets_clients_and_starts_services(monkeypatch):
+    calls = []
+    monkeypatch.setattr(preload, "start_background_services", lambda: calls.append("services"))
+    monkeypatch.setattr(drive_utils, "reset_drive_service", lambda: calls.append("drive"))
+    monkeypatch.setattr(openai_limiter, "reset_openai_client", lambda: calls.append("openai"))
+
+    preload.after_fork()
+    assert calls == []  # nothing was deferred without a preloading master
+
+    preload.begin()
+    assert preload.preloading() and not gc.isenabled()
+    preload.after_fork()
+    assert not preload.preloading() and gc.isenabled()
+    assert sorted(calls) == ["drive", "openai", "services"]
+
+
+def test_warm_leaves_the_collector_enabled(monkeypatch):
+    from product_catalog import product_catalog
+    monkeypatch.setattr(product_catalog, "preload", lambda: None)
+    monkeypatch.setattr(preload, "_preloading", False)
+    preload.begin()
+    try:
+        preload.warm()
+        assert gc.isenabled() and gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+        gc.enable()
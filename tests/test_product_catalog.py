@@ -0,0 +1,62 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.getcwd())
+
+import market_lookup
+from product_catalog import ProductCatalog, trigrams
+
+CATALOG_CSV = """kind,vendor,model,family,generation,release_date,end_of_sale,end_of_life,price_usd,lead_time_days,successor
+hardware,Dell,PowerEdge R760,PowerEdge,16,2023-02-14,,,9800,12,
+hardware,Dell,PowerEdge R750,PowerEdge,15,2021-03-17,2024-06-30,2029-06-30,8200,10,PowerEdge R760
+hardware,Dell,PowerEdge R740,PowerEdge,14,2017-07-11,2021-12-31,2026-12-31,,,PowerEdge R750
+hardware,HPE,ProLiant DL380 Gen11,ProLiant,11,2023-02-07,,,9600,14,
+hardware,HPE,ProLiant DL380 Gen10,ProLiant,10,2017-07-11,2022-03-31,2027-03-31,,,ProLiant DL380 Gen11
+software,Microsoft,SQL Server 2022,SQL Server,2022,2022-11-16,,2033-01-11,3945,0,
+software,Microsoft,SQL Server 2016,SQL Server,2016,2016-06-01,2021-07-13,2026-07-14,,,SQL Server 2022
+"""
+
+
+def make_catalog(tmp_path):
+    source = tmp_path / "catalog.csv"
+    source.write_text(CATALOG_CSV)
+    return ProductCatalog(path=str(tmp_path / "catalog.sqlite3"), source=str(source))
+
+
+def test_trigrams_are_normalised():
+    assert trigrams("R-740") == trigrams("r 740")
+    assert "  r" in trigrams("R740")
+
+
+def test_match_follows_successor_chain(tmp_path):
+    catalog = make_catalog(tmp_path)
+    matches = catalog.match_many(["Dell PowerEdge R740", "DL380 Gen10", "srv01", "Dell PowerEdge R740"])
+    assert [m and m["model"] for m in matches] == ["PowerEdge R760", "ProLiant DL380 Gen11", None, "PowerEdge R760"]
+    assert matches[0]["matched_model"] == "PowerEdge R740"
+    assert matches[1]["matched_model"] == "ProLiant DL380 Gen10"
+    # kinds are matched separately
+    assert catalog.match("SQL Server 2016", "software")["model"] == "SQL Server 2022"
+    assert catalog.match("SQL Server 2016", "hardware") is None
+    assert catalog.default_product("hardware")["model"] == "PowerEdge R760"
+
+
+def test_catalog_rebuilds_when_source_changes(tmp_path):
+    catalog = make_catalog(tmp_path)
+    assert catalog.match("PowerEdge R770") is not None
+    source = tmp_path / "catalog.csv"
+    source.write_text(CATALOG_CSV + "hardware,Dell,PowerEdge R770,PowerEdge,17,2025-01-01,,,11000,12,\n")
+    os.utime(source, (os.path.getmtime(catalog.path) + 10,) * 2)
+    assert catalog.match("PowerEdge R770")["model"] == "PowerEdge R770"
+
+
+def test_suggest_replacements_use_catalog(tmp_path, monkeypatch):
+    monkeypatch.setattr(market_lookup, "product_catalog", make_catalog(tmp_path))
+    hw = pd.DataFrame({"Device Name": ["PowerEdge R740", "mystery box"]})
+    out = market_lookup.suggest_hw_replacements(hw)
+    assert out["Recommended Model"].tolist() == ["PowerEdge R760", "PowerEdge R760"]
+    assert out["Matched Catalog Model"].tolist()[0] == "PowerEdge R740"
+    assert out["Match Score"].tolist()[1] == 0.0
+    sw = pd.DataFrame({"App Name": ["SQL Server 2016"]})
+    assert market_lookup.suggest_sw_replacements(sw)["Recommended Model"].tolist() == ["SQL Server 2022"]
@@ -0,0 +1,73 @@
+import json
+import os
+import shutil
+import sys
+import threading
+
+sys.path.insert(0, os.getcwd())
+
+import app as app_module
+import generate_assessment
+import profiling
+from profiling import follow, profile_run, profiling_authorized, profiling_requested
+
+
+def _busy(seconds=0.1):
+    import time
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        sum(range(200))
+
+
+def test_request_and_authorization(monkeypatch):
+    assert profiling_requested({"X-Profile": "1"}, {})
+    assert profiling_requested({}, {"profile": True})
+    assert not profiling_requested({}, {"profile": "yes please"})
+    monkeypatch.setattr(profiling, "PROFILE_ADMIN_TOKEN", "")
+    assert not profiling_authorized({"X-Admin-Token": ""})
+    monkeypatch.setattr(profiling, "PROFILE_ADMIN_TOKEN", "s3cret")
+    assert profiling_authorized({"X-Admin-Token": "s3cret"})
+    assert not profiling_authorized({"X-Admin-Token": "guess"})
+
+
+def test_follow_is_identity_when_not_profiling():
+    assert follow(_busy) is _busy
+
+
+def test_profile_run_samples_followed_threads(tmp_path):
+    with profile_run(str(tmp_path)) as summary:
+        worker = threading.Thread(target=follow(_busy), args=(0.2,))
+        worker.start()
+        worker.join()
+    assert summary["samples"] > 0
+    assert any(entry["function"].startswith("_busy ") for entry in summary["top"])
+
+    folded = (tmp_path / "profile" / "stacks.folded").read_text().splitlines()
+    stack, count = folded[0].rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
+    assert json.loads((tmp_path / "profile" / "top.json").read_text())["samples"] == summary["samples"]
+
+
+def test_start_assessment_profiling_is_gated(monkeypatch):
+    calls = []
+    monkeypatch.setattr(app_module, "process_assessment", lambda data: calls.append(data) or {})
+    monkeypatch.setattr(profiling, "PROFILE_ADMIN_TOKEN", "s3cret")
+    client = app_module.app.test_client()
+    body = {"session_id": "p1", "email": "a@b.c", "goal": "g", "profile": True}
+
+    assert client.post("/start_assessment", json=body).status_code == 403
+    assert client.post("/start_assessment", json=body, headers={"X-Admin-Token": "s3cret"}).status_code == 200
+    assert calls[-1]["profile"] is True
+    assert client.post("/start_assessment", json={**body, "profile": False}).status_code == 200
+    assert "profile" not in calls[-1]
+
+
+def test_process_assessment_writes_profile(tmp_path, monkeypatch):
+    monkeypatch.setattr(generate_assessment, "OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(generate_assessment, "generate_assessment", lambda **kwargs: _busy(0.1) or {"ok": True})
+    try:
+        result = generate_assessment.process_assessment({"session_id": "prof", "profile": True})
+    finally:
+        shutil.rmtree(os.path.join(generate_assessment.session_storage.root, "prof"), ignore_errors=True)
+    assert result["ok"] and result["profile"]["samples"] > 0
+    assert (tmp_path / "prof" / "profile" / "stacks.folded").exists()
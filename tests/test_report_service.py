@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.getcwd())
+
+from report_service import CircuitBreaker, render_reports, OPEN, HALF_OPEN, CLOSED
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+
+def failing_remote():
+    raise RuntimeError("service down")
+
+
+def test_breaker_opens_and_skips_remote():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=2, window=5, reset_seconds=30, clock=clock)
+    calls = []
+    def remote():
+        calls.append(1)
+        failing_remote()
+
+    for _ in range(2):
+        assert render_reports(remote, lambda: ("local.docx", "local.pptx"), breaker=breaker, hedge_after=0) == ("local.docx", "local.pptx")
+    assert breaker.state == OPEN
+
+    render_reports(remote, lambda: ("local.docx", "local.pptx"), breaker=breaker, hedge_after=0)
+    assert len(calls) == 2
+    assert breaker.snapshot()["short_circuited"] == 1
+
+    clock.now = 31
+    assert breaker.state == HALF_OPEN
+    assert render_reports(lambda: ("r.docx", "r.pptx"), lambda: ("l", "l"), breaker=breaker, hedge_after=0) == ("r.docx", "r.pptx")
+    assert breaker.state == CLOSED
+
+
+def test_hedged_local_wins_when_remote_is_slow():
+    breaker = CircuitBreaker("hedge", failure_threshold=5)
+    def slow_remote():
+        time.sleep(0.5)
+        return ("remote.docx", "remote.pptx")
+
+    result = render_reports(slow_remote, lambda: ("local.docx", "local.pptx"), breaker=breaker, hedge_after=0.05)
+    assert result == ("local.docx", "local.pptx")
+    assert breaker.snapshot()["hedged"] == 1
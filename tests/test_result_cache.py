@@ -0,0 +1,63 @@
+import hashlib
+import os
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.getcwd())
+
+import generate_assessment
+from result_cache import ResultCache, input_fingerprint, idempotency_fingerprint
+
+
+def test_fingerprint_ignores_file_order():
+    assert input_fingerprint("s", "goal", ["a", "b"]) == input_fingerprint("s", "goal", ["b", "a"])
+    assert input_fingerprint("s", "goal", ["a"]) != input_fingerprint("s", "other", ["a"])
+
+
+def test_fingerprint_covers_payload_fields():
+    key = input_fingerprint("s", "goal", ["a"], folder_id="f1", email="a@b", next_action_webhook="http://x")
+    assert key == input_fingerprint("s", "goal", ["a"], next_action_webhook="http://x", email="a@b", folder_id="f1")
+    assert key != input_fingerprint("s", "goal", ["a"], folder_id="f2", email="a@b", next_action_webhook="http://x")
+    assert key != input_fingerprint("s", "goal", ["a"], folder_id="f1", email="a@b", next_action_webhook="http://y")
+
+
+def test_ttl_never_outlives_session_folders():
+    import result_cache
+    assert result_cache.RESULT_CACHE_TTL_SECONDS <= result_cache.SESSION_TTL_SECONDS
+
+
+def test_cache_retention(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite3"), ttl_seconds=3600, max_entries=2)
+    for i in range(3):
+        cache.put([f"k{i}"], "s", {"n": i})
+    assert cache.get("k0") is None
+    assert cache.get("k2") == {"n": 2}
+
+    expired = ResultCache(cache.path, ttl_seconds=-1, max_entries=2)
+    assert expired.get("k2") is None
+
+
+def test_generate_assessment_serves_cached_result(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path / "results.sqlite3"))
+    monkeypatch.setattr(generate_assessment, "result_cache", cache)
+    monkeypatch.setattr(generate_assessment, "RESULT_CACHE_ENABLED", True)
+    def fail(*a, **k):
+        raise AssertionError("pipeline should not run on a cache hit")
+    monkeypatch.setattr(generate_assessment, "suggest_hw_replacements", fail)
+
+    src = tmp_path / "hw.xlsx"
+    pd.DataFrame({"a": [1]}).to_excel(src, index=False)
+    with open(src, "rb") as fh:
+        digest = hashlib.sha256(fh.read()).hexdigest()
+    cached = {"session_id": "cached", "status": "complete", "files": []}
+    fields = dict(email="", folder_id="", next_action_webhook="", incremental=False, chunked=None, local_only=False)
+    cache.put([input_fingerprint("cached", "goal", [digest], **fields)], "cached", cached)
+
+    files = [{"type": "hardware", "file_url": str(src), "file_name": "hw.xlsx"}]
+    assert generate_assessment.generate_assessment("cached", "", "goal", files, "") == cached
+    # another folder is another payload, so the pipeline runs
+    result = generate_assessment.generate_assessment("cached", "", "goal", files, "", folder_id="other")
+    assert result == {"error": "pipeline should not run on a cache hit"}
+
+    cache.put([idempotency_fingerprint("cached", "abc")], "cached", {"from": "header"})
+    assert generate_assessment.generate_assessment("cached", "", "goal", [], "", idempotency_key="abc") == {"from": "header"}
@@ -0,0 +1,44 @@
+import os
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.getcwd())
+
+from schema_resolver import apply_schema, resolve_schema, normalize_header
+
+
+def test_normalize_header():
+    assert normalize_header(" RAM (GB) ") == "ram gb"
+    assert normalize_header("Device Name / Hostname") == "device name hostname"
+
+
+def test_synonyms_and_fuzzy_matches():
+    columns = ("Hostname", "Asset Tag", "Memory (GB)", "Warranty Expiry Dt", "EOL", "Notes")
+    schema = resolve_schema(columns, "hardware")
+    assert schema.renames == {
+        "Hostname": "Device Name",
+        "Asset Tag": "Asset ID",
+        "Memory (GB)": "RAM (GB)",
+        "Warranty Expiry Dt": "Warranty Expiry Date",
+        "EOL": "End of Life (EOL)",
+    }
+    assert schema.id_column == "Device Name"
+
+
+def test_existing_canonical_headers_are_kept():
+    schema = resolve_schema(("Device Name", "Server Name", "Serial ID"), "hardware")
+    assert "Server Name" not in schema.renames
+    assert schema.id_column == "Device Name"
+
+    fallback = resolve_schema(("Widget ID", "Owner"), "software")
+    assert fallback.renames == {}
+    assert fallback.id_column == "Widget ID"
+
+
+def test_resolution_is_cached_by_header_signature():
+    resolve_schema.cache_clear()
+    df = pd.DataFrame({"Application Name": ["crm"], "Licence Status": ["Active"]})
+    renamed, schema = apply_schema(df, "software")
+    assert list(renamed.columns) == ["App Name", "License Status"]
+    apply_schema(df.copy(), "software")
+    assert resolve_schema.cache_info().hits == 1
@@ -0,0 +1,82 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.getcwd())
+
+from session_storage import SessionStorage
+
+
+def make_session(root, name, size, age):
+    path = root / name
+    path.mkdir(parents=True)
+    (path / "report.docx").write_bytes(b"x" * size)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_sweep_evicts_expired_then_lru(tmp_path):
+    storage = SessionStorage(str(tmp_path), ttl_seconds=3600, max_bytes=250)
+    make_session(tmp_path, "expired", 10, age=7200)
+    make_session(tmp_path, "oldest", 100, age=300)
+    make_session(tmp_path, "middle", 100, age=200)
+    make_session(tmp_path, "newest", 100, age=100)
+
+    result = storage.sweep()
+    assert result["evicted"] == ["expired", "oldest"]
+    assert sorted(os.listdir(tmp_path)) == [".storage.lock", ".storage_stats.json", "middle", "newest"]
+
+    stats = storage.stats()
+    assert stats["sessions"] == 2
+    assert stats["evicted_sessions"] == 2
+    assert stats["expired"] == 1 and stats["over_budget"] == 1
+
+
+def test_pinned_and_touched_sessions_survive(tmp_path):
+    storage = SessionStorage(str(tmp_path), ttl_seconds=3600, max_bytes=0)
+    make_session(tmp_path, "busy", 10, age=7200)
+    make_session(tmp_path, "idle", 10, age=7200)
+
+    with storage.pin("busy"):
+        assert storage.stats()["pinned_sessions"] == 1
+        assert storage.sweep()["evicted"] == ["idle"]
+    assert storage.stats()["pinned_sessions"] == 0
+
+    storage.max_bytes = 10 ** 6
+    make_session(tmp_path, "stale", 10, age=7200)
+    storage.touch("stale")
+    assert storage.sweep()["evicted"] == []
+
+
+def test_sessions_pinned_after_the_scan_survive(tmp_path):
+    storage = SessionStorage(str(tmp_path), ttl_seconds=3600, max_bytes=0)
+    make_session(tmp_path, "rerun", 10, age=7200)
+    scan = storage._scan
+
+    def scan_then_pin(now):
+        sessions = scan(now)
+        (tmp_path / "rerun" / ".pins").mkdir()
+        (tmp_path / "rerun" / ".pins" / f"{os.getpid()}-late").write_text("")
+        return sessions
+    storage._scan = scan_then_pin
+
+    assert storage.sweep()["evicted"] == []
+    assert (tmp_path / "rerun" / "report.docx").exists()
+
+
+def test_pin_waits_for_a_running_sweep(tmp_path):
+    storage = SessionStorage(str(tmp_path), ttl_seconds=3600, max_bytes=0)
+    pinned = threading.Event()
+
+    def pin():
+        with storage.pin("new"):
+            pinned.set()
+    with storage._locked():
+        thread = threading.Thread(target=pin)
+        thread.start()
+        time.sleep(0.1)
+        assert not pinned.is_set()
+    thread.join(5)
+    assert pinned.is_set()
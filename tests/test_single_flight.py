@@ -0,0 +1,174 @@
+import os
+import shutil
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.getcwd())
+
+import generate_assessment
+from single_flight import SessionBusy, SingleFlight, request_fingerprint
+
+
+def slow(calls, started=None, release=None, result=None):
+    def compute():
+        calls.append(1)
+        if started:
+            started.set()
+        if release:
+            release.wait(5)
+        return result or {"status": "complete", "run": len(calls)}
+    return compute
+
+
+def in_thread(fn, results):
+    thread = threading.Thread(target=lambda: results.append(fn()))
+    thread.start()
+    return thread
+
+
+def test_fingerprint_ignores_order_and_unrelated_fields():
+    a = {"session_id": "s", "goal": "g", "files": [{"file_url": "u"}], "idempotency_key": "1"}
+    b = {"files": [{"file_url": "u"}], "goal": "g", "session_id": "s", "idempotency_key": "2"}
+    assert request_fingerprint(a) == request_fingerprint(b)
+    assert request_fingerprint(a) != request_fingerprint({**a, "files": [{"file_url": "v"}]})
+
+
+def test_duplicates_in_one_process_share_the_run(tmp_path):
+    flight, calls, results = SingleFlight(str(tmp_path)), [], []
+    started, release = threading.Event(), threading.Event()
+    leader = in_thread(lambda: flight.run("s1", "abc", slow(calls, started, release)), results)
+    started.wait(5)
+    follower = in_thread(lambda: flight.run("s1", "abc", slow(calls)), results)
+    time.sleep(0.1)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert len(calls) == 1
+    assert sorted(bool(r.get("coalesced")) for r in results) == [False, True]
+    assert flight.stats() == {"in_flight": 0, "coalesced": 1}
+
+
+def test_duplicates_across_workers_wait_on_the_session_lock(tmp_path):
+    # separate instances stand in for separate gunicorn workers
+    first, second = SingleFlight(str(tmp_path)), SingleFlight(str(tmp_path))
+    calls, results = [], []
+    started, release = threading.Event(), threading.Event()
+    leader = in_thread(lambda: first.run("s1", "abc", slow(calls, started, release)), results)
+    started.wait(5)
+    follower = in_thread(lambda: second.run("s1", "abc", slow(calls)), results)
+    time.sleep(0.1)
+    assert follower.is_alive()
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert len(calls) == 1 and len(results) == 2
+    coalesced = [r for r in results if r.get("coalesced")]
+    assert len(coalesced) == 1 and coalesced[0]["run"] == 1
+
+
+def test_waiting_for_a_busy_session_is_bounded(tmp_path):
+    first, second = SingleFlight(str(tmp_path)), SingleFlight(str(tmp_path), wait_seconds=0.3)
+    calls, results = [], []
+    started, release = threading.Event(), threading.Event()
+    leader = in_thread(lambda: first.run("s1", "abc", slow(calls, started, release)), results)
+    started.wait(5)
+    try:
+        begun = time.monotonic()
+        with pytest.raises(SessionBusy):
+            second.run("s1", "abc", slow(calls))
+        assert time.monotonic() - begun < 2
+        # a request's deadline shortens the wait further, also for duplicates in the same process
+        with pytest.raises(SessionBusy):
+            first.run("s1", "abc", slow(calls), max_wait=0.1)
+    finally:
+        release.set()
+        leader.join(5)
+    assert len(calls) == 1 and results[0]["run"] == 1
+
+
+def test_busy_session_answers_409(monkeypatch):
+    import app as app_module
+
+    def busy(data):
+        assert data["deadline"].budget_seconds == 5
+        raise SessionBusy("Another assessment of s1 is still running", 30)
+    monkeypatch.setattr(app_module, "process_assessment", busy)
+    resp = app_module.app.test_client().post(
+        "/start_assessment", json={"session_id": "s1", "email": "a@b", "goal": "g", "files": []},
+        headers={"X-Request-Timeout": "5"})
+    assert resp.status_code == 409 and resp.headers["Retry-After"] == "30"
+
+
+def test_different_inputs_run_one_after_the_other(tmp_path):
+    flight, calls, results = SingleFlight(str(tmp_path)), [], []
+    started, release = threading.Event(), threading.Event()
+    leader = in_thread(lambda: flight.run("s1", "abc", slow(calls, started, release)), results)
+    started.wait(5)
+    other = in_thread(lambda: flight.run("s1", "def", slow(calls)), results)
+    time.sleep(0.1)
+    assert len(calls) == 1  # not racing on the session folder
+    release.set()
+    leader.join(5)
+    other.join(5)
+    assert len(calls) == 2 and not any(r.get("coalesced") for r in results)
+
+
+def test_failures_are_not_reused(tmp_path):
+    flight, calls = SingleFlight(str(tmp_path)), []
+    assert "error" in flight.run("s1", "abc", slow(calls, result={"error": "boom"}))
+    assert flight.run("s1", "abc", slow(calls))["run"] == 2
+
+    def boom():
+        raise RuntimeError("boom")
+    with pytest.raises(RuntimeError):
+        flight.run("s2", "abc", boom)
+    assert flight.run("s2", "abc", slow(calls))["run"] == 3
+
+
+def test_results_expire(tmp_path):
+    flight, calls = SingleFlight(str(tmp_path), result_seconds=0.1), []
+    flight.run("s1", "abc", slow(calls))
+    assert flight.run("s1", "abc", slow(calls)).get("coalesced")
+    time.sleep(0.2)
+    assert flight.run("s1", "abc", slow(calls))["run"] == 2
+
+
+def test_process_assessment_coalesces_duplicate_requests(monkeypatch):
+    calls, results = [], []
+    started, release = threading.Event(), threading.Event()
+    monkeypatch.setattr(generate_assessment, "single_flight", SingleFlight(generate_assessment.OUTPUT_DIR))
+    monkeypatch.setattr(generate_assessment, "_run_assessment", lambda data: slow(calls, started, release)())
+    data = {"session_id": "coalesce", "email": "a@b", "goal": "g", "files": []}
+    try:
+        first = in_thread(lambda: generate_assessment.process_assessment(dict(data)), results)
+        started.wait(5)
+        second = in_thread(lambda: generate_assessment.process_assessment(dict(data)), results)
+        time.sleep(0.1)
+        release.set()
+        first.join(5)
+        second.join(5)
+    finally:
+        shutil.rmtree(os.path.join(generate_assessment.OUTPUT_DIR, "coalesce"), ignore_errors=True)
+    assert len(calls) == 1 and len(results) == 2
+
+
+def test_process_assessment_waits_no_longer_than_the_deadline(monkeypatch):
+    from deadline import Deadline
+    waits = []
+
+    class Recorder:
+        def run(self, session_id, fingerprint, compute, max_wait=None):
+            waits.append(max_wait)
+            return {}
+    monkeypatch.setattr(generate_assessment, "single_flight", Recorder())
+    try:
+        generate_assessment.process_assessment({"session_id": "wait", "deadline": Deadline(10)})
+        generate_assessment.process_assessment({"session_id": "wait", "deadline": Deadline(0)})
+    finally:
+        shutil.rmtree(os.path.join(generate_assessment.OUTPUT_DIR, "wait"), ignore_errors=True)
+    assert 9 < waits[0] <= 10 and waits[1] is None
@@ -0,0 +1,82 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.getcwd())
+
+import generate_assessment
+from stage_graph import StageGraph
+
+
+def test_independent_stages_run_concurrently():
+    both_running = threading.Barrier(2, timeout=2)
+
+    def branch(x):
+        both_running.wait()  # deadlocks unless the two branches overlap
+        time.sleep(0.05)
+        return x + 1
+
+    graph = StageGraph()
+    graph.add("left", branch, inputs=("x",), outputs=("a",))
+    graph.add("right", branch, inputs=("x",), outputs=("b",))
+    graph.add("slow", lambda a: time.sleep(0.1) or a * 10, inputs=("a",), outputs=("c",))
+    graph.add("join", lambda b, c: (b, c), inputs=("b", "c"), outputs=("pair", "unused"))
+    values, report = graph.run({"x": 1}, workers=4)
+
+    assert values["pair"] == 2 and values["unused"] == 20
+    assert report["critical_path"] == ["left", "slow", "join"] or report["critical_path"] == ["right", "slow", "join"]
+    assert set(report["stages"]) == {"left", "right", "slow", "join"}
+    assert report["wall_seconds"] < report["stage_seconds"]
+
+
+def test_thread_stages_inherit_context():
+    from contextvars import ContextVar
+    var = ContextVar("var", default=None)
+    var.set("batch")
+    graph = StageGraph().add("read", lambda: var.get(), outputs=("seen",))
+    assert graph.run({})[0]["seen"] == "batch"
+
+
+def test_graph_validation():
+    graph = StageGraph()
+    graph.add("a", lambda y: y, inputs=("y",), outputs=("x",))
+    graph.add("b", lambda x: x, inputs=("x",), outputs=("y",))
+    with pytest.raises(ValueError, match="cycle"):
+        graph.dependencies()
+    with pytest.raises(ValueError, match="produced by both"):
+        graph.add("c", lambda: 1, outputs=("x",))
+    with pytest.raises(ValueError, match="no stage produces"):
+        StageGraph().add("d", lambda z: z, inputs=("z",)).dependencies()
+
+
+def test_failure_stops_dependents():
+    ran = []
+
+    def boom():
+        raise RuntimeError("boom")
+
+    graph = StageGraph()
+    graph.add("fail", boom, outputs=("x",))
+    graph.add("after", lambda x: ran.append(x), inputs=("x",))
+    graph.add("other", lambda: ran.append("other"))
+    with pytest.raises(RuntimeError, match="boom"):
+        graph.run({})
+    assert "other" in ran and len(ran) == 1
+
+
+def test_assessment_graph_is_complete():
+    start = {"session_id", "email", "goal", "folder_id", "next_action_webhook", "session_path",
+             "downloaded", "hw_xl", "sw_xl", "incremental", "diagnostics", "artifacts", "deadline",
+             "deferred_uploads", "local_only"}
+    for chunked in (False, True):
+        graph = generate_assessment.build_assessment_graph(chunked)
+        deps = graph.dependencies(start)
+        assert deps["reports"] >= {"upload_charts", "narratives"}
+        # Excel writing and chart upload never wait on narratives
+        assert "narratives" not in deps["upload_charts"]
+        assert "notify" in graph.stages
+        # local links handed to Market-Gap must already be on disk
+        assert "persist_artifacts" in deps["notify"]
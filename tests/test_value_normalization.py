@@ -0,0 +1,61 @@
+import os
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.getcwd())
+
+from value_normalization import (
+    capacity_gb, compliance_flags, infer_date_format, normalize_values, parse_dates
+)
+
+
+def test_infer_date_format_disambiguates_by_samples():
+    assert infer_date_format(("2024-03-01", "2025-12-31")) == "%Y-%m-%d"
+    assert infer_date_format(("01/03/2024", "31/12/2025")) == "%d/%m/%Y"
+    assert infer_date_format(("03/01/2024", "12/31/2025")) == "%m/%d/%Y"
+    assert infer_date_format(("2024-03-01", "TBD", "2024-03-02")) == "%Y-%m-%d"
+    assert infer_date_format(("TBD",)) is None
+
+
+def test_ambiguous_dates_read_month_first():
+    assert infer_date_format(("03/01/2024", "12/11/2025")) == "%m/%d/%Y"
+    assert infer_date_format(("03-01-2024", "12-11-2025")) == "%m-%d-%Y"
+    parsed = parse_dates(pd.Series(["03/01/2024", "12/11/2025"]))
+    assert parsed.tolist() == [pd.Timestamp("2024-03-01"), pd.Timestamp("2025-12-11")]
+
+
+def test_parse_dates_mixes_text_and_native_values():
+    series = pd.Series(["31/12/2025", pd.Timestamp("2020-01-02"), None, "not a date", "01/02/2024"])
+    parsed = parse_dates(series)
+    assert pd.api.types.is_datetime64_any_dtype(parsed.dtype)
+    assert parsed[0] == pd.Timestamp("2025-12-31")
+    assert parsed[1] == pd.Timestamp("2020-01-02")
+    assert parsed[4] == pd.Timestamp("2024-02-01")
+    assert parsed[[2, 3]].isna().all()
+
+
+def test_capacity_strings_become_gb():
+    series = pd.Series([512, "2 TB / 1.6 TB", "16 GB", "1,024 MB", "0.5tib", None, "n/a"])
+    gb = capacity_gb(series)
+    assert gb[:5].tolist() == [512.0, 2048.0, 16.0, 1.0, 512.0]
+    assert gb[5:].isna().all()
+
+
+def test_compliance_flags_and_normalize_values():
+    flags = compliance_flags(pd.Series(["PCI, hipaa", "SOC 2", None]))
+    assert flags["Compliance PCI"].tolist() == [True, False, False]
+    assert flags["Compliance HIPAA"].tolist() == [True, False, False]
+    assert flags["Compliance SOC2"].tolist() == [False, True, False]
+
+    df = pd.DataFrame({
+        "Storage Capacity (Raw & Usable)": ["2 TB / 1.6 TB"],
+        "RAM (GB)": ["64 GB"],
+        "End of Life (EOL)": ["2030-01-01"],
+        "Compliance Tags": ["GDPR"],
+    })
+    out = normalize_values(df)
+    assert out.loc[0, "Storage Capacity (GB)"] == 2048.0
+    assert out.loc[0, "Storage Capacity (Raw & Usable)"] == "2 TB / 1.6 TB"
+    assert out.loc[0, "RAM (GB)"] == 64.0
+    assert out.loc[0, "End of Life (EOL)"] == pd.Timestamp("2030-01-01")
+    assert bool(out.loc[0, "Compliance GDPR"])
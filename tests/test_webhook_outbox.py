@@ -0,0 +1,131 @@
+import os
+import shutil
+import sys
+import threading
+
+import pandas as pd
+
+sys.path.insert(0, os.getcwd())
+
+import generate_assessment
+import webhook_outbox
+from webhook_outbox import WebhookOutbox
+
+
+class Resp:
+    status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+
+def fake_post(calls, fail=False):
+    def post(url, json=None, headers=None, timeout=None):
+        calls.append((url, json, headers))
+        if fail:
+            raise ConnectionError("webhook down")
+        return Resp()
+    return post
+
+
+def test_enqueue_deduplicates_pending_and_delivers_once(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(webhook_outbox.requests, "post", fake_post(calls))
+    outbox = WebhookOutbox(str(tmp_path / "outbox.sqlite3"))
+
+    first = outbox.enqueue("http://hook", {"session_id": "s1", "files": [1]})
+    again = outbox.enqueue("http://hook", {"files": [1], "session_id": "s1"})
+    assert not first["deduplicated"] and again["deduplicated"] and again["id"] == first["id"]
+
+    assert outbox.deliver_due() == {"delivered": 1, "retrying": 0, "failed": 0}
+    assert outbox.deliver_due()["delivered"] == 0
+    assert len(calls) == 1 and calls[0][2]["Idempotency-Key"]
+    assert outbox.stats()["delivered"] == 1
+
+    # a later run with the same outcome is a new notification
+    rerun = outbox.enqueue("http://hook", {"session_id": "s1", "files": [1]})
+    assert not rerun["deduplicated"] and rerun["status"] == "pending" and rerun["id"] != first["id"]
+    assert outbox.deliver_due()["delivered"] == 1
+    assert len(calls) == 2 and calls[1][2]["Idempotency-Key"] != calls[0][2]["Idempotency-Key"]
+
+
+def test_failures_back_off_then_give_up(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(webhook_outbox.requests, "post", fake_post(calls, fail=True))
+    outbox = WebhookOutbox(str(tmp_path / "outbox.sqlite3"), max_attempts=2, backoff_seconds=0)
+    outbox.enqueue("http://hook", {"session_id": "s1"})
+
+    assert outbox.deliver_due()["retrying"] == 1
+    assert outbox.deliver_due()["failed"] == 1
+    assert outbox.deliver_due() == {"delivered": 0, "retrying": 0, "failed": 0}
+    assert outbox.stats()["failed"] == 1
+
+    # re-enqueueing a message that gave up schedules a new delivery
+    monkeypatch.setattr(webhook_outbox.requests, "post", fake_post(calls))
+    assert outbox.enqueue("http://hook", {"session_id": "s1"})["status"] == "pending"
+    assert outbox.deliver_due()["delivered"] == 1
+    assert len(calls) == 3
+
+
+def test_backoff_delays_retries(tmp_path, monkeypatch):
+    monkeypatch.setattr(webhook_outbox.requests, "post", fake_post([], fail=True))
+    outbox = WebhookOutbox(str(tmp_path / "outbox.sqlite3"), backoff_seconds=60)
+    outbox.enqueue("http://hook", {"session_id": "s1"})
+    assert outbox.deliver_due()["retrying"] == 1
+    assert outbox.deliver_due()["retrying"] == 0  # not due for another minute
+
+
+def test_concurrent_dispatchers_post_once(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(webhook_outbox.requests, "post", fake_post(calls))
+    path = str(tmp_path / "outbox.sqlite3")
+    WebhookOutbox(path).enqueue("http://hook", {"session_id": "s1"})
+
+    workers = [threading.Thread(target=WebhookOutbox(path).deliver_due) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert len(calls) == 1
+
+
+def test_dispatcher_delivers_after_enqueue(tmp_path, monkeypatch):
+    delivered = threading.Event()
+
+    def post(url, json=None, headers=None, timeout=None):
+        delivered.set()
+        return Resp()
+    monkeypatch.setattr(webhook_outbox.requests, "post", post)
+    outbox = WebhookOutbox(str(tmp_path / "outbox.sqlite3"))
+    outbox.start_dispatcher(interval=60)
+    try:
+        outbox.enqueue("http://hook", {"session_id": "s1"})
+        assert delivered.wait(5)
+    finally:
+        outbox.stop_dispatcher()
+
+
+def test_webhook_outage_does_not_fail_assessment(tmp_path, monkeypatch):
+    outbox = WebhookOutbox(str(tmp_path / "outbox.sqlite3"))
+    monkeypatch.setattr(generate_assessment, "webhook_outbox", outbox)
+    monkeypatch.setattr(generate_assessment, "RESULT_CACHE_ENABLED", False)
+    monkeypatch.setattr(generate_assessment, "ai_narrative", lambda section, summary: "narrative")
+    monkeypatch.setattr(generate_assessment, "generate_visual_charts", lambda *a, **k: {})
+    monkeypatch.setattr(generate_assessment, "generate_docx_report", lambda *a, **k: "docx")
+    monkeypatch.setattr(generate_assessment, "generate_pptx_report", lambda *a, **k: "pptx")
+    monkeypatch.setattr(generate_assessment, "upload_file_to_drive",
+                        lambda path, name=None, folder_id=None: f"https://drive/{os.path.basename(path)}")
+    # the report service and the webhook are both down
+    monkeypatch.setattr(generate_assessment.requests, "post", fake_post([], fail=True))
+
+    src = tmp_path / "hw.xlsx"
+    pd.DataFrame({"Device Name": ["srv1"]}).to_excel(src, index=False)
+    files = [{"type": "hardware", "file_url": str(src), "file_name": "hw.xlsx"}]
+    try:
+        result = generate_assessment.generate_assessment("outbox", "", "", files, "http://hook")
+    finally:
+        shutil.rmtree(os.path.join("temp_sessions", "outbox"), ignore_errors=True)
+
+    assert "error" not in result and result["status"] == "complete"
+    assert result["diagnostics"]["notification"]["status"] == "pending"
+    assert outbox.deliver_due()["retrying"] == 1
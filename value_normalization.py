@@ -0,0 +1,144 @@
+import os
+import re
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+
+import pandas as pd
+
+from dtype_compaction import DATE_COLUMNS
+
+# Read ambiguous numeric dates (all parts <= 12) day-first; month-first like pandas by default
+DATE_DAY_FIRST = os.getenv("DATE_DAY_FIRST", "0") == "1"
+_MONTH_FIRST = ["%m/%d/%Y", "%d/%m/%Y", "%m-%d-%Y", "%d-%m-%Y"]
+_DAY_FIRST = ["%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%m-%d-%Y"]
+# Formats tried, in order, when a column's sample values share one shape
+DATE_FORMATS = [
+    "%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y/%m/%d",
+    *(_DAY_FIRST if DATE_DAY_FIRST else _MONTH_FIRST), "%d.%m.%Y",
+    "%d %b %Y", "%d %B %Y", "%b %d, %Y", "%B %d, %Y",
+]
+DATE_SAMPLE_SIZE = 50
+
+# Raw capacity column and the numeric GB column derived from it
+STORAGE_COLUMN = "Storage Capacity (Raw & Usable)"
+STORAGE_GB_COLUMN = "Storage Capacity (GB)"
+RAM_COLUMN = "RAM (GB)"
+UNIT_TO_GB = {"KB": 1 / 1024 ** 2, "MB": 1 / 1024, "GB": 1, "TB": 1024, "PB": 1024 ** 2}
+
+# Compliance tags split out of the free-text "Compliance Tags" column
+COMPLIANCE_COLUMN = "Compliance Tags"
+COMPLIANCE_FLAGS = [t.strip() for t in os.getenv("COMPLIANCE_FLAGS", "PCI,HIPAA,SOC2,GDPR,ISO27001,SOX").split(",")
+                    if t.strip()]
+
+_REFERENCE_DATE = datetime(2000, 12, 28, 13, 45, 59)
+_CAPACITY_RE = r"(?P<value>\d+(?:\.\d+)?)\s*(?P<unit>[KMGTP]i?B)?"
+
+
+def flag_column(tag: str) -> str:
+    """Name of the boolean column for a compliance tag, e.g. ``"Compliance PCI"``."""
+    return f"Compliance {tag}"
+
+
+def _shape(text: str) -> str:
+    # "12/03/2024" -> "9/9/9", "Mar 12, 2024" -> "a 9, 9"
+    return re.sub(r"\d+", "9", re.sub(r"[A-Za-z]+", "a", text.strip()))
+
+
+@lru_cache(maxsize=128)
+def _formats_for_shape(shape: str) -> tuple:
+    return tuple(f for f in DATE_FORMATS if _shape(_REFERENCE_DATE.strftime(f)) == shape)
+
+
+@lru_cache(maxsize=512)
+def infer_date_format(samples: tuple):
+    """
+    Format for the most common shape among ``samples``: the first entry in
+    ``DATE_FORMATS`` of that shape that parses every sample of it, or
+    ``None``. Stray values (``"TBD"``) do not spoil the inference.
+    """
+    by_shape = Counter(_shape(s) for s in samples)
+    if not by_shape:
+        return None
+    shape = by_shape.most_common(1)[0][0]
+    candidates = [s.strip() for s in samples if _shape(s) == shape]
+    for fmt in _formats_for_shape(shape):
+        try:
+            for s in candidates:
+                datetime.strptime(s, fmt)
+        except ValueError:
+            continue
+        return fmt
+    return None
+
+
+def parse_dates(series: pd.Series) -> pd.Series:
+    """
+    Vectorised date parsing: text cells use the inferred format in one pass
+    (falling back to per-value inference only for cells it rejects); values
+    that are already dates are passed through. Unparseable cells become NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series
+    is_text = series.map(lambda v: isinstance(v, str))
+    text = series[is_text].str.strip()
+    text = text[text != ""]
+    parsed = pd.to_datetime(series.where(~is_text), errors="coerce")
+    if not text.empty:
+        samples = tuple(text.drop_duplicates().head(DATE_SAMPLE_SIZE))
+        fmt = infer_date_format(samples)
+        values = pd.to_datetime(text, format=fmt or "mixed", errors="coerce")
+        missed = values.isna()
+        if fmt and missed.any():
+            values[missed] = pd.to_datetime(text[missed], format="mixed", errors="coerce")
+        parsed.loc[values.index] = values
+    return parsed
+
+
+def capacity_gb(series: pd.Series) -> pd.Series:
+    """
+    Numeric GB from capacity cells such as ``512``, ``"16 GB"`` or
+    ``"2 TB / 1.6 TB"`` (the first, raw figure wins). Bare numbers are GB.
+    """
+    numeric = pd.to_numeric(series, errors="coerce")
+    text = series[numeric.isna() & series.notna()].astype(str)
+    if text.empty:
+        return numeric.astype(float)
+    # drop thousands separators ("1,024 GB") before extracting
+    text = text.str.replace(r"(?<=\d),(?=\d{3}\b)", "", regex=True)
+    parts = text.str.extract(_CAPACITY_RE, flags=re.IGNORECASE)
+    units = parts["unit"].str.upper().str.replace("I", "", regex=False).fillna("GB")
+    gb = pd.to_numeric(parts["value"], errors="coerce") * units.map(UNIT_TO_GB)
+    return numeric.astype(float).fillna(gb)
+
+
+def compliance_flags(series: pd.Series) -> pd.DataFrame:
+    """One boolean column per tag in ``COMPLIANCE_FLAGS`` (case and spacing ignored)."""
+    tags = series.fillna("").astype(str).str.upper().str.replace(r"[\s_-]+", "", regex=True)
+    return pd.DataFrame(
+        {flag_column(tag): tags.str.contains(tag.upper(), regex=False) for tag in COMPLIANCE_FLAGS},
+        index=series.index,
+    )
+
+
+def normalize_values(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Type an inventory frame once, right after its headers are resolved:
+    date columns become datetime64, RAM and storage become numeric GB and
+    compliance tags become boolean flag columns. Raw storage and tag text is
+    kept for the exported workbooks.
+    """
+    if df is None or df.empty:
+        return df
+    df = df.copy()
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_dates(df[col])
+    if RAM_COLUMN in df.columns:
+        df[RAM_COLUMN] = capacity_gb(df[RAM_COLUMN])
+    if STORAGE_COLUMN in df.columns:
+        df[STORAGE_GB_COLUMN] = capacity_gb(df[STORAGE_COLUMN])
+    if COMPLIANCE_COLUMN in df.columns:
+        flags = compliance_flags(df[COMPLIANCE_COLUMN])
+        df = pd.concat([df.drop(columns=[c for c in flags.columns if c in df.columns]), flags], axis=1)
+    return df
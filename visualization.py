@@ -1,34 +1,59 @@
 import os
-import matplotlib.pyplot as plt
+import pandas as pd
+from matplotlib.figure import Figure
 
-def generate_charts(hw_df, sw_df, session_folder):
-    os.makedirs(os.path.join(session_folder, "charts"), exist_ok=True)
+from artifact_store import render_artifact
+from dtype_compaction import observed_counts
 
-    def pie_chart(data, column, title, filename):
-        counts = data[column].value_counts()
-        plt.figure(figsize=(5, 5))
-        plt.pie(counts, labels=counts.index, autopct='%1.1f%%', startangle=140)
-        plt.title(title)
+CHART_SPECS = [
+    ("hw_tier_chart", "hw", "Tier", "Hardware Tier Distribution"),
+    ("hw_status_chart", "hw", "Status", "Hardware Status"),
+    ("sw_tier_chart", "sw", "Tier", "Software Tier Distribution"),
+    ("sw_status_chart", "sw", "Status", "Software Status"),
+]
+
+def generate_count_charts(hw_counts, sw_counts, session_folder, in_memory=False):
+    """
+    Render the pie charts from precomputed value counts, e.g.
+    ``{"Tier": {1: 10, 2: 4}, "Status": {...}}`` per inventory. Used by the
+    chunked pipeline, which never holds the full inventory in memory.
+
+    Returns chart paths, or PNG artifacts (``charts/<name>.png``) without
+    touching disk when ``in_memory`` is set.
+    """
+    if not in_memory:
+        os.makedirs(os.path.join(session_folder, "charts"), exist_ok=True)
+
+    def pie_chart(counts, title, filename):
+        # a standalone Figure rather than pyplot's global state, so sessions
+        # rendering in parallel (batch runs) cannot draw into each other's charts
+        fig = Figure(figsize=(5, 5))
+        ax = fig.subplots()
+        ax.pie(counts, labels=counts.index, autopct='%1.1f%%', startangle=140)
+        ax.set_title(title)
+        if in_memory:
+            return render_artifact(f"charts/{filename}", lambda buf: fig.savefig(buf, format="png"))
         chart_path = os.path.join(session_folder, "charts", filename)
-        plt.savefig(chart_path)
-        plt.close()
+        fig.savefig(chart_path)
         return chart_path
 
     charts = {}
+    sources = {"hw": hw_counts or {}, "sw": sw_counts or {}}
+    for chart_name, side, column, title in CHART_SPECS:
+        counts = sources[side].get(column)
+        if counts is None:
+            continue
+        counts = pd.Series(counts)
+        charts[chart_name] = pie_chart(counts, title, f"{chart_name}.png")
+    return charts
 
-    if hw_df is not None and not hw_df.empty:
-        if "Tier" in hw_df:
-            charts["hw_tier_chart"] = pie_chart(hw_df, "Tier", "Hardware Tier Distribution", "hw_tier_chart.png")
-        if "Status" in hw_df:
-            charts["hw_status_chart"] = pie_chart(hw_df, "Status", "Hardware Status", "hw_status_chart.png")
-
-    if sw_df is not None and not sw_df.empty:
-        if "Tier" in sw_df:
-            charts["sw_tier_chart"] = pie_chart(sw_df, "Tier", "Software Tier Distribution", "sw_tier_chart.png")
-        if "Status" in sw_df:
-            charts["sw_status_chart"] = pie_chart(sw_df, "Status", "Software Status", "sw_status_chart.png")
+def generate_charts(hw_df, sw_df, session_folder, in_memory=False):
+    def counts_for(df):
+        if df is None or df.empty:
+            return {}
+        return {col: observed_counts(df[col]) for col in ("Tier", "Status") if col in df}
 
-    return charts
+    return generate_count_charts(counts_for(hw_df), counts_for(sw_df), session_folder, in_memory)
 
 # Patch to match expected import name
 generate_visual_charts = generate_charts
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+
+from sqlite_store import connect
+
+# Deliver webhooks from the durable outbox (0 posts synchronously inside the run)
+WEBHOOK_OUTBOX_ENABLED = os.getenv("WEBHOOK_OUTBOX_ENABLED", "1") == "1"
+WEBHOOK_OUTBOX_PATH = os.getenv("WEBHOOK_OUTBOX_PATH", os.path.join("cache", "webhook_outbox.sqlite3"))
+WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("WEBHOOK_TIMEOUT_SECONDS", "30"))
+# Attempts before a message is given up on (kept as "failed" for inspection)
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "10"))
+# Exponential backoff between attempts: base * 2**(attempt - 1), capped
+WEBHOOK_BACKOFF_SECONDS = float(os.getenv("WEBHOOK_BACKOFF_SECONDS", "5"))
+WEBHOOK_BACKOFF_MAX_SECONDS = float(os.getenv("WEBHOOK_BACKOFF_MAX_SECONDS", "1800"))
+# How often the dispatcher looks for due messages when nothing wakes it
+WEBHOOK_POLL_SECONDS = float(os.getenv("WEBHOOK_POLL_SECONDS", "10"))
+# Delivered and failed messages are kept this long
+WEBHOOK_RETENTION_SECONDS = int(os.getenv("WEBHOOK_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    dedup_key TEXT NOT NULL,
+    url TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS messages_due ON messages (status, next_attempt_at);
+CREATE UNIQUE INDEX IF NOT EXISTS messages_pending ON messages (dedup_key) WHERE status = 'pending';
+"""
+
+
+def dedup_key(url: str, payload: dict) -> str:
+    """Identical notifications for the same endpoint share this key; at most one of them is pending."""
+    body = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(f"{url}\n{body}".encode("utf-8")).hexdigest()
+
+
+def post_webhook(url: str, payload: dict, key: str = None):
+    headers = {"Idempotency-Key": key} if key else None
+    resp = requests.post(url, json=payload, headers=headers, timeout=WEBHOOK_TIMEOUT_SECONDS)
+    if hasattr(resp, "raise_for_status"):
+        resp.raise_for_status()
+    return resp
+
+
+class WebhookOutbox:
+    """
+    Durable queue of webhook notifications. ``enqueue`` commits the message
+    to SQLite and returns immediately; a dispatcher thread in every worker
+    delivers due messages with exponential backoff. A message is claimed by
+    moving its ``next_attempt_at`` past the delivery timeout, so concurrent
+    dispatchers never post it twice and a worker that dies mid-delivery
+    only delays it.
+    """
+
+    def __init__(self, path=WEBHOOK_OUTBOX_PATH, max_attempts=WEBHOOK_MAX_ATTEMPTS,
+                 backoff_seconds=WEBHOOK_BACKOFF_SECONDS, backoff_max_seconds=WEBHOOK_BACKOFF_MAX_SECONDS,
+                 timeout_seconds=WEBHOOK_TIMEOUT_SECONDS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.timeout_seconds = timeout_seconds
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._dispatcher = None
+
+    def enqueue(self, url: str, payload: dict) -> dict:
+        """
+        Store a notification for delivery. An identical one still pending
+        (e.g. from a retried request) is reused; once that has been
+        delivered or given up on, the same notification is sent again.
+        """
+        key = dedup_key(url, payload)
+        now = time.time()
+        with connect(self.path, _SCHEMA) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO messages (dedup_key, url, payload, next_attempt_at, created_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, url, json.dumps(payload, default=str), now, now),
+            ).rowcount
+            row = conn.execute("SELECT id, status FROM messages WHERE dedup_key = ? AND status = 'pending'",
+                               (key,)).fetchone()
+            conn.execute("COMMIT")
+        self._wake.set()
+        print(f"[DEBUG] Webhook {row[0]} for {url} {'queued' if inserted else 'deduplicated'} ({row[1]})", flush=True)
+        return {"id": row[0], "status": row[1], "deduplicated": not inserted}
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max_seconds, self.backoff_seconds * 2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.0)
+
+    def _claim(self, conn, message_id, due_at, now) -> bool:
+        return conn.execute(
+            "UPDATE messages SET next_attempt_at = ? WHERE id = ? AND status = 'pending' AND next_attempt_at = ?",
+            (now + 2 * self.timeout_seconds, message_id, due_at),
+        ).rowcount == 1
+
+    def deliver_due(self, limit: int = 50) -> dict:
+        """Attempt every message that is due now; returns counts by outcome."""
+        now = time.time()
+        outcome = {"delivered": 0, "retrying": 0, "failed": 0}
+        with connect(self.path, _SCHEMA) as conn:
+            due = conn.execute(
+                "SELECT id, dedup_key, url, payload, attempts, next_attempt_at FROM messages"
+                " WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            claimed = [m for m in due if self._claim(conn, m[0], m[5], now)]
+        for message_id, key, url, payload, attempts, _ in claimed:
+            attempts += 1
+            try:
+                # per message, so the receiver can drop our retries but not a later identical notification
+                post_webhook(url, json.loads(payload), f"{key}.{message_id}")
+            except Exception as e:
+                failed = attempts >= self.max_attempts
+                retry_at = time.time() + self._backoff(attempts)
+                with connect(self.path, _SCHEMA) as conn:
+                    conn.execute(
+                        "UPDATE messages SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?,"
+                        " finished_at = ? WHERE id = ?",
+                        ("failed" if failed else "pending", attempts, retry_at, str(e)[:500],
+                         time.time() if failed else None, message_id),
+                    )
+                outcome["failed" if failed else "retrying"] += 1
+                print(f"[WARN] Webhook {message_id} to {url} failed (attempt {attempts}): {e}", flush=True)
+                continue
+            with connect(self.path, _SCHEMA) as conn:
+                conn.execute(
+                    "UPDATE messages SET status = 'delivered', attempts = ?, last_error = NULL, finished_at = ?"
+                    " WHERE id = ?", (attempts, time.time(), message_id))
+            outcome["delivered"] += 1
+            print(f"[DEBUG] Webhook {message_id} delivered to {url}", flush=True)
+        return outcome
+
+    def purge(self, retention_seconds=WEBHOOK_RETENTION_SECONDS) -> int:
+        with connect(self.path, _SCHEMA) as conn:
+            return conn.execute("DELETE FROM messages WHERE status != 'pending' AND finished_at < ?",
+                                (time.time() - retention_seconds,)).rowcount
+
+    def stats(self) -> dict:
+        with connect(self.path, _SCHEMA) as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM messages GROUP BY status").fetchall())
+            oldest = conn.execute("SELECT MIN(created_at) FROM messages WHERE status = 'pending'").fetchone()[0]
+        return {
+            "pending": counts.get("pending", 0),
+            "delivered": counts.get("delivered", 0),
+            "failed": counts.get("failed", 0),
+            "oldest_pending_seconds": round(time.time() - oldest, 1) if oldest else 0,
+        }
+
+    def start_dispatcher(self, interval=WEBHOOK_POLL_SECONDS):
+        """Deliver due messages on a daemon thread, promptly after each ``enqueue``."""
+        if self._dispatcher and self._dispatcher.is_alive():
+            return
+
+        def loop():
+            while not self._stop.is_set():
+                # cleared before the pass, so an enqueue during it triggers another one
+                self._wake.clear()
+                try:
+                    self.deliver_due()
+                    self.purge()
+                except Exception as e:
+                    print(f"[WARN] Webhook dispatch failed: {e}", flush=True)
+                self._wake.wait(interval)
+
+        self._stop.clear()
+        self._dispatcher = threading.Thread(target=loop, name="webhook-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def stop_dispatcher(self):
+        self._stop.set()
+        self._wake.set()
+
+
+webhook_outbox = WebhookOutbox()